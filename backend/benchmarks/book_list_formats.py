@@ -0,0 +1,76 @@
+"""
+Compare the payload size and serialisation time of the book list formats.
+
+Usage:
+    python -m benchmarks.book_list_formats [--page-size N] [--authors N]
+        [--iterations N]
+
+A page of `--page-size` books written by `--authors` authors is laid out
+in each format of `GET /book?format=...`, then encoded as the route
+does. For each format are
+reported: the size of the body, gzipped and not, the time to build and
+encode it, and the time a client spends decoding it. No database is
+involved.
+"""
+
+import argparse
+import gzip
+import json
+import time
+
+from src.api.negotiation import NegotiatedResponse
+from src.api.routes.books import BookListFormat, book_list_content
+from src.core.catalog_snapshot import BookRecord
+
+FORMATS: tuple[BookListFormat, ...] = ('full', 'compact', 'columnar')
+
+
+def make_page(page_size: int, authors: int) -> list[BookRecord]:
+    return [
+        BookRecord(
+            id=n + 1,
+            title=f'the collected works, volume {n}',
+            year=1900 + n % 125,
+            author=f'firstname lastname {n % authors}',
+            author_id=n % authors + 1,
+        )
+        for n in range(page_size)
+    ]
+
+
+def encode(books: list[BookRecord], list_format: BookListFormat) -> bytes:
+    content = book_list_content(books, len(books), list_format)
+    return bytes(NegotiatedResponse(content).body)
+
+
+def main(page_size: int, authors: int, iterations: int) -> None:
+    books = make_page(page_size, authors)
+
+    print(f'{page_size} books by {authors} authors')
+    for list_format in FORMATS:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            body = encode(books, list_format)
+        encoding = (time.perf_counter() - start) / iterations
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            json.loads(body)
+        decoding = (time.perf_counter() - start) / iterations
+
+        print(
+            f'{list_format:>9}: {len(body) / 1024:8.1f} KiB, '
+            f'gzip {len(gzip.compress(body)) / 1024:7.1f} KiB, '
+            f'encoding {encoding * 1000:7.3f} ms, '
+            f'decoding {decoding * 1000:7.3f} ms'
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--page-size', type=int, default=500)
+    parser.add_argument('--authors', type=int, default=5)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    main(args.page_size, args.authors, args.iterations)
@@ -0,0 +1,150 @@
+"""
+Compare `GET /book?limit=500` served by the app with the same route served
+as FastAPI does by default.
+
+Usage:
+    python -m benchmarks.book_list_response [--url URL] [--rows N]
+        [--limit N] [--iterations N]
+
+- before: the route function behind a plain `APIRoute` and a
+  `JSONResponse`, so the list it returns is dumped to dicts, validated
+  against the response model, dumped again and encoded by `json.dumps`;
+- after: the app's route, whose list is encoded straight to bytes by
+  pydantic-core.
+
+Requests go through the ASGI apps in process, and the two bodies are
+checked to be the same JSON. As the queries take most of the time of a
+request, the time to turn a page the route returns into a body is also
+reported on its own. The target database is seeded with `--rows` books if
+the books table is empty; by default a throwaway SQLite file is used.
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import AsyncGenerator
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute, serialize_response
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from benchmarks.book_list_formats import make_page
+from benchmarks.list_count_strategies import seed
+from src.api.dependencies import get_session
+from src.api.negotiation import NegotiatedResponse
+from src.api.routes.books import book_list_content, get_books_like
+from src.app import app
+from src.schemas.books import BookList, ColumnarBookList, CompactBookList
+
+
+def baseline_app() -> FastAPI:
+    baseline = FastAPI()
+    baseline.add_api_route(
+        '/book',
+        get_books_like,
+        response_model=BookList | CompactBookList | ColumnarBookList,
+        response_class=JSONResponse,
+    )
+    return baseline
+
+
+async def measure(
+    target: FastAPI, limit: int, iterations: int
+) -> tuple[float, bytes]:
+    async with AsyncClient(
+        transport=ASGITransport(app=target), base_url='http://bench'
+    ) as client:
+        # Warms up the statement and serialiser caches
+        response = await client.get('/book', params={'limit': limit})
+        response.raise_for_status()
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await client.get('/book', params={'limit': limit})
+        elapsed = (time.perf_counter() - start) / iterations
+
+    return elapsed, response.content
+
+
+async def measure_encoding(
+    baseline: FastAPI, limit: int, iterations: int
+) -> dict[str, float]:
+    books = make_page(limit, 5)
+    route = next(r for r in baseline.routes if isinstance(r, APIRoute))
+
+    async def before() -> bytes:
+        content = await serialize_response(
+            field=route.response_field,
+            response_content=book_list_content(books, limit, 'full'),
+        )
+        return bytes(JSONResponse(content).body)
+
+    async def after() -> bytes:
+        content = book_list_content(books, limit, 'full')
+        return bytes(NegotiatedResponse(content).body)
+
+    timings = {}
+    for name, encode in {'before': before, 'after': after}.items():
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await encode()
+        timings[name] = (time.perf_counter() - start) / iterations
+    return timings
+
+
+async def main(url: str, rows: int, limit: int, iterations: int) -> None:
+    engine = create_async_engine(url)
+    sessionmaker = async_sessionmaker(
+        bind=engine, expire_on_commit=False, class_=AsyncSession
+    )
+    await seed(engine, rows)
+
+    async def get_benchmark_session() -> AsyncGenerator[AsyncSession, None]:
+        async with sessionmaker() as session:
+            yield session
+
+    apps = {'before': baseline_app(), 'after': app}
+    bodies = []
+    print(f'{engine.dialect.name}, {rows} books, GET /book?limit={limit}')
+    for name, target in apps.items():
+        target.dependency_overrides[get_session] = get_benchmark_session
+        elapsed, body = await measure(target, limit, iterations)
+        target.dependency_overrides.clear()
+        bodies.append(json.loads(body))
+        print(
+            f'{name:>6}: {elapsed * 1000:8.3f} ms, '
+            f'{1 / elapsed:8.1f} requests/s, {len(body) / 1024:7.1f} KiB'
+        )
+
+    assert bodies[0] == bodies[1], 'The responses differ.'
+    await engine.dispose()
+
+    print(f'Encoding a page of {limit} books')
+    timings = await measure_encoding(apps['before'], limit, iterations)
+    for name, elapsed in timings.items():
+        print(f'{name:>6}: {elapsed * 1000:8.3f} ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--url', default=None)
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--limit', type=int, default=500)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    url = args.url
+    if url is None:
+        db_path = Path(tempfile.mkdtemp()) / 'bench.db'
+        url = f'sqlite+aiosqlite:///{db_path}'
+
+    asyncio.run(main(url, args.rows, args.limit, args.iterations))
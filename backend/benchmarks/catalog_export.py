@@ -0,0 +1,124 @@
+"""
+Compare pulling the whole book catalogue through the paginated JSON list
+with the columnar export.
+
+Usage:
+    python -m benchmarks.catalog_export [--url URL] [--rows N]
+        [--page-size N]
+
+Requests go through the ASGI app in process, so the timings include the
+encoding on the server and the decoding on the client, but no network.
+For each method the total time, the bytes transferred and the time spent
+decoding into Python or Arrow structures are reported. The target
+database is seeded with `--rows` books if the books table is empty; by
+default a throwaway SQLite file is used.
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from typing import AsyncGenerator, Awaitable, Callable
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from benchmarks.list_count_strategies import seed
+from src.api.dependencies import get_bulk_session, get_session
+from src.app import app
+
+# Returns the bytes received and the seconds spent decoding them
+Method = Callable[[AsyncClient], Awaitable[tuple[int, float]]]
+
+
+def json_paging(page_size: int) -> Method:
+    async def run(client: AsyncClient) -> tuple[int, float]:
+        received = 0
+        decoding = 0.0
+        offset = 0
+        while True:
+            response = await client.get(
+                '/book', params={'limit': page_size, 'offset': offset}
+            )
+            received += len(response.content)
+            start = time.perf_counter()
+            books = response.json()['books']
+            decoding += time.perf_counter() - start
+            if len(books) < page_size:
+                return received, decoding
+            offset += page_size
+
+    return run
+
+
+async def arrow_export(client: AsyncClient) -> tuple[int, float]:
+    response = await client.get('/book/export')
+    start = time.perf_counter()
+    pa.ipc.open_stream(response.content).read_all()
+    return len(response.content), time.perf_counter() - start
+
+
+async def parquet_export(client: AsyncClient) -> tuple[int, float]:
+    response = await client.get('/book/export', params={'format': 'parquet'})
+    start = time.perf_counter()
+    pq.read_table(pa.BufferReader(response.content))
+    return len(response.content), time.perf_counter() - start
+
+
+async def main(url: str, rows: int, page_size: int) -> None:
+    engine = create_async_engine(url)
+    sessionmaker = async_sessionmaker(
+        bind=engine, expire_on_commit=False, class_=AsyncSession
+    )
+    await seed(engine, rows)
+
+    async def get_benchmark_session() -> AsyncGenerator[AsyncSession, None]:
+        async with sessionmaker() as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_benchmark_session
+    app.dependency_overrides[get_bulk_session] = get_benchmark_session
+    methods: dict[str, Method] = {
+        f'json/{page_size}': json_paging(page_size),
+        'arrow': arrow_export,
+        'parquet': parquet_export,
+    }
+
+    print(f'{engine.dialect.name}, {rows} books')
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url='http://bench'
+    ) as client:
+        for name, method in methods.items():
+            start = time.perf_counter()
+            received, decoding = await method(client)
+            elapsed = time.perf_counter() - start
+            print(
+                f'{name:>12}: {elapsed:8.3f} s, '
+                f'{received / 2**20:8.2f} MiB, '
+                f'decoding {decoding * 1000:8.1f} ms'
+            )
+
+    app.dependency_overrides.clear()
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--url', default=None)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--page-size', type=int, default=100)
+    args = parser.parse_args()
+
+    url = args.url
+    if url is None:
+        db_path = Path(tempfile.mkdtemp()) / 'bench.db'
+        url = f'sqlite+aiosqlite:///{db_path}'
+
+    asyncio.run(main(url, args.rows, args.page_size))
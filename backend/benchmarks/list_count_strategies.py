@@ -0,0 +1,110 @@
+"""
+Compare the count strategies used by the list endpoints.
+
+Usage:
+    python -m benchmarks.list_count_strategies [--url URL] [--rows N]
+        [--iterations N]
+
+The target database is seeded with `--rows` books if the books table is
+empty. By default a throwaway SQLite file is used; pass a PostgreSQL URL to
+measure the effect of the extra round-trip over the network.
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import selectinload
+
+from src.models import Author, Base, Book
+from src.services.pagination import CountStrategy, fetch_page
+
+AUTHORS = 100
+
+
+async def seed(engine: AsyncEngine, rows: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        if await conn.scalar(select(func.count(Book.id))):
+            return
+
+        await conn.execute(
+            insert(Author),
+            [{'name': f'author {n}'} for n in range(AUTHORS)],
+        )
+        author_ids = list(await conn.scalars(select(Author.id)))
+        await conn.execute(
+            insert(Book),
+            [
+                {
+                    'title': f'book {n}',
+                    'year': 1900 + n % 125,
+                    'author_id': author_ids[n % AUTHORS],
+                }
+                for n in range(rows)
+            ],
+        )
+
+
+async def run_strategy(
+    sessionmaker: async_sessionmaker[AsyncSession],
+    strategy: CountStrategy,
+    iterations: int,
+) -> float:
+    filter_condition = Book.title.contains('1')
+    query = (
+        select(Book)
+        .options(selectinload(Book.author))
+        .where(filter_condition)
+        .limit(20)
+        .offset(40)
+    )
+    count_query = select(func.count(Book.id)).where(filter_condition)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        async with sessionmaker() as session:
+            await fetch_page(session, query, count_query, strategy=strategy)
+
+    return (time.perf_counter() - start) / iterations
+
+
+async def main(url: str, rows: int, iterations: int) -> None:
+    engine = create_async_engine(url)
+    sessionmaker = async_sessionmaker(
+        bind=engine, expire_on_commit=False, class_=AsyncSession
+    )
+    await seed(engine, rows)
+
+    print(f'{engine.dialect.name}, {iterations} iterations')
+    for strategy in CountStrategy:
+        # Warm up the pool and the compiled statement cache
+        await run_strategy(sessionmaker, strategy, 5)
+        elapsed = await run_strategy(sessionmaker, strategy, iterations)
+        print(f'{strategy.value:>12}: {elapsed * 1000:8.3f} ms/request')
+
+    await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--url', default=None)
+    parser.add_argument('--rows', type=int, default=10_000)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    url = args.url
+    if url is None:
+        db_path = Path(tempfile.mkdtemp()) / 'bench.db'
+        url = f'sqlite+aiosqlite:///{db_path}'
+
+    asyncio.run(main(url, args.rows, args.iterations))
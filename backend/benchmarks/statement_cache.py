@@ -0,0 +1,103 @@
+"""
+Measure the per-call Python overhead of building lookup statements inline
+versus reusing the pre-built statements from `src.services.statements`.
+
+Usage:
+    python -m benchmarks.statement_cache [--iterations N]
+
+Two measurements are reported for the book-by-id lookup:
+
+- statement: building the statement and generating its cache key, which is
+  what SQLAlchemy does before it can look up the compiled cache.
+- execute: a full `session.scalar` call against an in-memory SQLite
+  database, so the database cost is as small as possible.
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, Callable
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import (
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import selectinload
+
+from src.models import Author, Base, Book
+from src.services import statements
+
+
+def build_inline(book_id: int) -> Select[tuple[Book]]:
+    return (
+        select(Book)
+        .options(selectinload(Book.author))
+        .where(Book.id == book_id)
+    )
+
+
+def time_per_call(func: Callable[[], Any], iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations
+
+
+def bench_statement(iterations: int) -> tuple[float, float]:
+    inline = time_per_call(
+        lambda: build_inline(1)._generate_cache_key(), iterations
+    )
+    prebuilt = time_per_call(
+        statements.book_by_id._generate_cache_key, iterations
+    )
+    return inline, prebuilt
+
+
+async def bench_execute(iterations: int) -> tuple[float, float]:
+    engine = create_async_engine('sqlite+aiosqlite://')
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    sessionmaker = async_sessionmaker(
+        bind=engine, expire_on_commit=False, class_=AsyncSession
+    )
+    async with sessionmaker() as session:
+        session.add(Book(title='book', year=2000, author=Author(name='a')))
+        await session.commit()
+
+    async def run(prebuilt: bool) -> float:
+        async with sessionmaker() as session:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                if prebuilt:
+                    await session.scalar(statements.book_by_id, {'book_id': 1})
+                else:
+                    await session.scalar(build_inline(1))
+                session.expunge_all()
+            return (time.perf_counter() - start) / iterations
+
+    await run(prebuilt=False)
+    await run(prebuilt=True)
+    inline, prebuilt = await run(prebuilt=False), await run(prebuilt=True)
+    await engine.dispose()
+
+    return inline, prebuilt
+
+
+def report(name: str, inline: float, prebuilt: float) -> None:
+    print(
+        f'{name:>10}: inline {inline * 1e6:8.2f} us/call, '
+        f'pre-built {prebuilt * 1e6:8.2f} us/call '
+        f'({(1 - prebuilt / inline) * 100:5.1f}% less)'
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=5_000)
+    args = parser.parse_args()
+
+    report('statement', *bench_statement(args.iterations))
+    report('execute', *asyncio.run(bench_execute(args.iterations)))
@@ -26,4 +26,4 @@ fi
 
 echo "Both scripts executed successfully."
 
-poetry run uvicorn --host 0.0.0.0 --port 8000 src.app:app
\ No newline at end of file
+poetry run python -m src.utils.serve
\ No newline at end of file
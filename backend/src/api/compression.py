@@ -0,0 +1,189 @@
+"""
+Negotiated compression of the response bodies.
+
+`CompressionMiddleware` compresses a response with the encoding the
+`Accept-Encoding` header of the request prefers among gzip, br (Brotli)
+and zstd (Zstandard). Equal qualities go to zstd, then br, as they
+compress faster and smaller than gzip. Brotli and Zstandard are optional
+dependencies, installed with the `compression` extra, and imported on
+first use.
+
+Bodies smaller than the minimum size are sent as they are, as are those
+already encoded and streamed responses, such as the event stream and the
+exports, which would have to be held back until their end.
+
+The compressed bodies of the last distinct responses are kept, keyed by
+the digest of the body and the encoding, so that hot responses, e.g. the
+first page of a list, are compressed once instead of on every request.
+Hashing a body is much cheaper than compressing it. Hits are counted in
+the `compression_cache_hits` metric.
+"""
+
+import gzip
+import hashlib
+from collections import OrderedDict
+from functools import cache
+from typing import Any
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.api.negotiation import accept_qualities
+from src.core.metrics import metrics
+
+# By order of preference for equal qualities
+ENCODINGS = ('zstd', 'br', 'gzip')
+
+
+@cache
+def _brotli() -> Any:
+    """
+    :return: The `brotli` module, or None if it is not installed.
+    """
+    try:
+        import brotli  # noqa: PLC0415
+    except ImportError:  # pragma: no cover
+        return None
+
+    return brotli
+
+
+@cache
+def _zstandard() -> Any:
+    """
+    :return: The `zstandard` module, or None if it is not installed.
+    """
+    try:
+        import zstandard  # noqa: PLC0415
+    except ImportError:  # pragma: no cover
+        return None
+
+    return zstandard
+
+
+def available_encodings() -> tuple[str, ...]:
+    modules = {'zstd': _zstandard, 'br': _brotli}
+    return tuple(
+        encoding
+        for encoding in ENCODINGS
+        if encoding not in modules or modules[encoding]() is not None
+    )
+
+
+def choose_encoding(accept_encoding: str | None) -> str | None:
+    """
+    :param accept_encoding: The `Accept-Encoding` header of the request.
+    :return: The available encoding preferred by the client, or None to
+        send the body as it is.
+    """
+    if not accept_encoding:
+        return None
+
+    qualities = accept_qualities(accept_encoding)
+    default = qualities.get('*', 0)
+    best, best_quality = None, 0.0
+    for encoding in available_encodings():
+        quality = qualities.get(encoding, default)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str, level: int) -> bytes:
+    if encoding == 'zstd':
+        compressed: bytes = (
+            _zstandard().ZstdCompressor(level=level).compress(body)
+        )
+        return compressed
+    if encoding == 'br':
+        return bytes(_brotli().compress(body, quality=level))
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1000,
+        levels: dict[str, int] | None = None,
+        cache_size: int = 256,
+    ) -> None:
+        """
+        :param app: The app whose responses are compressed.
+        :param minimum_size: The size of the smallest body compressed, in
+            bytes.
+        :param levels: The compression level of each encoding, the
+            default level of the encoding if missing.
+        :param cache_size: The number of compressed bodies kept, 0 to
+            compress every response.
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {'zstd': 3, 'br': 4, 'gzip': 6, **(levels or {})}
+        self.cache_size = cache_size
+        self._cache: OrderedDict[tuple[str, bytes], bytes] = OrderedDict()
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        """
+        Compress a body, or take its compressed body from the cache.
+        """
+        if not self.cache_size:
+            return compress(body, encoding, self.levels[encoding])
+
+        key = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+        compressed = self._cache.get(key)
+        if compressed is not None:
+            self._cache.move_to_end(key)
+            metrics.incr('compression_cache_hits')
+            return compressed
+
+        compressed = compress(body, encoding, self.levels[encoding])
+        self._cache[key] = compressed
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return compressed
+
+    async def __call__(
+        self, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get('accept-encoding'))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        # Held back until the first part of the body tells whether the
+        # response is compressed
+        start: Message | None = None
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start
+            if message['type'] == 'http.response.start':
+                start = message
+                return
+            if start is None:
+                # The rest of a response sent as it is
+                await send(message)
+                return
+
+            headers = MutableHeaders(raw=start['headers'])
+            body = message.get('body', b'')
+            if not (
+                message.get('more_body', False)
+                or 'content-encoding' in headers
+                or len(body) < self.minimum_size
+            ):
+                body = self.compress(body, encoding)
+                headers['Content-Encoding'] = encoding
+                headers['Content-Length'] = str(len(body))
+                headers.add_vary_header('Accept-Encoding')
+                message = {**message, 'body': body}
+
+            await send(start)
+            start = None
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
@@ -1,63 +1,179 @@
 from http import HTTPStatus
-from typing import Annotated, AsyncGenerator
+from typing import Annotated, Any, AsyncGenerator
 
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jwt import ExpiredSignatureError, PyJWTError, decode
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from src.core.database import AsyncSessionLocal
+from src.core.database import session_factories
 from src.core.settings import settings
 from src.models import User
+from src.schemas.token import Principal
+from src.services import revocation_service, statements
+from src.services.login_throttle import (
+    DatabaseThrottleBackend,
+    LoginThrottle,
+    memory_backend,
+)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='/auth/token')
 
 
+# Each kind of work takes its sessions from its own pool, see
+# `DB_POOL_SIZES`
+
+
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
-    async with AsyncSessionLocal() as session:  # pragma: no cover
+    """
+    Session of the reads of the catalogue and the accounts.
+    """
+    async with session_factories['read']() as session:  # pragma: no cover
+        yield session
+
+
+async def get_write_session() -> AsyncGenerator[AsyncSession, None]:
+    async with session_factories['write']() as session:  # pragma: no cover
+        yield session
+
+
+async def get_auth_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session of the logins and the checks of the tokens of each request.
+    """
+    async with session_factories['auth']() as session:  # pragma: no cover
+        yield session
+
+
+async def get_bulk_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Session of the exports, streams and batch operations, which may hold
+    their connection for long.
+    """
+    async with session_factories['bulk']() as session:  # pragma: no cover
         yield session
 
 
+def get_write_session_factory() -> async_sessionmaker[AsyncSession]:
+    """
+    Factory of the write sessions of the background tasks, which run once
+    the sessions of their request are closed.
+    """
+    return session_factories['write']  # pragma: no cover
+
+
 SessionDep = Annotated[AsyncSession, Depends(get_session)]
+WriteSessionDep = Annotated[AsyncSession, Depends(get_write_session)]
+AuthSessionDep = Annotated[AsyncSession, Depends(get_auth_session)]
+BulkSessionDep = Annotated[AsyncSession, Depends(get_bulk_session)]
+WriteSessionFactoryDep = Annotated[
+    async_sessionmaker[AsyncSession], Depends(get_write_session_factory)
+]
 TokenDep = Annotated[str, Depends(oauth2_scheme)]
 
 
-async def get_current_user(session: SessionDep, token: TokenDep) -> User:
-    credentials_exception = HTTPException(
+def get_login_throttle(session: AuthSessionDep) -> LoginThrottle:
+    if settings.LOGIN_THROTTLE_BACKEND == 'database':
+        return LoginThrottle(DatabaseThrottleBackend(session))
+
+    return LoginThrottle(memory_backend)
+
+
+LoginThrottleDep = Annotated[LoginThrottle, Depends(get_login_throttle)]
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=HTTPStatus.UNAUTHORIZED,
         detail='Could not validate credentials.',
         headers={'WWW-Authenticate': 'Bearer'},
     )
 
+
+def decode_access_token(token: str) -> dict[str, Any]:
     try:
-        payload = decode(
+        payload: dict[str, Any] = decode(
             token, settings.SECRET_KEY, algorithms=settings.ALGORITHM
         )
-        email = payload.get('sub')
-        if not email:
-            raise credentials_exception
     except ExpiredSignatureError:
-        raise credentials_exception
+        raise _credentials_exception()
     except PyJWTError:
-        raise credentials_exception
+        raise _credentials_exception()
+
+    if not payload.get('sub'):
+        raise _credentials_exception()
+
+    return payload
+
+
+async def _ensure_not_revoked(
+    session: AsyncSession, payload: dict[str, Any]
+) -> None:
+    if await revocation_service.is_token_revoked(session, payload):
+        raise _credentials_exception()
 
+
+async def _get_user_from_payload(
+    session: AsyncSession, payload: dict[str, Any]
+) -> User:
     async with session:
-        user_db = await session.scalar(select(User).where(User.email == email))
+        user_db = await session.scalar(
+            statements.user_by_email, {'user_email': payload['sub']}
+        )
 
     if not user_db:
-        raise credentials_exception
+        raise _credentials_exception()
 
     return user_db
 
 
+async def get_current_user(session: AuthSessionDep, token: TokenDep) -> User:
+    payload = decode_access_token(token)
+    await _ensure_not_revoked(session, payload)
+
+    return await _get_user_from_payload(session, payload)
+
+
 CurrentUser = Annotated[User, Depends(get_current_user)]
 
 
-async def get_current_active_superuser(current_user: CurrentUser) -> User:
-    if not current_user.is_superuser:
+async def get_current_principal(
+    session: AuthSessionDep, token: TokenDep
+) -> Principal:
+    """
+    Identify the caller for routes that only need to authorize the request.
+
+    In the 'claims' token mode the id and role are read from the access
+    token, without loading the user from the database. Tokens without these
+    claims, or the 'lookup' mode, fall back to loading the user. In both
+    modes revoked tokens are rejected.
+    """
+    payload = decode_access_token(token)
+    await _ensure_not_revoked(session, payload)
+
+    if settings.ACCESS_TOKEN_MODE == 'claims' and 'uid' in payload:
+        return Principal(
+            id=payload['uid'],
+            email=payload['sub'],
+            is_superuser=payload.get('su', False),
+        )
+
+    user_db = await _get_user_from_payload(session, payload)
+
+    return Principal(
+        id=user_db.id, email=user_db.email, is_superuser=user_db.is_superuser
+    )
+
+
+CurrentPrincipal = Annotated[Principal, Depends(get_current_principal)]
+
+
+async def get_current_active_superuser(
+    principal: CurrentPrincipal,
+) -> Principal:
+    if not principal.is_superuser:
         raise HTTPException(
             status_code=HTTPStatus.FORBIDDEN,
             detail='Insufficient permissions.',
         )
-    return current_user
+    return principal
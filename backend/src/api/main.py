@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from src.api.routes import auth, author, books, supersuser, users
+from src.api.routes import auth, author, books, events, supersuser, users
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix='/auth', tags=['auth'])
@@ -10,3 +10,4 @@ api_router.include_router(
 api_router.include_router(users.router, prefix='/users', tags=['users'])
 api_router.include_router(author.router, prefix='/author', tags=['author'])
 api_router.include_router(books.router, prefix='/book', tags=['book'])
+api_router.include_router(events.router, prefix='/events', tags=['events'])
@@ -0,0 +1,255 @@
+"""
+Content negotiation and response encoding for the API routes.
+
+Routes of routers created with `route_class=NegotiatedRoute` answer with
+MessagePack when the `Accept` header prefers `application/msgpack` to JSON,
+and accept request bodies sent with that content type. JSON stays the
+default, error responses are always JSON, and responses built by the routes
+themselves, such as streams, are left as they are.
+
+Bodies are encoded by pydantic-core, straight to bytes. A route returning
+an instance of its response model, or of a member of a union response
+model, has it encoded as is: FastAPI would otherwise dump it to a dict,
+validate the dict back into a model, then dump it again before encoding.
+Other return values, such as dicts and ORM objects, are still validated
+against the response model.
+
+msgpack is an optional dependency, installed with the `msgpack` extra, and
+imported on first use. Without it, responses are JSON and MessagePack
+request bodies are rejected with 415 Unsupported Media Type.
+"""
+
+from contextvars import ContextVar
+from functools import cache, wraps
+from http import HTTPStatus
+from inspect import iscoroutinefunction
+from types import UnionType
+from typing import (
+    Any,
+    Callable,
+    Coroutine,
+    Literal,
+    Union,
+    get_args,
+    get_origin,
+)
+
+from fastapi import HTTPException, Request, Response
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from pydantic_core import to_json, to_jsonable_python
+
+MSGPACK_MEDIA_TYPE = 'application/msgpack'
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, 'application/x-msgpack')
+
+# Format of the response being rendered by a negotiated route
+response_format: ContextVar[Literal['json', 'msgpack']] = ContextVar(
+    'response_format', default='json'
+)
+
+
+@cache
+def _msgpack() -> Any:
+    """
+    Import msgpack on first use, so that it is not loaded when the app is
+    imported.
+
+    :return: The `msgpack` module, or None if it is not installed.
+    """
+    try:
+        import msgpack  # noqa: PLC0415
+    except ImportError:  # pragma: no cover
+        return None
+
+    return msgpack
+
+
+def _media_type(header: str) -> str:
+    return header.split(';', 1)[0].strip().lower()
+
+
+def accept_qualities(header: str) -> dict[str, float]:
+    """
+    Parse an `Accept` or `Accept-Encoding` header.
+
+    :param header: The value of the header.
+    :return: The quality of each value listed, lower-cased. Invalid
+        qualities are taken as 0.
+    """
+    qualities: dict[str, float] = {}
+    for item in header.split(','):
+        value, *params = item.split(';')
+        quality = 1.0
+        for param in params:
+            name, _, param_value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(param_value)
+                except ValueError:
+                    quality = 0
+        qualities[value.strip().lower()] = quality
+    return qualities
+
+
+def prefers_msgpack(accept: str | None) -> bool:
+    """
+    Whether an `Accept` header prefers MessagePack to JSON.
+
+    Ties, e.g. both listed without a quality, go to MessagePack, as the
+    client asked for it explicitly.
+    """
+    if not accept:
+        return False
+
+    qualities = accept_qualities(accept)
+    msgpack_quality = max(qualities.get(t, 0) for t in MSGPACK_MEDIA_TYPES)
+    json_quality = qualities.get(
+        'application/json',
+        qualities.get('application/*', qualities.get('*/*', 0)),
+    )
+    return msgpack_quality > 0 and msgpack_quality >= json_quality
+
+
+class NegotiatedResponse(JSONResponse):
+    """
+    JSON response, rendered as MessagePack when the route negotiated it.
+
+    The content may hold model instances, which are serialised by alias.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if response_format.get() == 'msgpack':
+            self.media_type = MSGPACK_MEDIA_TYPE
+            packed: bytes = _msgpack().packb(
+                to_jsonable_python(content, by_alias=True)
+            )
+            return packed
+
+        return to_json(content, by_alias=True)
+
+
+def _model_types(response_model: Any) -> tuple[type[BaseModel], ...]:
+    # The models of a response model, or of the members of a union
+    if get_origin(response_model) in {Union, UnionType}:
+        members = get_args(response_model)
+    else:
+        members = (response_model,)
+    return tuple(
+        member
+        for member in members
+        if isinstance(member, type) and issubclass(member, BaseModel)
+    )
+
+
+class MsgPackRequest(Request):
+    """
+    Request with a MessagePack body, decoded where FastAPI decodes JSON.
+    """
+
+    async def json(self) -> Any:
+        return _msgpack().unpackb(await self.body())
+
+
+def _as_json_request(request: Request) -> Request:
+    # FastAPI only decodes bodies whose content type is JSON
+    headers = [
+        (name, value)
+        for name, value in request.scope['headers']
+        if name != b'content-type'
+    ]
+    headers.append((b'content-type', b'application/json'))
+    return MsgPackRequest(
+        {**request.scope, 'headers': headers}, request.receive
+    )
+
+
+class NegotiatedRoute(APIRoute):
+    def __init__(
+        self, path: str, endpoint: Callable[..., Any], **kwargs: Any
+    ) -> None:
+        # Unless the route sets a response class of its own
+        response_class = kwargs.get('response_class')
+        if response_class is None or isinstance(
+            response_class, DefaultPlaceholder
+        ):
+            kwargs['response_class'] = DefaultPlaceholder(NegotiatedResponse)
+        super().__init__(path, endpoint, **kwargs)
+
+    def _filters_response(self) -> bool:
+        return bool(
+            self.response_model_include
+            or self.response_model_exclude
+            or not self.response_model_by_alias
+            or self.response_model_exclude_unset
+            or self.response_model_exclude_defaults
+            or self.response_model_exclude_none
+        )
+
+    def _respond_with_models(
+        self, endpoint: Callable[..., Coroutine[Any, Any, Any]]
+    ) -> Callable[..., Coroutine[Any, Any, Any]]:
+        """
+        Wrap an endpoint so that the instances of its response models it
+        returns are sent without being validated again.
+
+        Only exact instances are: those of subclasses may hold fields that
+        the response model leaves out.
+        """
+        models = _model_types(self.response_model)
+        status_code = self.status_code or HTTPStatus.OK
+
+        @wraps(endpoint)
+        async def endpoint_with_models(**values: Any) -> Any:
+            content = await endpoint(**values)
+            if type(content) in models:
+                return NegotiatedResponse(content, status_code=status_code)
+            return content
+
+        return endpoint_with_models
+
+    def get_route_handler(
+        self,
+    ) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        response_class = self.response_class
+        if isinstance(response_class, DefaultPlaceholder):
+            response_class = response_class.value
+        if (
+            response_class is NegotiatedResponse
+            and _model_types(self.response_model)
+            and not self._filters_response()
+            and iscoroutinefunction(self.dependant.call)
+        ):
+            self.dependant.call = self._respond_with_models(
+                self.dependant.call
+            )
+        handler = super().get_route_handler()
+
+        async def negotiated_handler(request: Request) -> Response:
+            content_type = request.headers.get('content-type')
+            if content_type and _media_type(content_type) in (
+                MSGPACK_MEDIA_TYPES
+            ):
+                if _msgpack() is None:
+                    raise HTTPException(
+                        status_code=HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+                        detail='MessagePack is not installed.',
+                    )
+                request = _as_json_request(request)
+
+            msgpack = _msgpack() is not None and prefers_msgpack(
+                request.headers.get('accept')
+            )
+            token = response_format.set('msgpack' if msgpack else 'json')
+            try:
+                response = await handler(request)
+            finally:
+                response_format.reset(token)
+
+            if isinstance(response, NegotiatedResponse):
+                # For caches, as the body depends on the Accept header
+                response.headers['Vary'] = 'Accept'
+            return response
+
+        return negotiated_handler
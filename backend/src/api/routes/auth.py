@@ -1,51 +1,161 @@
 from http import HTTPStatus
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    HTTPException,
+    Request,
+)
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy import select
 
-from src.api.dependencies import CurrentUser, SessionDep
-from src.core.security import create_access_token, verify_password
-from src.models import User
-from src.schemas.token import Token
+from src.api.dependencies import (
+    AuthSessionDep,
+    CurrentUser,
+    LoginThrottleDep,
+    WriteSessionFactoryDep,
+)
+from src.api.negotiation import NegotiatedRoute
+from src.core.security import (
+    create_user_access_token,
+    verify_and_update_password,
+)
+from src.core.settings import settings
+from src.schemas.base import Message
+from src.schemas.token import RefreshTokenRequest, Token
+from src.services import statements, token_service, user_service
 
-router = APIRouter()
+router = APIRouter(route_class=NegotiatedRoute)
 
 
 @router.post('/token', status_code=HTTPStatus.OK, response_model=Token)
-async def access_token(
-    session: SessionDep, form_data: OAuth2PasswordRequestForm = Depends()
+async def access_token(  # noqa: PLR0913, PLR0917
+    session: AuthSessionDep,
+    session_factory: WriteSessionFactoryDep,
+    throttle: LoginThrottleDep,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    form_data: OAuth2PasswordRequestForm = Depends(),
 ) -> Token:
     """
     Generate an access token for a user.
+
+    In the 'claims' token mode, a refresh token is returned as well. Password
+    hashes made with outdated argon2 costs are replaced after the response
+    is sent. Repeated failures for an account or from a client IP are
+    throttled before any password is verified.
     """
+    client_ip = request.client.host if request.client else None
+
+    # Counted as a failure until the password is verified, so that
+    # concurrent attempts are throttled too
+    attempt = await throttle.acquire(form_data.username, client_ip)
+    if attempt.retry_after:
+        raise HTTPException(
+            status_code=HTTPStatus.TOO_MANY_REQUESTS,
+            detail='Too many login attempts. Try again later.',
+            headers={'Retry-After': str(attempt.retry_after)},
+        )
+
     async with session.begin():
         user = await session.scalar(
-            select(User).where(User.email == form_data.username)
+            statements.user_by_email, {'user_email': form_data.username}
         )
 
-    if not user:
+    verified, updated_hash = (
+        verify_and_update_password(form_data.password, user.password_hash)
+        if user
+        else (False, None)
+    )
+    if not user or not verified:
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail='Incorrect email or password.',
         )
 
-    if not verify_password(form_data.password, user.password_hash):
-        raise HTTPException(
-            status_code=HTTPStatus.BAD_REQUEST,
-            detail='Incorrect email or password.',
+    await throttle.release(attempt)
+    await throttle.reset(form_data.username)
+
+    if updated_hash:
+        background_tasks.add_task(
+            user_service.update_password_hash,
+            session_factory=session_factory,
+            user_id=user.id,
+            old_hash=user.password_hash,
+            new_hash=updated_hash,
         )
 
-    access_token = create_access_token(data={'sub': user.email})
+    access_token = create_user_access_token(
+        user_id=user.id, email=user.email, is_superuser=user.is_superuser
+    )
+
+    refresh_token = None
+    if settings.ACCESS_TOKEN_MODE == 'claims':
+        refresh_token = await token_service.add_refresh_token(
+            session=session, user_id=user.id
+        )
 
-    return Token(access_token=access_token, token_type='bearer')
+    return Token(
+        access_token=access_token,
+        token_type='bearer',
+        refresh_token=refresh_token,
+    )
 
 
-@router.post('/refresh_token', response_model=Token)
+@router.post(
+    '/refresh_token',
+    response_model=Token,
+    responses={HTTPStatus.GONE: {'model': Message}},
+)
 async def refresh_access_token(user: CurrentUser) -> Token:
     """
     Refreshes the access token for an authenticated user.
+
+    Not available in the 'claims' token mode, where access tokens are only
+    renewed by rotating a refresh token with `/auth/refresh`: extending an
+    access token by itself would bypass the detection of reused refresh
+    tokens.
     """
-    new_access_token = create_access_token(data={'sub': user.email})
+    if settings.ACCESS_TOKEN_MODE == 'claims':
+        raise HTTPException(
+            status_code=HTTPStatus.GONE,
+            detail='Use /auth/refresh with a refresh token.',
+        )
+
+    new_access_token = create_user_access_token(
+        user_id=user.id, email=user.email, is_superuser=user.is_superuser
+    )
 
     return Token(access_token=new_access_token, token_type='bearer')
+
+
+@router.post('/refresh', response_model=Token)
+async def rotate_refresh_token(
+    session: AuthSessionDep, token_in: RefreshTokenRequest
+) -> Token:
+    """
+    Exchange a refresh token for a new access token and refresh token.
+
+    Each refresh token can only be used once.
+    """
+    rotated = await token_service.rotate_refresh_token(
+        session=session, refresh_token=token_in.refresh_token
+    )
+
+    if not rotated:
+        raise HTTPException(
+            status_code=HTTPStatus.UNAUTHORIZED,
+            detail='Invalid refresh token.',
+            headers={'WWW-Authenticate': 'Bearer'},
+        )
+
+    user, new_refresh_token = rotated
+    new_access_token = create_user_access_token(
+        user_id=user.id, email=user.email, is_superuser=user.is_superuser
+    )
+
+    return Token(
+        access_token=new_access_token,
+        token_type='bearer',
+        refresh_token=new_refresh_token,
+    )
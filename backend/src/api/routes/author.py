@@ -1,10 +1,21 @@
+import json
 from http import HTTPStatus
-from typing import Any
+from typing import Any, AsyncIterator
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.dependencies import SessionDep, get_current_user
+from src.api.dependencies import (
+    BulkSessionDep,
+    SessionDep,
+    WriteSessionDep,
+    get_current_principal,
+)
+from src.api.negotiation import NegotiatedRoute
+from src.core.settings import settings
 from src.schemas.authors import (
+    AuthorChanges,
     AuthorList,
     AuthorPublic,
     AuthorSchema,
@@ -12,17 +23,39 @@ from src.schemas.authors import (
 )
 from src.schemas.base import Message
 from src.services import author_service
+from src.services.catalog_replica import get_reader
+from src.services.change_feed import CURSOR_PATTERN
+
+router = APIRouter(route_class=NegotiatedRoute)
+
 
-router = APIRouter()
+async def authors_json_stream(
+    session: AsyncSession, author_name: str | None
+) -> AsyncIterator[str]:
+    """
+    Encode the authors as a JSON array, one chunk of authors at a time.
+    """
+    separator = ''
+    yield '['
+
+    async for rows in author_service.stream_authors(session, author_name):
+        # One encoder call per chunk, without the enclosing brackets
+        encoded = json.dumps([
+            {'id': author_id, 'name': name} for author_id, name in rows
+        ])
+        yield separator + encoded[1:-1]
+        separator = ','
+
+    yield ']'
 
 
 @router.post(
     '',
     response_model=AuthorPublic,
     status_code=HTTPStatus.CREATED,
-    dependencies=[Depends(get_current_user)],
+    dependencies=[Depends(get_current_principal)],
 )
-async def add_author(author_in: AuthorSchema, session: SessionDep) -> Any:
+async def add_author(author_in: AuthorSchema, session: WriteSessionDep) -> Any:
     """
     Adds a new author.
     """
@@ -43,11 +76,67 @@ async def add_author(author_in: AuthorSchema, session: SessionDep) -> Any:
     return new_author
 
 
+@router.get('/changes', response_model=AuthorChanges)
+async def get_author_changes(
+    session: SessionDep,
+    since: str = Query(default='0', pattern=CURSOR_PATTERN),
+    limit: int = Query(default=100, gt=0, le=1000),
+) -> Any:
+    """
+    Get the authors changed or deleted since a catalogue version.
+
+    Start with `since=0` for a full sync, then send the returned `since`
+    to only receive the later changes. Fetch again right away while
+    `has_more` is true.
+    """
+    return await author_service.get_author_changes(
+        session=session, since=since, limit=limit
+    )
+
+
+@router.get(
+    '/stream',
+    response_class=StreamingResponse,
+    responses={
+        HTTPStatus.OK: {
+            'content': {
+                'application/json': {
+                    'schema': {
+                        'type': 'array',
+                        'items': AuthorPublic.model_json_schema(),
+                    }
+                }
+            }
+        }
+    },
+)
+async def stream_authors(
+    session: BulkSessionDep, name: str | None = None
+) -> StreamingResponse:
+    """
+    Get all the authors, optionally filtered by name (like search), as a
+    JSON array streamed in chunks ordered by ID.
+
+    Meant for callers that need the whole list; the paginated list returns
+    at most `AUTHORS_MAX_PAGE_SIZE` authors per request.
+    """
+    return StreamingResponse(
+        authors_json_stream(session, name), media_type='application/json'
+    )
+
+
 @router.get('/{author_id}', response_model=AuthorPublic)
 async def get_author_by_id(author_id: int, session: SessionDep) -> Any:
     """
     Get an author by their ID.
     """
+    reader = get_reader()
+    if reader is not None:
+        author = reader.author(author_id)
+        # Not replicated yet when just added
+        if author:
+            return AuthorPublic(**author._asdict())
+
     author_db = await author_service.get_author_by_id(
         session=session, author_id=author_id
     )
@@ -70,11 +159,34 @@ async def get_authors_with_name_like(
 ) -> Any:
     """
     Get authors by filtering by name (like search).
+
+    Pages hold at most `AUTHORS_MAX_PAGE_SIZE` authors, which is also the
+    page size when no limit is given; larger limits are rejected. Page
+    through the list, or use `/author/stream`, to get them all.
     """
+    if limit is not None and limit > settings.AUTHORS_MAX_PAGE_SIZE:
+        raise HTTPException(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+            detail=(
+                f'The limit is at most {settings.AUTHORS_MAX_PAGE_SIZE} '
+                'authors.'
+            ),
+        )
+
+    reader = get_reader()
+    if reader is not None:
+        authors, total_results = reader.authors(
+            author_service.authors_page_size(limit), offset, name
+        )
+        return AuthorList(
+            authors=[AuthorPublic(**author._asdict()) for author in authors],
+            total_results=total_results,
+        )
+
     (
         authors_list,
         total_rows_db,
-    ) = await author_service.get_filtered_authors_list(
+    ) = await author_service.get_filtered_authors_list_shared(
         session=session, offset=offset, limit=limit, author_name=name
     )
 
@@ -84,12 +196,12 @@ async def get_authors_with_name_like(
 @router.patch(
     '/{author_id}',
     response_model=AuthorPublic,
-    dependencies=[Depends(get_current_user)],
+    dependencies=[Depends(get_current_principal)],
 )
 async def update_author(
     author_id: int,
     author_in: AuthorSchema,
-    session: SessionDep,
+    session: WriteSessionDep,
 ) -> Any:
     """
     Update an author's name.
@@ -114,10 +226,10 @@ async def update_author(
 @router.delete(
     '/{author_id}',
     response_model=Message,
-    dependencies=[Depends(get_current_user)],
+    dependencies=[Depends(get_current_principal)],
 )
 async def delete_author(
-    session: SessionDep,
+    session: WriteSessionDep,
     author_id: int,
 ) -> Message:
     """
@@ -143,10 +255,10 @@ async def delete_author(
 @router.post(
     '/delete/batch',
     response_model=Message,
-    dependencies=[Depends(get_current_user)],
+    dependencies=[Depends(get_current_principal)],
 )
 async def delete_author_batch(
-    session: SessionDep,
+    session: BulkSessionDep,
     authors_ids: DeteleAuthosBulk,
 ) -> Message:
     """
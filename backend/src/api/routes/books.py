@@ -1,30 +1,97 @@
 from http import HTTPStatus
-from typing import Any
+from typing import Any, Literal, Sequence
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 
-from src.api.dependencies import CurrentUser, SessionDep, get_current_user
+from src.api.dependencies import (
+    BulkSessionDep,
+    SessionDep,
+    WriteSessionDep,
+    get_current_principal,
+)
+from src.api.negotiation import NegotiatedRoute
+from src.core.catalog_snapshot import BookRecord
 from src.schemas.base import Message
 from src.schemas.books import (
+    BookChanges,
+    BookColumns,
     BookList,
     BookPublic,
     BookResponseCreate,
     BookSchema,
     BookUpdate,
+    ColumnarBookList,
+    CompactBookList,
     DeteleBooksBulk,
 )
-from src.services import author_service, book_service
+from src.services import author_service, book_service, catalog_export
+from src.services.catalog_export import (
+    FILE_EXTENSIONS,
+    MEDIA_TYPES,
+    ExportFormat,
+)
+from src.services.catalog_replica import get_reader
+from src.services.change_feed import CURSOR_PATTERN
+
+router = APIRouter(route_class=NegotiatedRoute)
+
+BookListFormat = Literal['full', 'compact', 'columnar']
+
+
+def book_list_content(
+    books: Sequence[Any], total_results: int, list_format: BookListFormat
+) -> BookList | CompactBookList | ColumnarBookList:
+    """
+    Lay out a page of books in one of the list formats.
+
+    :param books: Objects with the `id`, `title`, `year`, `author` and
+        `author_id` of the books.
+    :param total_results: The number of books matching the filters.
+    :param list_format: 'full' repeats the name of the author in every
+        book. 'compact' gives the ID of the author instead, with the names
+        in a lookup table, and 'columnar' also turns the books into one
+        array per field.
+    :return: A `BookList`, `CompactBookList` or `ColumnarBookList`.
+    """
+    # Validated from the attributes of the books in a single pass, which
+    # is faster than building their models one by one
+    if list_format == 'full':
+        return BookList.model_validate(
+            {'books': books, 'total_results': total_results},
+            from_attributes=True,
+        )
+
+    authors = {book.author_id: book.author for book in books}
+    if list_format == 'compact':
+        return CompactBookList.model_validate(
+            {
+                'books': books,
+                'authors': authors,
+                'total_results': total_results,
+            },
+            from_attributes=True,
+        )
 
-router = APIRouter()
+    return ColumnarBookList(
+        books=BookColumns(
+            id=[book.id for book in books],
+            title=[book.title for book in books],
+            year=[book.year for book in books],
+            author_id=[book.author_id for book in books],
+        ),
+        authors=authors,
+        total_results=total_results,
+    )
 
 
 @router.post(
     '',
     response_model=BookResponseCreate,
     status_code=HTTPStatus.CREATED,
-    dependencies=[Depends(get_current_user)],
+    dependencies=[Depends(get_current_principal)],
 )
-async def add_book(session: SessionDep, book_in: BookSchema) -> Any:
+async def add_book(session: WriteSessionDep, book_in: BookSchema) -> Any:
     """
     Add a new book.
 
@@ -57,12 +124,88 @@ async def add_book(session: SessionDep, book_in: BookSchema) -> Any:
     )
 
 
+@router.get('/changes', response_model=BookChanges)
+async def get_book_changes(
+    session: SessionDep,
+    since: str = Query(default='0', pattern=CURSOR_PATTERN),
+    limit: int = Query(default=100, gt=0, le=1000),
+) -> Any:
+    """
+    Get the books changed or deleted since a catalogue version.
+
+    Start with `since=0` for a full sync, then send the returned `since`
+    to only receive the later changes. Fetch again right away while
+    `has_more` is true.
+    """
+    changes = await book_service.get_book_changes(
+        session=session, since=since, limit=limit
+    )
+
+    return BookChanges(
+        changed=[
+            BookPublic(**book.to_dict(), author=book.author.name)
+            for book in changes.changed
+        ],
+        deleted=changes.deleted,
+        version=changes.version,
+        has_more=changes.has_more,
+        since=changes.since,
+    )
+
+
+@router.get(
+    '/export',
+    response_class=StreamingResponse,
+    responses={
+        HTTPStatus.OK: {
+            'content': {media_type: {} for media_type in MEDIA_TYPES.values()}
+        },
+        HTTPStatus.NOT_IMPLEMENTED: {'model': Message},
+    },
+)
+async def export_books(
+    session: BulkSessionDep,
+    format: ExportFormat = 'arrow',
+    title: str | None = None,
+    year: int | None = None,
+) -> StreamingResponse:
+    """
+    Export the books filtered by title (like search) and/or year, with the
+    name of their author, as an Arrow IPC stream or a Parquet file.
+
+    Meant for analytics: the columns load directly into pandas or any
+    Arrow-based tool, e.g. with `pyarrow.ipc.open_stream`.
+    """
+    if not catalog_export.is_available():
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_IMPLEMENTED,
+            detail='The columnar export is not installed.',
+        )
+
+    return StreamingResponse(
+        catalog_export.encode_books(session, format, title, year),
+        media_type=MEDIA_TYPES[format],
+        headers={
+            'Content-Disposition': (
+                f'attachment; filename="books.{FILE_EXTENSIONS[format]}"'
+            )
+        },
+    )
+
+
 @router.get('/{book_id}', response_model=BookPublic)
 async def get_book_by_id(book_id: int, session: SessionDep) -> Any:
     """
     Get a book by ID.
     """
-    book_db = await book_service.get_book_by_id(
+    reader = get_reader()
+    if reader is not None:
+        book = reader.book(book_id)
+        # Not replicated yet when just added
+        if book:
+            return BookPublic(**book._asdict())
+
+    book_db = await book_service.get_book_by_id_shared(
         session=session, book_id=book_id
     )
 
@@ -74,35 +217,66 @@ async def get_book_by_id(book_id: int, session: SessionDep) -> Any:
     return BookPublic(**book_db.to_dict(), author=book_db.author.name)
 
 
-@router.get('', response_model=BookList)
-async def get_books_like(
+@router.get('', response_model=BookList | CompactBookList | ColumnarBookList)
+async def get_books_like(  # noqa: PLR0913, PLR0917
     session: SessionDep,
     title: str | None = None,
     year: int | None = None,
     limit: int = 20,
     offset: int = 0,
+    format: BookListFormat = 'full',
 ) -> Any:
     """
     Get a list of books filtered by title (like search) and/or year.
-    """
-    books, total_results = await book_service.get_books_list(
-        session=session,
-        book_title=title,
-        book_year=year,
-        limit=limit,
-        offset=offset,
-    )
 
-    book_list = [
-        BookPublic(**book.to_dict(), author=book.author.name) for book in books
-    ]
+    With `format=compact`, books hold the ID of their author, and the names
+    of the authors are listed once in `authors`. `format=columnar`
+    additionally returns the books as one array per field.
+    """
+    book_list: Sequence[Any]
+    reader = get_reader()
+    if reader is not None:
+        book_list, total_results = reader.books(limit, offset, title, year)
+    elif book_service.list_query_mode(session) == 'projection':
+        (
+            book_list,
+            total_results,
+        ) = await book_service.get_book_rows_list_shared(
+            session=session,
+            book_title=title,
+            book_year=year,
+            limit=limit,
+            offset=offset,
+        )
+    else:
+        books, total_results = await book_service.get_books_list_shared(
+            session=session,
+            book_title=title,
+            book_year=year,
+            limit=limit,
+            offset=offset,
+        )
+        book_list = [
+            BookRecord(
+                book.id,
+                book.title,
+                book.year,
+                book.author.name,
+                book.author_id,
+            )
+            for book in books
+        ]
 
-    return {'books': book_list, 'total_results': total_results}
+    return book_list_content(book_list, total_results, format)
 
 
-@router.patch('/{book_id}', response_model=BookPublic)
+@router.patch(
+    '/{book_id}',
+    response_model=BookPublic,
+    dependencies=[Depends(get_current_principal)],
+)
 async def update_book(
-    book_id: int, book: BookUpdate, session: SessionDep, user: CurrentUser
+    book_id: int, book: BookUpdate, session: WriteSessionDep
 ) -> Any:
     """
     Update the year of a book by its ID.
@@ -128,9 +302,9 @@ async def update_book(
 @router.delete(
     '/{book_id}',
     response_model=Message,
-    dependencies=[Depends(get_current_user)],
+    dependencies=[Depends(get_current_principal)],
 )
-async def delete_book(session: SessionDep, book_id: int) -> Message:
+async def delete_book(session: WriteSessionDep, book_id: int) -> Message:
     """
     Delete a book.
     """
@@ -151,10 +325,10 @@ async def delete_book(session: SessionDep, book_id: int) -> Message:
 @router.post(
     '/delete/batch',
     response_model=Message,
-    dependencies=[Depends(get_current_user)],
+    dependencies=[Depends(get_current_principal)],
 )
 async def delete_books_in_batch(
-    session: SessionDep,
+    session: BulkSessionDep,
     books_ids: DeteleBooksBulk,
 ) -> Message:
     """
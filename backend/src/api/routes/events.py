@@ -0,0 +1,53 @@
+import asyncio
+from typing import AsyncIterator
+
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+
+from src.api.negotiation import NegotiatedRoute
+from src.core.events import Subscription, broker
+from src.core.settings import settings
+
+router = APIRouter(route_class=NegotiatedRoute)
+
+
+async def event_stream(subscription: Subscription) -> AsyncIterator[str]:
+    """
+    Encode the messages of a subscription as a server-sent events stream,
+    with keep-alive comments while idle.
+    """
+    try:
+        yield ': connected\n\n'
+
+        while True:
+            try:
+                message = await asyncio.wait_for(
+                    subscription.get(), settings.EVENTS_KEEPALIVE_SECONDS
+                )
+            except TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+
+            if message is None:
+                break
+
+            yield message
+    finally:
+        broker.unsubscribe(subscription)
+
+
+@router.get('', response_class=StreamingResponse)
+async def stream_events() -> StreamingResponse:
+    """
+    Stream catalogue change notifications as server-sent events.
+
+    Each `book` or `author` event carries the action (`created`, `updated`
+    or `deleted`), the affected IDs and the catalogue version of the change.
+    The stream ends if the client falls too far behind; reconnect and catch
+    up with the change feeds from the last version received.
+    """
+    return StreamingResponse(
+        event_stream(broker.subscribe()),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
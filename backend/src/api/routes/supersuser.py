@@ -4,25 +4,33 @@ from typing import Any
 from fastapi import APIRouter, Depends, HTTPException
 
 from src.api.dependencies import (
-    CurrentUser,
+    CurrentPrincipal,
     SessionDep,
+    WriteSessionDep,
     get_current_active_superuser,
 )
+from src.api.negotiation import NegotiatedRoute
+from src.core.database import pool_status
+from src.core.metrics import metrics
 from src.schemas.base import Message
+from src.schemas.metrics import MetricsResponse
 from src.schemas.users import (
     SuperUserRequestCreate,
     SuperUserRequestUpdate,
     UserListResponse,
     UserResponse,
 )
-from src.services import user_service
+from src.services import revocation_service, user_service
 
-router = APIRouter(dependencies=[Depends(get_current_active_superuser)])
+router = APIRouter(
+    dependencies=[Depends(get_current_active_superuser)],
+    route_class=NegotiatedRoute,
+)
 
 
 @router.post('', response_model=UserResponse, status_code=HTTPStatus.CREATED)
 async def create_user(
-    session: SessionDep, user_in: SuperUserRequestCreate
+    session: WriteSessionDep, user_in: SuperUserRequestCreate
 ) -> Any:
     """
     Create a user account.
@@ -62,6 +70,48 @@ async def read_users(
     return {'users': users}
 
 
+@router.get('/metrics', response_model=MetricsResponse)
+async def read_metrics() -> Any:
+    """
+    Retrieve the runtime counters of the worker serving the request, and
+    the use of each of its connection pools.
+    """
+    return {'counters': metrics.snapshot(), 'pools': pool_status()}
+
+
+@router.post('/revocations/token/{jti}', response_model=Message)
+async def revoke_token(session: WriteSessionDep, jti: str) -> Message:
+    """
+    Revoke an access token by its ID (`jti` claim).
+    """
+    await revocation_service.revoke_token(session=session, jti=jti)
+
+    return Message(message='Token revoked.')
+
+
+@router.post('/revocations/user/{user_id}', response_model=Message)
+async def revoke_user_tokens(
+    session: WriteSessionDep, user_id: int
+) -> Message:
+    """
+    Revoke all the tokens issued to a user so far.
+    """
+    user_db = await user_service.get_user_by_id(
+        session=session, user_id=user_id
+    )
+
+    if not user_db:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail='User not found.'
+        )
+
+    await revocation_service.revoke_user_tokens(
+        session=session, user_id=user_id
+    )
+
+    return Message(message='User tokens revoked.')
+
+
 @router.get('/{user_id}', response_model=UserResponse)
 async def get_user_by_id(session: SessionDep, user_id: int) -> Any:
     """
@@ -81,7 +131,7 @@ async def get_user_by_id(session: SessionDep, user_id: int) -> Any:
 
 @router.patch('/{user_id}', response_model=UserResponse)
 async def update_user_info(
-    session: SessionDep, user_id: int, user_in: SuperUserRequestUpdate
+    session: WriteSessionDep, user_id: int, user_in: SuperUserRequestUpdate
 ) -> Any:
     """
     Update a user's account info.
@@ -120,7 +170,7 @@ async def update_user_info(
 
 @router.delete('/{user_id}', status_code=HTTPStatus.OK, response_model=Message)
 async def delete_user(
-    session: SessionDep, user_id: int, current_user: CurrentUser
+    session: WriteSessionDep, user_id: int, current_user: CurrentPrincipal
 ) -> Message:
     """
     Delete a user account by ID.
@@ -5,8 +5,9 @@ from fastapi import APIRouter, HTTPException
 
 from src.api.dependencies import (
     CurrentUser,
-    SessionDep,
+    WriteSessionDep,
 )
+from src.api.negotiation import NegotiatedRoute
 from src.schemas.base import Message
 from src.schemas.users import (
     PasswordChange,
@@ -16,13 +17,13 @@ from src.schemas.users import (
 )
 from src.services import user_service
 
-router = APIRouter()
+router = APIRouter(route_class=NegotiatedRoute)
 
 
 @router.post(
     '/singup', status_code=HTTPStatus.CREATED, response_model=UserResponse
 )
-async def singup(session: SessionDep, user_in: UserRequestCreate) -> Any:
+async def singup(session: WriteSessionDep, user_in: UserRequestCreate) -> Any:
     """
     Create an account.
     """
@@ -57,7 +58,7 @@ async def get_user_info_me(current_user: CurrentUser) -> Any:
 
 @router.patch('/me', response_model=UserResponse)
 async def update_user_info_me(
-    session: SessionDep,
+    session: WriteSessionDep,
     user_in: UserRequestUpdate,
     current_user: CurrentUser,
 ) -> Any:
@@ -89,7 +90,7 @@ async def update_user_info_me(
 
 @router.patch('/me/change-password', response_model=Message)
 async def update_password_me(
-    session: SessionDep,
+    session: WriteSessionDep,
     passwords: PasswordChange,
     current_user: CurrentUser,
 ) -> Any:
@@ -113,7 +114,7 @@ async def update_password_me(
 
 @router.delete('/me', response_model=Message)
 async def delete_user_me(
-    session: SessionDep, current_user: CurrentUser
+    session: WriteSessionDep, current_user: CurrentUser
 ) -> Message:
     """
     Delete own account.
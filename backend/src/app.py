@@ -1,10 +1,60 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from pathlib import Path
+from typing import AsyncIterator
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from src.api.compression import CompressionMiddleware
 from src.api.main import api_router
+from src.core.database import AsyncSessionLocal
+from src.core.events import broker
+from src.core.invalidation import bus, create_transport
+from src.core.settings import settings
 from src.schemas.base import Message
+from src.services import catalog_replica, revocation_service
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    async with AsyncSessionLocal() as session:
+        await revocation_service.revocation_list.rebuild(session)
+
+    tasks = [
+        asyncio.create_task(
+            revocation_service.run_revocation_maintenance(
+                AsyncSessionLocal, settings.REVOCATION_PURGE_INTERVAL_SECONDS
+            )
+        )
+    ]
+    transport = create_transport()
+    if transport is not None:
+        tasks.append(asyncio.create_task(bus.run(transport)))
+    if settings.CATALOG_REPLICA:
+        if settings.CATALOG_SNAPSHOT_PATH:
+            catalog_replica.shared.enable(Path(settings.CATALOG_SNAPSHOT_PATH))
+        await catalog_replica.sync_catalog(AsyncSessionLocal)
+        tasks.append(
+            asyncio.create_task(
+                catalog_replica.run_catalog_replica(
+                    AsyncSessionLocal, settings.CATALOG_REPLICA_POLL_SECONDS
+                )
+            )
+        )
+
+    yield
 
-app = FastAPI()
+    # End the event streams still open
+    broker.close()
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    catalog_replica.reset()
+
+
+app = FastAPI(lifespan=lifespan)
 
 origins = ['*']  # ['http://localhost:5173']
 
@@ -15,6 +65,12 @@ app.add_middleware(
     allow_methods=['*'],
     allow_headers=['*'],
 )
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    levels=settings.COMPRESSION_LEVELS,
+    cache_size=settings.COMPRESSION_CACHE_SIZE,
+)
 
 app.include_router(api_router)
 
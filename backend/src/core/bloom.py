@@ -0,0 +1,60 @@
+import math
+from typing import Hashable
+
+_MASK_64 = (1 << 64) - 1
+
+
+class BloomFilter:
+    """
+    Fixed-size set membership filter with no false negatives.
+
+    Keys are hashed with the builtin `hash()`, which strings cache on the
+    object, then mixed into 64 bits and split in two halves combined as
+    `h1 + i * h2` for each of the `k` bit positions (Kirsch-Mitzenmacher).
+    A lookup only touches the bit array, without building intermediate
+    keys or digests. `hash()` of strings is randomized per process, so a
+    filter must be rebuilt in each process rather than shared.
+
+    Items cannot be removed; the filter is rebuilt instead.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001) -> None:
+        capacity = max(capacity, 1)
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self._count = 0
+
+    @staticmethod
+    def _hash(key: Hashable) -> int:
+        # splitmix64 finalizer, so that small integers, whose hash is the
+        # integer itself, spread over the whole bit array
+        h = hash(key) & _MASK_64
+        h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & _MASK_64
+        h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & _MASK_64
+        return h ^ (h >> 31)
+
+    def add(self, key: Hashable) -> None:
+        h = self._hash(key)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        for i in range(self.hash_count):
+            index = (h1 + i * h2) % self.size
+            self._bits[index >> 3] |= 1 << (index & 7)
+        self._count += 1
+
+    def __contains__(self, key: Hashable) -> bool:
+        if not self._count:
+            return False
+
+        h = self._hash(key)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        for i in range(self.hash_count):
+            index = (h1 + i * h2) % self.size
+            if not self._bits[index >> 3] & (1 << (index & 7)):
+                return False
+        return True
+
+    def __len__(self) -> int:
+        return self._count
@@ -0,0 +1,322 @@
+"""
+Binary snapshots of the book catalogue, read in place from a memory-mapped
+file so that worker processes share a single copy.
+
+A snapshot is a header followed by fixed-width sections, each aligned on 8
+bytes, in the native byte order of the host:
+
+- header: magic, catalogue version, number of books, number of authors,
+  size of the string blob;
+- books, ordered by ID: IDs, years, positions of their authors, and the
+  offsets of their titles in the blob;
+- the positions of the books ordered by title;
+- authors, ordered by ID: IDs and the offsets of their names in the blob;
+- the positions of the books of each author, grouped by author, with the
+  start of each group;
+- the blob: the UTF-8 titles then names, each followed by a NUL byte.
+
+Lookups by ID and title are binary searches, the books of an author are a
+slice of a section, and substring filters search the blob directly. Only
+the returned values are decoded.
+
+Snapshots are written to a temporary file, then moved over the previous
+one: readers keep the file they mapped until they map the new one.
+"""
+
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from pathlib import Path
+from typing import Any, NamedTuple, Sequence
+
+MAGIC = b'MADRCAT1'
+HEADER = struct.Struct('=8sqqqq')
+
+
+class BookRecord(NamedTuple):
+    id: int
+    title: str
+    year: int
+    author: str
+    author_id: int
+
+
+class AuthorRecord(NamedTuple):
+    id: int
+    name: str
+
+
+class _Section(NamedTuple):
+    name: str
+    length: int
+
+
+def _sections(books: int, authors: int) -> list[_Section]:
+    # Every section is an array of signed 64-bit integers
+    return [
+        _Section('book_ids', books),
+        _Section('book_years', books),
+        _Section('book_authors', books),
+        _Section('title_offsets', books + 1),
+        _Section('title_order', books),
+        _Section('author_ids', authors),
+        _Section('name_offsets', authors + 1),
+        _Section('author_book_starts', authors + 1),
+        _Section('author_books', books),
+    ]
+
+
+def paginate(
+    positions: Sequence[int], limit: int, offset: int
+) -> Sequence[int]:
+    offset = max(offset, 0)
+    return positions[offset : offset + max(limit, 0)]
+
+
+def _offsets(values: Sequence[bytes], initial: int) -> array[int]:
+    # The offsets of the values in the blob, followed by the end of the last
+    return array(
+        'q', accumulate((len(v) + 1 for v in values), initial=initial)
+    )
+
+
+def _group_books(book_authors: array[int], authors: int) -> dict[str, Any]:
+    # Books grouped by author, in ID order within each group
+    counts = [0] * authors
+    for author_position in book_authors:
+        counts[author_position] += 1
+
+    return {
+        'author_book_starts': array('q', accumulate(counts, initial=0)),
+        'author_books': array(
+            'q', sorted(range(len(book_authors)), key=book_authors.__getitem__)
+        ),
+    }
+
+
+def write_snapshot(
+    path: Path,
+    version: int,
+    books: Sequence[Sequence[Any]],
+    authors: Sequence[Sequence[Any]],
+) -> None:
+    """
+    Write a snapshot, replacing the file at `path` atomically.
+
+    :param path: The snapshot file.
+    :param version: The catalogue version of the snapshot.
+    :param books: The book columns, ordered by ID: IDs, titles, years and
+        author IDs.
+    :param authors: The author columns, ordered by ID: IDs and names.
+    """
+    book_ids, titles, years, author_ids = books
+    ids, names = authors
+
+    author_positions = {
+        author_id: index for index, author_id in enumerate(ids)
+    }
+    book_authors = array('q', (author_positions[a] for a in author_ids))
+    encoded_titles = [title.encode() for title in titles]
+    encoded_names = [name.encode() for name in names]
+    title_offsets = _offsets(encoded_titles, 0)
+
+    sections = {
+        'book_ids': array('q', book_ids),
+        'book_years': array('q', years),
+        'book_authors': book_authors,
+        'title_offsets': title_offsets,
+        'title_order': array(
+            'q', sorted(range(len(book_ids)), key=encoded_titles.__getitem__)
+        ),
+        'author_ids': array('q', ids),
+        'name_offsets': _offsets(encoded_names, title_offsets[-1]),
+        **_group_books(book_authors, len(ids)),
+    }
+    blob = b''.join(
+        value + b'\0' for value in (*encoded_titles, *encoded_names)
+    )
+
+    temporary_path = path.with_name(f'.{path.name}.{os.getpid()}')
+    with temporary_path.open('wb') as file:
+        file.write(
+            HEADER.pack(MAGIC, version, len(book_ids), len(ids), len(blob))
+        )
+        for section in _sections(len(book_ids), len(ids)):
+            file.write(sections[section.name].tobytes())
+        file.write(blob)
+    os.replace(temporary_path, path)
+
+
+def _position(ids: memoryview, record_id: int) -> int | None:
+    position = bisect_left(ids, record_id)
+    if position < len(ids) and ids[position] == record_id:
+        return position
+    return None
+
+
+class CatalogSnapshot:
+    """
+    A snapshot mapped in memory, with the read methods of the catalogue
+    replica.
+    """
+
+    def __init__(self, path: Path) -> None:
+        with path.open('rb') as file:
+            self._inode = os.fstat(file.fileno()).st_ino
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.version, books, authors, _ = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError(f'{path} is not a catalogue snapshot.')
+
+        self.path = path
+        self._books = books
+        self._authors = authors
+        view = memoryview(self._mmap)
+        offset = HEADER.size
+        sections: dict[str, memoryview] = {}
+        for section in _sections(books, authors):
+            end = offset + section.length * 8
+            sections[section.name] = view[offset:end].cast('q')
+            offset = end
+        # Released before the file is unmapped, the sections first
+        self._views = [*sections.values(), view]
+        self._blob = offset
+
+        self._book_ids = sections['book_ids']
+        self._book_years = sections['book_years']
+        self._book_authors = sections['book_authors']
+        self._title_offsets = sections['title_offsets']
+        self._title_order = sections['title_order']
+        self._author_ids = sections['author_ids']
+        self._name_offsets = sections['name_offsets']
+        self._author_book_starts = sections['author_book_starts']
+        self._author_books = sections['author_books']
+
+    def close(self) -> None:
+        for view in self._views:
+            view.release()
+        self._mmap.close()
+
+    def is_replaced(self) -> bool:
+        """
+        Whether another snapshot was written at the path since this one was
+        mapped.
+        """
+        try:
+            return os.stat(self.path).st_ino != self._inode
+        except FileNotFoundError:
+            return False
+
+    def _string(self, offsets: memoryview, index: int) -> bytes:
+        # Without the trailing NUL byte
+        return self._mmap[
+            self._blob + offsets[index] : self._blob + offsets[index + 1] - 1
+        ]
+
+    def _title(self, position: int) -> bytes:
+        return self._string(self._title_offsets, position)
+
+    def _book_record(self, position: int) -> BookRecord:
+        author_position = self._book_authors[position]
+        return BookRecord(
+            self._book_ids[position],
+            self._title(position).decode(),
+            self._book_years[position],
+            self._string(self._name_offsets, author_position).decode(),
+            self._author_ids[author_position],
+        )
+
+    def _search(self, value: str, offsets: memoryview) -> list[int]:
+        # The positions of the strings of a section containing `value`.
+        # Matches cannot span two strings, as each ends with a NUL byte.
+        needle = value.encode()
+        if b'\0' in needle:
+            return []
+
+        positions = []
+        end = self._blob + offsets[-1]
+        found = self._mmap.find(needle, self._blob + offsets[0], end)
+        while found != -1:
+            position = bisect_right(offsets, found - self._blob) - 1
+            positions.append(position)
+            found = self._mmap.find(
+                needle, self._blob + offsets[position + 1], end
+            )
+
+        return positions
+
+    def book(self, book_id: int) -> BookRecord | None:
+        position = _position(self._book_ids, book_id)
+        return None if position is None else self._book_record(position)
+
+    def book_by_title(self, title: str) -> BookRecord | None:
+        encoded = title.encode()
+        index = bisect_left(self._title_order, encoded, key=self._title)
+        if index == self._books:
+            return None
+
+        position = self._title_order[index]
+        if self._title(position) != encoded:
+            return None
+        return self._book_record(position)
+
+    def books_by_author(self, author_id: int) -> list[BookRecord]:
+        author_position = _position(self._author_ids, author_id)
+        if author_position is None:
+            return []
+
+        start = self._author_book_starts[author_position]
+        end = self._author_book_starts[author_position + 1]
+        return [
+            self._book_record(position)
+            for position in self._author_books[start:end]
+        ]
+
+    def books(
+        self,
+        limit: int,
+        offset: int,
+        title: str | None = None,
+        year: int | None = None,
+    ) -> tuple[list[BookRecord], int]:
+        positions: Sequence[int] = range(self._books)
+        if title:
+            positions = self._search(title, self._title_offsets)
+        if year:
+            years = self._book_years
+            positions = [
+                position for position in positions if years[position] == year
+            ]
+
+        return [
+            self._book_record(position)
+            for position in paginate(positions, limit, offset)
+        ], len(positions)
+
+    def author(self, author_id: int) -> AuthorRecord | None:
+        position = _position(self._author_ids, author_id)
+        if position is None:
+            return None
+        return AuthorRecord(
+            author_id, self._string(self._name_offsets, position).decode()
+        )
+
+    def authors(
+        self, limit: int, offset: int, name: str | None = None
+    ) -> tuple[list[AuthorRecord], int]:
+        positions: Sequence[int] = range(self._authors)
+        if name:
+            positions = self._search(name, self._name_offsets)
+
+        return [
+            AuthorRecord(
+                self._author_ids[position],
+                self._string(self._name_offsets, position).decode(),
+            )
+            for position in paginate(positions, limit, offset)
+        ], len(positions)
@@ -1,20 +1,24 @@
-from typing import Any
+import sys
+from typing import Any, get_args
 
-from sqlalchemy import event, select
-from sqlalchemy.dialects.sqlite.aiosqlite import (
-    AsyncAdapt_aiosqlite_connection,
-)
+from sqlalchemy import event, exc, select
 from sqlalchemy.engine import Engine
+from sqlalchemy.engine.default import CACHE_HIT, CACHE_MISS
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.pool import AsyncAdaptedQueuePool, PoolProxiedConnection
 
+from src.core.metrics import metrics
 from src.core.security import get_password_hash
-from src.core.settings import settings
+from src.core.settings import PoolName, settings
 from src.models import User
 
+POOLS: tuple[PoolName, ...] = get_args(PoolName)
+
 
 # To allow cascading delete from parent to child (sqlite)
 # The PRAGMA foreign_keys = ON statement must be emitted on all
@@ -24,20 +28,125 @@ from src.models import User
 # https://docs.sqlalchemy.org/en/20/core/events.html#sqlalchemy.events.PoolEvents.connect
 @event.listens_for(Engine, 'connect', named=True)
 def set_sqlite_pragma(**kw: dict[str, Any]) -> None:  # pragma: no cover
+    # The aiosqlite dialect is only imported by SQLAlchemy when an engine
+    # uses it, so it is looked up here instead of being imported eagerly.
+    aiosqlite_dialect = sys.modules.get('sqlalchemy.dialects.sqlite.aiosqlite')
+    if aiosqlite_dialect is None:
+        return
+
     dbapi_connection = kw.get('dbapi_connection')
-    if isinstance(dbapi_connection, AsyncAdapt_aiosqlite_connection):
+    if isinstance(
+        dbapi_connection, aiosqlite_dialect.AsyncAdapt_aiosqlite_connection
+    ):
         cursor = dbapi_connection.cursor()
         cursor.execute('PRAGMA foreign_keys=ON')
         cursor.close()
 
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
+# Count how often statements are served from the engine compiled cache
+# https://docs.sqlalchemy.org/en/20/core/connections.html#sql-compilation-caching
+@event.listens_for(Engine, 'before_cursor_execute', named=True)
+def count_compiled_cache_usage(**kw: Any) -> None:
+    context = kw.get('context')
+    cache_hit = getattr(context, 'cache_hit', None)
+    if cache_hit is CACHE_HIT:
+        metrics.incr('sql_compiled_cache_hits')
+    elif cache_hit is CACHE_MISS:
+        metrics.incr('sql_compiled_cache_misses')
 
-AsyncSessionLocal = async_sessionmaker(
-    expire_on_commit=False,
-    bind=engine,
-    class_=AsyncSession,
-)
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    """
+    Queue pool counting the checkouts that found every connection in use
+    and waited, in the `db_pool_<name>_waits` metric, and those that timed
+    out, in the `db_pool_<name>_timeouts` metric.
+    """
+
+    name = 'default'
+
+    def __init__(
+        self,
+        creator: Any,
+        max_overflow: int = 10,
+        **kw: Any,
+    ) -> None:
+        super().__init__(creator, max_overflow=max_overflow, **kw)
+        # The pool has no public accessor for it
+        self.max_overflow = max_overflow
+
+    @classmethod
+    def named(cls, name: str) -> type['MeteredPool']:
+        # A subclass, as the pool is recreated from its class on dispose
+        return type(f'{name.title()}MeteredPool', (cls,), {'name': name})
+
+    def connect(self) -> PoolProxiedConnection:
+        if self.checkedout() >= self.size() + self.max_overflow:
+            metrics.incr(f'db_pool_{self.name}_waits')
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            metrics.incr(f'db_pool_{self.name}_timeouts')
+            raise
+
+
+def create_pool_engine(
+    name: PoolName, url: str = settings.DATABASE_URL
+) -> AsyncEngine:
+    """
+    :param name: The pool, whose size, overflow and timeout are read from
+        the settings.
+    :param url: The database URL.
+    :return: An engine with a pool of its own.
+    """
+    return create_async_engine(
+        url,
+        echo=True,
+        query_cache_size=settings.DB_QUERY_CACHE_SIZE,
+        poolclass=MeteredPool.named(name),
+        pool_size=settings.DB_POOL_SIZES[name],
+        max_overflow=settings.DB_POOL_MAX_OVERFLOW[name],
+        pool_timeout=settings.DB_POOL_TIMEOUTS[name],
+    )
+
+
+engines = {name: create_pool_engine(name) for name in POOLS}
+
+session_factories = {
+    name: async_sessionmaker(
+        expire_on_commit=False,
+        bind=engine,
+        class_=AsyncSession,
+    )
+    for name, engine in engines.items()
+}
+
+# Background jobs and scripts
+AsyncSessionLocal = session_factories['bulk']
+
+
+def pool_status() -> dict[str, dict[str, Any]]:
+    """
+    :return: The state of the pool of each engine: the connections it keeps
+        open (`size`) and may open beyond (`max_overflow`), those in use
+        (`checked_out`), the share of the limit they make (`saturation`),
+        and the longest wait for a connection (`timeout`), in seconds.
+    """
+    status: dict[str, dict[str, Any]] = {}
+    for name, engine in engines.items():
+        pool = engine.pool
+        # Only pools made by `create_pool_engine` know their overflow
+        if not isinstance(pool, MeteredPool):
+            continue
+
+        status[name] = {
+            'size': pool.size(),
+            'max_overflow': pool.max_overflow,
+            'checked_out': pool.checkedout(),
+            'saturation': pool.checkedout()
+            / (pool.size() + pool.max_overflow),
+            'timeout': pool.timeout(),
+        }
+    return status
 
 
 async def create_superuser(session: AsyncSession) -> None:
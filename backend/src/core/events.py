@@ -0,0 +1,99 @@
+"""
+In-process fan-out of catalogue change notifications to SSE clients.
+
+Each subscriber owns a bounded queue. Publishing encodes the event once and
+puts the same message in every queue without awaiting, so an idle
+connection costs a queue and a suspended task, and a publish does not wait
+for any client. A subscriber whose queue is full is dropped: its queue is
+replaced by the end-of-stream marker, and the client is expected to
+reconnect and catch up from the change feeds with the last version it saw.
+"""
+
+import asyncio
+import json
+from dataclasses import asdict, dataclass
+from typing import Literal
+
+from src.core.metrics import metrics
+from src.core.settings import settings
+
+
+@dataclass
+class CatalogEvent:
+    entity: Literal['book', 'author']
+    action: Literal['created', 'updated', 'deleted']
+    ids: list[int]
+    # Catalogue version of the change, usable as `since` on the change feeds
+    version: int
+
+    def encode(self) -> str:
+        return f'event: {self.entity}\ndata: {json.dumps(asdict(self))}\n\n'
+
+
+class Subscription:
+    def __init__(self, maxsize: int) -> None:
+        self._queue: asyncio.Queue[str | None] = asyncio.Queue(maxsize)
+
+    async def get(self) -> str | None:
+        """
+        Wait for the next encoded message, or None once the subscription
+        is closed.
+        """
+        return await self._queue.get()
+
+    def put(self, message: str) -> bool:
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    def close(self) -> None:
+        # Pending messages are discarded only if the marker does not fit
+        if self._queue.full():
+            while not self._queue.empty():
+                self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+
+class LocalBroker:
+    """
+    Broker delivering the events published in this process to the
+    subscribers of this process.
+    """
+
+    def __init__(self, queue_size: int = settings.EVENTS_QUEUE_SIZE) -> None:
+        self._queue_size = queue_size
+        self._subscriptions: set[Subscription] = set()
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self._queue_size)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions.discard(subscription)
+
+    def publish(self, event: CatalogEvent) -> None:
+        message = event.encode()
+        metrics.incr('events_published')
+
+        for subscription in list(self._subscriptions):
+            if not subscription.put(message):
+                metrics.incr('events_subscribers_dropped')
+                self.unsubscribe(subscription)
+                subscription.close()
+
+    def close(self) -> None:
+        """
+        End every subscription, e.g. on shutdown.
+        """
+        for subscription in self._subscriptions:
+            subscription.close()
+        self._subscriptions.clear()
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+
+broker = LocalBroker()
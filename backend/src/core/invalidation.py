@@ -0,0 +1,355 @@
+"""
+Invalidation bus, telling the caches of every worker process that an
+entity changed.
+
+Services publish an `Invalidation` once a change is committed. The bus
+calls the handlers subscribed to its entity in this process right away,
+then hands it to a transport that delivers it to the other processes,
+whose buses call their own handlers:
+
+- 'local': no transport, for a single process and for tests;
+- 'postgres': PostgreSQL `LISTEN/NOTIFY` on the app database;
+- 'redis': pub/sub on a server speaking the Redis protocol.
+
+Delivery is at most once. Messages published while the transport is
+reconnecting, or beyond INVALIDATION_QUEUE_SIZE waiting to be sent, are
+lost, so caches must also expire or resync on their own, and use the bus
+to do it sooner. Each received message adds the time since it was
+published to the `invalidation_lag_ms` counter, which divided by
+`invalidations_received` gives the mean delivery lag. Clocks of different
+hosts are assumed to be in sync.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Protocol
+from urllib.parse import unquote, urlsplit
+from uuid import uuid4
+
+from sqlalchemy.engine import make_url
+
+from src.core.metrics import metrics
+from src.core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Unique to this host, completed with the process ID as processes forked
+# after the import share it
+_HOST_TOKEN = uuid4().hex
+
+
+@dataclass
+class Invalidation:
+    # 'book', 'author', 'user' or 'revocation'
+    entity: str
+    action: str
+    # IDs of the entities, or the keys of revocations
+    ids: list[Any]
+    # Catalogue version of book and author changes
+    version: int | None = None
+    origin: str = ''
+    # Publication time, as a Unix timestamp
+    sent_at: float = field(default_factory=time.time)
+
+    def encode(self) -> str:
+        return json.dumps(asdict(self), separators=(',', ':'))
+
+    @classmethod
+    def decode(cls, payload: str | bytes) -> 'Invalidation':
+        return cls(**json.loads(payload))
+
+
+Handler = Callable[[Invalidation], None]
+
+
+class Transport(Protocol):
+    async def connect(self, receive: Callable[[str], None]) -> None:
+        """
+        Connect and pass every payload received to `receive`.
+        """
+
+    def is_connected(self) -> bool: ...
+
+    async def send(self, payload: str) -> None: ...
+
+    async def close(self) -> None: ...
+
+
+class InvalidationBus:
+    def __init__(self) -> None:
+        self._handlers: dict[str, list[Handler]] = {}
+        # Payloads waiting for the transport, None without one
+        self._outbox: asyncio.Queue[str] | None = None
+
+    @property
+    def origin(self) -> str:
+        return f'{_HOST_TOKEN}-{os.getpid()}'
+
+    def subscribe(self, entity: str, handler: Handler) -> None:
+        self._handlers.setdefault(entity, []).append(handler)
+
+    def unsubscribe(self, entity: str, handler: Handler) -> None:
+        self._handlers[entity].remove(handler)
+
+    def _deliver(self, invalidation: Invalidation) -> None:
+        for handler in list(self._handlers.get(invalidation.entity, ())):
+            try:
+                handler(invalidation)
+            except Exception:
+                metrics.incr('invalidation_handler_errors')
+                logger.exception('Invalidation handler failed')
+
+    def publish(self, invalidation: Invalidation) -> None:
+        """
+        Deliver an invalidation to the handlers of this process, and queue
+        it for the other processes.
+
+        Does not wait, so it can be called from synchronous code such as
+        session event listeners.
+        """
+        invalidation.origin = self.origin
+        metrics.incr('invalidations_published')
+        self._deliver(invalidation)
+
+        if self._outbox is None:
+            return
+
+        # Bounded by the NOTIFY payload limit of PostgreSQL
+        ids = invalidation.ids
+        size = settings.INVALIDATION_MAX_IDS
+        for start in range(0, max(len(ids), 1), size):
+            invalidation.ids = ids[start : start + size]
+            try:
+                self._outbox.put_nowait(invalidation.encode())
+            except asyncio.QueueFull:
+                metrics.incr('invalidations_dropped')
+        invalidation.ids = ids
+
+    def receive(self, payload: str | bytes) -> None:
+        """
+        Deliver an invalidation published by another process.
+        """
+        try:
+            invalidation = Invalidation.decode(payload)
+        except (TypeError, ValueError):
+            metrics.incr('invalidation_decode_errors')
+            logger.warning('Invalid invalidation payload: %r', payload)
+            return
+
+        # Transports also return the messages of this process
+        if invalidation.origin == self.origin:
+            return
+
+        lag = time.time() - invalidation.sent_at
+        metrics.incr('invalidations_received')
+        metrics.incr('invalidation_lag_ms', max(round(lag * 1000), 0))
+        self._deliver(invalidation)
+
+    async def run(
+        self, transport: Transport, retry_interval: float = 1
+    ) -> None:
+        """
+        Send the queued invalidations and receive those of the other
+        processes through `transport` until cancelled, reconnecting after
+        errors.
+
+        :param transport: The transport shared with the other processes.
+        :param retry_interval: The time to wait before reconnecting, and
+            the longest time before a lost connection is noticed, in
+            seconds.
+        """
+        outbox: asyncio.Queue[str] = asyncio.Queue(
+            settings.INVALIDATION_QUEUE_SIZE
+        )
+        self._outbox = outbox
+        try:
+            while True:
+                try:
+                    await transport.connect(self.receive)
+                    while transport.is_connected():
+                        try:
+                            payload = await asyncio.wait_for(
+                                outbox.get(), retry_interval
+                            )
+                        except TimeoutError:
+                            continue
+                        await transport.send(payload)
+                except Exception:
+                    metrics.incr('invalidation_bus_errors')
+                    logger.exception('Invalidation bus connection failed')
+                finally:
+                    await transport.close()
+
+                await asyncio.sleep(retry_interval)
+        finally:
+            self._outbox = None
+
+
+class PostgresTransport:
+    """
+    `LISTEN/NOTIFY` on a dedicated connection, outside of the pool.
+    """
+
+    def __init__(self, database_url: str, channel: str) -> None:
+        self._url = (
+            make_url(database_url)
+            .set(drivername='postgresql')
+            .render_as_string(hide_password=False)
+        )
+        self._channel = channel
+        self._connection: Any = None
+
+    async def connect(self, receive: Callable[[str], None]) -> None:
+        import asyncpg  # noqa: PLC0415
+
+        self._connection = await asyncpg.connect(self._url)
+        await self._connection.add_listener(
+            self._channel, lambda *args: receive(args[-1])
+        )
+
+    def is_connected(self) -> bool:
+        return self._connection is not None and not (
+            self._connection.is_closed()
+        )
+
+    async def send(self, payload: str) -> None:
+        await self._connection.execute(
+            'SELECT pg_notify($1, $2)', self._channel, payload
+        )
+
+    async def close(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+
+class RedisError(Exception):
+    pass
+
+
+def encode_command(*args: str | bytes) -> bytes:
+    """
+    Encode a command as a RESP array of bulk strings.
+    """
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        data = arg.encode() if isinstance(arg, str) else arg
+        parts.append(b'$%d\r\n%b\r\n' % (len(data), data))
+    return b''.join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    """
+    Read a RESP reply: bulk strings are returned as bytes, and errors are
+    returned as `RedisError`s rather than raised.
+    """
+    line = await reader.readuntil(b'\r\n')
+    kind, value = line[:1], line[1:-2]
+    if kind == b'+':
+        return value
+    if kind == b'-':
+        return RedisError(value.decode())
+    if kind == b':':
+        return int(value)
+    if kind == b'$':
+        if value == b'-1':
+            return None
+        data = await reader.readexactly(int(value) + 2)
+        return data[:-2]
+    if kind == b'*':
+        return [await read_reply(reader) for _ in range(int(value))]
+
+    raise RedisError(f'Unexpected reply: {line!r}')
+
+
+Stream = tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+async def command(stream: Stream, *args: str) -> Any:
+    """
+    Send a command and read its reply, raising error replies.
+    """
+    reader, writer = stream
+    writer.write(encode_command(*args))
+    await writer.drain()
+    reply = await read_reply(reader)
+    if isinstance(reply, RedisError):
+        raise reply
+    return reply
+
+
+async def _read_messages(
+    reader: asyncio.StreamReader, receive: Callable[[str], None]
+) -> None:
+    # The messages published on the channels of a subscribed connection
+    while True:
+        reply = await read_reply(reader)
+        if isinstance(reply, list) and reply[0] == b'message':
+            receive(reply[2].decode())
+
+
+class RedisTransport:
+    """
+    Pub/sub over the Redis protocol, with a subscribed connection and a
+    connection for publishing.
+    """
+
+    def __init__(self, url: str, channel: str) -> None:
+        parts = urlsplit(url)
+        self._host = parts.hostname or 'localhost'
+        self._port = parts.port or 6379
+        self._password = unquote(parts.password) if parts.password else None
+        self._channel = channel
+        self._streams: list[asyncio.StreamWriter] = []
+        self._publisher: Stream
+        self._reading: asyncio.Task[None] | None = None
+
+    async def _open(self) -> Stream:
+        stream = await asyncio.open_connection(self._host, self._port)
+        self._streams.append(stream[1])
+        if self._password is not None:
+            await command(stream, 'AUTH', self._password)
+        return stream
+
+    async def connect(self, receive: Callable[[str], None]) -> None:
+        subscriber = await self._open()
+        await command(subscriber, 'SUBSCRIBE', self._channel)
+        self._publisher = await self._open()
+        self._reading = asyncio.create_task(
+            _read_messages(subscriber[0], receive)
+        )
+
+    def is_connected(self) -> bool:
+        return self._reading is not None and not self._reading.done()
+
+    async def send(self, payload: str) -> None:
+        await command(self._publisher, 'PUBLISH', self._channel, payload)
+
+    async def close(self) -> None:
+        if self._reading is not None:
+            self._reading.cancel()
+            await asyncio.gather(self._reading, return_exceptions=True)
+            self._reading = None
+        for writer in self._streams:
+            writer.close()
+        self._streams.clear()
+
+
+def create_transport() -> Transport | None:
+    """
+    :return: The transport selected by INVALIDATION_BUS, or None for
+        'local'.
+    """
+    channel = settings.INVALIDATION_CHANNEL
+    if settings.INVALIDATION_BUS == 'postgres':
+        return PostgresTransport(settings.DATABASE_URL, channel)
+    if settings.INVALIDATION_BUS == 'redis':
+        return RedisTransport(settings.INVALIDATION_REDIS_URL, channel)
+    return None
+
+
+bus = InvalidationBus()
@@ -0,0 +1,28 @@
+from collections import defaultdict
+
+
+class Metrics:
+    """
+    Process-local counters used to expose runtime statistics.
+
+    Counters are plain integers keyed by name, so incrementing one is cheap
+    enough to be done on hot paths. Values are per worker process.
+    """
+
+    def __init__(self) -> None:
+        self._counters: defaultdict[str, int] = defaultdict(int)
+
+    def incr(self, name: str, value: int = 1) -> None:
+        self._counters[name] += value
+
+    def get(self, name: str) -> int:
+        return self._counters.get(name, 0)
+
+    def snapshot(self) -> dict[str, int]:
+        return dict(sorted(self._counters.items()))
+
+    def reset(self) -> None:
+        self._counters.clear()
+
+
+metrics = Metrics()
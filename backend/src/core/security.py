@@ -1,34 +1,113 @@
+import hashlib
+import secrets
+import uuid
 from datetime import datetime, timedelta
-from typing import Any
+from functools import cache
+from typing import TYPE_CHECKING, Any
 from zoneinfo import ZoneInfo
 
 from fastapi.security import OAuth2PasswordBearer
 from jwt import encode
-from pwdlib import PasswordHash
 
+from src.core.metrics import metrics
 from src.core.settings import settings
 
-pwd_context = PasswordHash.recommended()
+if TYPE_CHECKING:
+    from pwdlib import PasswordHash
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='/auth/token')
 
 
+@cache
+def get_password_context() -> 'PasswordHash':
+    """
+    Build the password hasher on first use, so that pwdlib and the argon2
+    bindings are not loaded when the app is imported.
+    """
+    from pwdlib import PasswordHash  # noqa: PLC0415
+    from pwdlib.hashers.argon2 import Argon2Hasher  # noqa: PLC0415
+
+    return PasswordHash((
+        Argon2Hasher(
+            time_cost=settings.ARGON2_TIME_COST,
+            memory_cost=settings.ARGON2_MEMORY_COST,
+            parallelism=settings.ARGON2_PARALLELISM,
+        ),
+    ))
+
+
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_password_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_password_context().verify(plain_password, hashed_password)
+
+
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """
+    Verify a password and, if its hash was made with other argon2 costs than
+    the configured ones, hash it again.
+
+    :return: Whether the password matches, and the new hash or None if the
+        stored one is up to date.
+    """
+    metrics.incr('password_verifications')
+
+    return get_password_context().verify_and_update(
+        plain_password, hashed_password
+    )
 
 
 def create_access_token(data: dict[str, Any]) -> str:
     to_encode = data.copy()
-    expire = datetime.now(tz=ZoneInfo('UTC')) + timedelta(
-        minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
+    expire_minutes = (
+        settings.CLAIMS_ACCESS_TOKEN_EXPIRE_MINUTES
+        if settings.ACCESS_TOKEN_MODE == 'claims'
+        else settings.ACCESS_TOKEN_EXPIRE_MINUTES
     )
-    to_encode['exp'] = expire
+    now = datetime.now(tz=ZoneInfo('UTC'))
+    to_encode['exp'] = now + timedelta(minutes=expire_minutes)
+    # `jti` and `iat` identify the token for revocation, `iat` with the
+    # fraction of a second so that a revocation splits its second exactly
+    to_encode['iat'] = now.timestamp()
+    to_encode['jti'] = uuid.uuid4().hex
 
     encoded_jwt = encode(
         to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
     )
 
     return encoded_jwt
+
+
+def create_user_access_token(
+    user_id: int, email: str, is_superuser: bool
+) -> str:
+    """
+    Create an access token carrying the claims needed to authorize requests
+    without loading the user: `sub` (email), `uid` (id) and `su` (superuser).
+    """
+    return create_access_token(
+        data={'sub': email, 'uid': user_id, 'su': is_superuser}
+    )
+
+
+def access_token_max_lifetime() -> timedelta:
+    return timedelta(
+        minutes=max(
+            settings.ACCESS_TOKEN_EXPIRE_MINUTES,
+            settings.CLAIMS_ACCESS_TOKEN_EXPIRE_MINUTES,
+        )
+    )
+
+
+def generate_refresh_token() -> str:
+    return secrets.token_urlsafe(32)
+
+
+def hash_refresh_token(refresh_token: str) -> str:
+    # Refresh tokens are random and high entropy, so a fast hash is enough
+    # to avoid storing them in clear text.
+    return hashlib.sha256(refresh_token.encode()).hexdigest()
@@ -1,5 +1,9 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+PoolName = Literal['auth', 'read', 'write', 'bulk']
+
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
@@ -7,10 +11,157 @@ class Settings(BaseSettings):
     )
 
     DATABASE_URL: str = 'sqlite+aiosqlite:///./dev.db'
+    # Strategy used by list endpoints to fetch a page and its total count,
+    # keyed by dialect name. Dialects not listed use 'sequential'.
+    LIST_COUNT_STRATEGIES: dict[
+        str, Literal['sequential', 'window', 'concurrent']
+    ] = {'postgresql': 'window'}
+    # How the book list reads its pages, keyed by dialect name. 'orm' loads
+    # `Book` objects and their authors in a second query. 'projection'
+    # selects the listed columns with the author name joined, which the
+    # covering indexes answer with index-only scans on PostgreSQL when the
+    # books are filtered by year.
+    # Dialects not listed use 'orm'.
+    BOOK_LIST_QUERY_MODES: dict[str, Literal['orm', 'projection']] = {
+        'postgresql': 'projection'
+    }
+    # Size of the engine LRU cache of compiled SQL statements
+    DB_QUERY_CACHE_SIZE: int = 500
+    # Each kind of work has its own pool of connections in each worker
+    # process, so that one cannot starve the others: 'auth' for logins and
+    # token checks, 'read' and 'write' for the catalogue and the accounts,
+    # and 'bulk' for exports, streams, batch deletes and background jobs.
+    # DB_POOL_SIZES connections are kept open per pool, up to
+    # DB_POOL_MAX_OVERFLOW more are opened under load, and a request waits
+    # at most DB_POOL_TIMEOUTS seconds for one. `python -m src.utils.serve`
+    # lowers sizes and overflows so that the connections of all its workers
+    # stay within DB_MAX_CONNECTIONS, which should be below the
+    # `max_connections` of PostgreSQL minus what other clients use.
+    DB_POOL_SIZES: dict[PoolName, int] = {
+        'auth': 2,
+        'read': 5,
+        'write': 3,
+        'bulk': 1,
+    }
+    DB_POOL_MAX_OVERFLOW: dict[PoolName, int] = {
+        'auth': 3,
+        'read': 10,
+        'write': 5,
+        'bulk': 2,
+    }
+    DB_POOL_TIMEOUTS: dict[PoolName, float] = {
+        'auth': 5,
+        'read': 10,
+        'write': 15,
+        'bulk': 60,
+    }
+    DB_MAX_CONNECTIONS: int = 90
+    # Identical book and author reads running at the same time share a
+    # single database execution. A read does not join one that started
+    # before a catalogue change this worker committed or received on the
+    # invalidation bus, so a client reads its own writes, unless the read
+    # runs on another worker before the bus delivered the change.
+    READ_COALESCING: bool = True
+    # Largest page of the author list, also used when no limit is given.
+    # `GET /author/stream` returns every author, read in chunks of
+    # AUTHORS_STREAM_CHUNK_SIZE rows.
+    AUTHORS_MAX_PAGE_SIZE: int = 100
+    AUTHORS_STREAM_CHUNK_SIZE: int = 1000
+    # Books per Arrow record batch of the columnar export on
+    # `GET /book/export`, read with one query each
+    BOOKS_EXPORT_BATCH_SIZE: int = 10_000
+    # Optional year-range partitioning of `books` on PostgreSQL, applied by
+    # the `partition books by year` migration. Each partition spans
+    # BOOKS_PARTITION_YEARS years; `python -m src.utils.book_partitions`
+    # creates the partitions of the next BOOKS_PARTITIONS_AHEAD spans.
+    BOOKS_PARTITIONING: bool = False
+    BOOKS_PARTITION_YEARS: int = 10
+    BOOKS_PARTITIONS_AHEAD: int = 2
+
+    # Serve book and author reads from an in-memory replica of the
+    # catalogue, loaded at startup. It follows the catalogue version,
+    # notified by PostgreSQL and polled every CATALOG_REPLICA_POLL_SECONDS,
+    # which on PostgreSQL only covers notifications missed on reconnection.
+    CATALOG_REPLICA: bool = False
+    CATALOG_REPLICA_POLL_SECONDS: float = 1
+    # With several workers, share the replica through a snapshot file
+    # mapped by each of them, preferably on a tmpfs such as /dev/shm.
+    CATALOG_SNAPSHOT_PATH: str | None = None
+
+    # Catalogue change notifications streamed on /events: the messages
+    # buffered per client before it is dropped as too slow, and the interval
+    # of keep-alive comments on idle connections.
+    EVENTS_QUEUE_SIZE: int = 100
+    EVENTS_KEEPALIVE_SECONDS: float = 15
+
+    # How the caches of other worker processes learn about changes:
+    # 'local' within this process only, 'postgres' with LISTEN/NOTIFY on
+    # the app database, or 'redis' with pub/sub on INVALIDATION_REDIS_URL.
+    # Messages carry at most INVALIDATION_MAX_IDS IDs, and at most
+    # INVALIDATION_QUEUE_SIZE wait to be sent. 'local' only suits a single
+    # worker process.
+    INVALIDATION_BUS: Literal['local', 'postgres', 'redis'] = 'local'
+    INVALIDATION_CHANNEL: str = 'madr_invalidations'
+    INVALIDATION_REDIS_URL: str = 'redis://localhost:6379'
+    INVALIDATION_QUEUE_SIZE: int = 1000
+    INVALIDATION_MAX_IDS: int = 500
+
+    # Server run by `python -m src.utils.serve`: SERVER_WORKERS worker
+    # processes, 0 for one per CPU available to the server, cgroup quotas
+    # included. SERVER_KEEPALIVE_SECONDS is longer than the idle timeout
+    # of common load balancers, so that they close idle connections first.
+    SERVER_HOST: str = '0.0.0.0'
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0
+    SERVER_BACKLOG: int = 2048
+    SERVER_KEEPALIVE_SECONDS: int = 65
+
+    # Responses of at least COMPRESSION_MINIMUM_SIZE bytes are compressed
+    # with the encoding preferred by the client among gzip, br and zstd,
+    # the latter two with the `compression` extra, at the level set for the
+    # encoding. The compressed bodies of the last COMPRESSION_CACHE_SIZE
+    # distinct responses are kept, so hot responses are compressed once.
+    # Streamed responses are not compressed.
+    COMPRESSION_MINIMUM_SIZE: int = 1000
+    COMPRESSION_LEVELS: dict[str, int] = {'zstd': 3, 'br': 4, 'gzip': 6}
+    COMPRESSION_CACHE_SIZE: int = 256
 
     SECRET_KEY: str = 'your-secret-key'
     ALGORITHM: str = 'HS256'
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    # 'lookup' loads the user from the database to authorize each request.
+    # 'claims' trusts the id and role claims of short-lived access tokens,
+    # which are renewed with rotating refresh tokens.
+    ACCESS_TOKEN_MODE: Literal['lookup', 'claims'] = 'lookup'
+    CLAIMS_ACCESS_TOKEN_EXPIRE_MINUTES: int = 5
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    # Revoked access tokens are looked up in an in-process Bloom filter
+    # sized for this many entries, so only probable hits reach the database.
+    REVOCATION_FILTER_CAPACITY: int = 100_000
+    REVOCATION_FILTER_ERROR_RATE: float = 0.001
+    # How often expired revocations are purged and the filter is rebuilt
+    # from the database, which also picks up revocations made by other
+    # worker processes that the invalidation bus did not deliver.
+    REVOCATION_PURGE_INTERVAL_SECONDS: int = 300
+
+    # Failed logins are throttled per account and per client IP: past the
+    # maximum number of failures within the window, each new failure locks
+    # the key for an exponentially growing delay. The 'memory' backend is
+    # per worker, the 'database' backend is shared by all workers. The
+    # server refuses to run several workers with 'memory'.
+    LOGIN_THROTTLE_BACKEND: Literal['memory', 'database'] = 'memory'
+    LOGIN_THROTTLE_WINDOW_SECONDS: int = 900
+    LOGIN_THROTTLE_MAX_FAILURES_PER_ACCOUNT: int = 5
+    LOGIN_THROTTLE_MAX_FAILURES_PER_IP: int = 20
+    LOGIN_THROTTLE_BASE_DELAY_SECONDS: float = 1
+    LOGIN_THROTTLE_MAX_DELAY_SECONDS: float = 900
+
+    # argon2 password hashing costs. Calibrate them for the host with
+    # `python -m src.utils.calibrate_argon2`. Hashes made with other costs
+    # are rehashed on the next successful login.
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536  # KiB
+    ARGON2_PARALLELISM: int = 4
 
     FIRST_SUPERUSER_USERNAME: str = 'admin'
     FIRST_SUPERUSER_EMAIL: str = 'admin@admin.com'
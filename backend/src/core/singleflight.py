@@ -0,0 +1,74 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable, Sequence, TypeVar
+
+from src.core.invalidation import Invalidation, bus
+from src.core.metrics import metrics
+from src.core.settings import settings
+
+T = TypeVar('T')
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical calls into a single execution.
+
+    The first caller for a key runs its function; callers arriving with the
+    same key while it is in flight await the same result instead of running
+    their own. The key is forgotten as soon as the call completes, so
+    nothing is cached beyond the in-flight window. Results are shared
+    between callers and must be treated as read-only.
+
+    A call never joins one that started before a change of the `entities`
+    it reads was published on the invalidation bus of this process, so a
+    client reading after its own write gets the written data. The changes
+    committed by other processes only count once the bus delivered them.
+
+    The number of executions saved is counted in the
+    `singleflight_<name>_saved` metric.
+    """
+
+    def __init__(self, name: str, entities: Sequence[str] = ()) -> None:
+        self.name = name
+        self._calls: dict[Hashable, asyncio.Future[Any]] = {}
+        # Number of changes of the entities published so far, part of the
+        # keys of the calls
+        self._generation = 0
+        for entity in entities:
+            bus.subscribe(entity, self._invalidate)
+
+    def _invalidate(self, invalidation: Invalidation) -> None:
+        self._generation += 1
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        if not settings.READ_COALESCING:
+            return await fn()
+
+        key = (self._generation, key)
+        in_flight = self._calls.get(key)
+        if in_flight is None:
+            return await self._lead(key, fn)
+
+        metrics.incr(f'singleflight_{self.name}_saved')
+        try:
+            result: T = await asyncio.shield(in_flight)
+        except asyncio.CancelledError:
+            current_task = asyncio.current_task()
+            if not in_flight.cancelled() or (
+                current_task and current_task.cancelling()
+            ):
+                raise
+            # The leading request was cancelled, e.g. its client went away
+            metrics.incr(f'singleflight_{self.name}_saved', -1)
+            return await fn()
+
+        return result
+
+    async def _lead(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = asyncio.ensure_future(fn())
+        self._calls[key] = task
+        task.add_done_callback(lambda _: self._calls.pop(key, None))
+
+        return await task
+
+    def __len__(self) -> int:
+        return len(self._calls)
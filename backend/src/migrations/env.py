@@ -1,5 +1,6 @@
 import asyncio
 from logging.config import fileConfig
+from typing import Any
 
 from sqlalchemy import pool
 from sqlalchemy.engine import Connection
@@ -9,6 +10,7 @@ from alembic import context
 
 from src.models import Base
 from src.core.settings import settings
+from src.migrations.partitions import is_layout_object
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -32,6 +34,21 @@ target_metadata = Base.metadata
 # ... etc.
 
 
+def include_name(name: str | None, type_: str, parent_names: dict[str, Any]) -> bool:
+    # Tables of the optional partitioned books layout are not in the models
+    if settings.BOOKS_PARTITIONING and type_ == 'table' and name:
+        return not is_layout_object(type_, name, name)
+    return True
+
+
+def include_object(
+    object: Any, name: str | None, type_: str, reflected: bool, compare_to: Any
+) -> bool:
+    if settings.BOOKS_PARTITIONING and type_ in ('index', 'unique_constraint'):
+        return not is_layout_object(type_, name, object.table.name)
+    return True
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -50,6 +67,9 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        transaction_per_migration=True,
+        include_name=include_name,
+        include_object=include_object,
     )
 
     with context.begin_transaction():
@@ -57,7 +77,16 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    # Each revision runs in its own transaction, so that the online helpers
+    # in src/migrations/helpers.py can step out of it (e.g. to create an
+    # index concurrently) without committing unrelated revisions midway.
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        transaction_per_migration=True,
+        include_name=include_name,
+        include_object=include_object,
+    )
 
     with context.begin_transaction():
         context.run_migrations()
@@ -0,0 +1,211 @@
+"""
+Helpers for online migrations that must not lock busy tables.
+
+Usage inside a revision:
+
+    from src.migrations.helpers import (
+        backfill_in_batches,
+        create_index_concurrently,
+    )
+
+    def upgrade() -> None:
+        create_index_concurrently('ix_books_year', 'books', ['year'])
+        backfill_in_batches(
+            'books', {'year': sa.text('0')}, name='books_year_default'
+        )
+
+Both helpers leave the revision transaction and run in autocommit mode, so
+`env.py` configures Alembic with `transaction_per_migration=True`: the
+revisions preceding an online operation are committed when it starts.
+"""
+
+import logging
+import time
+from typing import Any, Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+from src.migrations.partitions import is_partitioned
+
+logger = logging.getLogger('alembic.helpers')
+
+checkpoints_table = sa.Table(
+    'migration_backfill_checkpoints',
+    sa.MetaData(),
+    sa.Column('name', sa.String(), primary_key=True),
+    sa.Column('last_id', sa.BigInteger(), nullable=False),
+)
+
+
+def _drop_invalid_index(index_name: str) -> None:
+    # A failed CREATE INDEX CONCURRENTLY leaves an INVALID index behind that
+    # must be dropped before the operation can be retried.
+    invalid = op.get_bind().scalar(
+        sa.text(
+            'SELECT NOT i.indisvalid FROM pg_index i '
+            'JOIN pg_class c ON c.oid = i.indexrelid '
+            'WHERE c.relname = :index_name'
+        ),
+        {'index_name': index_name},
+    )
+    if invalid:
+        logger.info('Dropping invalid index %s', index_name)
+        op.drop_index(
+            index_name, postgresql_concurrently=True, if_exists=True
+        )
+
+
+def _concurrently(table_name: str) -> bool:
+    # Indexes of partitioned tables cannot be built or dropped concurrently
+    connection = op.get_bind()
+    return connection.dialect.name != 'postgresql' or not is_partitioned(
+        connection, table_name
+    )
+
+
+def create_index_concurrently(
+    index_name: str,
+    table_name: str,
+    columns: Sequence[str | sa.TextClause],
+    **kw: Any,
+) -> None:
+    """
+    Create an index without blocking writes on the table.
+
+    On PostgreSQL the index is built with `CREATE INDEX CONCURRENTLY` outside
+    of the revision transaction, after dropping any invalid leftover of a
+    previous failed attempt. Partitioned tables, which do not support it,
+    and other dialects create the index normally.
+
+    :param index_name: The name of the index.
+    :param table_name: The name of the indexed table.
+    :param columns: The indexed columns or expressions.
+    :param kw: Extra arguments for `op.create_index`, such as `unique` or
+        `postgresql_include`.
+    """
+    with op.get_context().autocommit_block():
+        if op.get_bind().dialect.name == 'postgresql':
+            _drop_invalid_index(index_name)
+
+        op.create_index(
+            index_name,
+            table_name,
+            columns,
+            postgresql_concurrently=_concurrently(table_name),
+            if_not_exists=True,
+            **kw,
+        )
+
+
+def drop_index_concurrently(index_name: str, table_name: str) -> None:
+    """
+    Drop an index without blocking reads and writes on the table.
+
+    :param index_name: The name of the index.
+    :param table_name: The name of the indexed table.
+    """
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            index_name,
+            table_name,
+            postgresql_concurrently=_concurrently(table_name),
+            if_exists=True,
+        )
+
+
+def _save_checkpoint(name: str, last_id: int) -> None:
+    connection = op.get_bind()
+    updated = connection.execute(
+        checkpoints_table.update()
+        .where(checkpoints_table.c.name == name)
+        .values(last_id=last_id)
+    )
+    if not updated.rowcount:
+        connection.execute(
+            checkpoints_table.insert().values(name=name, last_id=last_id)
+        )
+
+
+def backfill_in_batches(
+    table_name: str,
+    values: dict[str, Any],
+    name: str,
+    where: sa.TextClause | None = None,
+    batch_size: int = 1000,
+    pause_seconds: float = 0.1,
+    id_column: str = 'id',
+) -> int:
+    """
+    Update the rows of a table in id ranges, each range committed on its own.
+
+    Locks are only held for one batch at a time, and the pause between
+    batches leaves room for the regular workload and for replication to
+    catch up. The last processed id is stored under `name` in the
+    `migration_backfill_checkpoints` table after every batch, so a backfill
+    interrupted midway resumes where it stopped when the revision runs again.
+    The update must be idempotent, since the batch running when the
+    backfill is interrupted is applied again.
+
+    :param table_name: The name of the table to update.
+    :param values: The columns to set, mapped to their new values or SQL
+        expressions.
+    :param name: A unique name identifying the backfill checkpoint.
+    :param where: An optional extra SQL condition for the rows to update.
+    :param batch_size: The size of each id range.
+    :param pause_seconds: The time to sleep between batches.
+    :param id_column: The integer column used to split the table in ranges.
+    :return: The number of rows updated.
+    """
+    table = sa.table(
+        table_name, sa.column(id_column), *(sa.column(key) for key in values)
+    )
+    id_col = table.c[id_column]
+
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        checkpoints_table.create(connection, checkfirst=True)
+
+        last_id = connection.scalar(
+            sa.select(checkpoints_table.c.last_id).where(
+                checkpoints_table.c.name == name
+            )
+        )
+        start_query = sa.select(sa.func.min(id_col) - 1)
+        if last_id is not None:
+            start_query = start_query.where(id_col > last_id)
+        start_id = connection.scalar(start_query)
+        max_id = connection.scalar(sa.select(sa.func.max(id_col)))
+
+        if start_id is None:
+            logger.info('Backfill %s: nothing to do', name)
+            return 0
+
+        total_updated = 0
+        batch_start = start_id
+        while batch_start < max_id:
+            batch_end = min(batch_start + batch_size, max_id)
+            statement = (
+                table.update()
+                .where(id_col > batch_start, id_col <= batch_end)
+                .values(values)
+            )
+            if where is not None:
+                statement = statement.where(where)
+
+            total_updated += connection.execute(statement).rowcount
+            _save_checkpoint(name, batch_end)
+            logger.info(
+                'Backfill %s: %s rows updated, up to %s %s of %s',
+                name,
+                total_updated,
+                id_column,
+                batch_end,
+                max_id,
+            )
+
+            batch_start = batch_end
+            if batch_start < max_id:
+                time.sleep(pause_seconds)
+
+    return total_updated
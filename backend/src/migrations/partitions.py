@@ -0,0 +1,319 @@
+"""
+Year-range partitioning of the `books` table on PostgreSQL.
+
+The partitioned layout splits `books` into one partition per span of
+`BOOKS_PARTITION_YEARS` years (`books_y1990` holds 1990 to 1999 with the
+default span), plus a `books_default` partition for the years without a
+partition of their own. Queries filtering on `year` only scan the matching
+partition.
+
+A unique constraint on a partitioned table must include the partition key,
+so `title` can no longer be unique on `books` itself. Unique titles are
+instead kept in the `book_titles` table, maintained by the
+`books_unique_title` trigger: inserting or renaming a book to a taken title
+fails with a unique violation of `book_titles_pkey`, as it did on the plain
+table. The primary key becomes (id, year); ids still come from the
+`books_id_seq` sequence, so they stay unique.
+
+Partitions are meant to exist before rows arrive. `create_partitions`, run
+by `python -m src.utils.book_partitions`, creates them ahead of time, and
+moves any matching rows out of the default partition.
+
+All the functions run on the given connection, in its transaction.
+"""
+
+import logging
+import re
+from datetime import date
+from typing import Sequence
+
+import sqlalchemy as sa
+
+logger = logging.getLogger('alembic.partitions')
+
+DEFAULT_PARTITION = 'books_default'
+PARTITION_NAME = re.compile(r'books_(default|y_?\d+)')
+
+UNIQUE_TITLE_FUNCTION = """
+CREATE OR REPLACE FUNCTION books_unique_title() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        DELETE FROM book_titles
+        WHERE title = OLD.title AND book_id = OLD.id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO book_titles (title, book_id) VALUES (NEW.title, NEW.id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def partition_start(year: int, span: int) -> int:
+    return year - year % span
+
+
+def partition_name(start: int) -> str:
+    return f'books_y{start}'.replace('-', '_')
+
+
+def is_layout_object(type_: str, name: str | None, table_name: str) -> bool:
+    """
+    Whether a schema object belongs to the partitioned layout rather than
+    to the models, for Alembic autogenerate to ignore it.
+
+    :param type_: The object type, as given to the `include_name` and
+        `include_object` hooks.
+    :param name: The name of the object.
+    :param table_name: The name of its table, or of itself for tables.
+    """
+    if table_name == 'book_titles' or PARTITION_NAME.fullmatch(table_name):
+        return True
+
+    return table_name == 'books' and (
+        type_ == 'unique_constraint' or name == 'ix_books_title'
+    )
+
+
+def upcoming_years(span: int, ahead: int) -> list[int]:
+    """
+    :return: A year in the current partition span and in each of the
+        `ahead` next ones.
+    """
+    current_year = date.today().year
+    return [current_year + span * index for index in range(ahead + 1)]
+
+
+def is_partitioned(
+    connection: sa.Connection, table_name: str = 'books'
+) -> bool:
+    partitioned: bool = connection.scalar(
+        sa.text(
+            'SELECT EXISTS (SELECT FROM pg_partitioned_table p '
+            'JOIN pg_class c ON c.oid = p.partrelid '
+            'WHERE c.relname = :table_name)'
+        ),
+        {'table_name': table_name},
+    )
+    return partitioned
+
+
+def get_partitions(connection: sa.Connection) -> list[str]:
+    """
+    :return: The names of the partitions of `books`, the default one
+        included.
+    """
+    return list(
+        connection.scalars(
+            sa.text(
+                'SELECT c.relname FROM pg_inherits i '
+                'JOIN pg_class c ON c.oid = i.inhrelid '
+                "WHERE i.inhparent = 'books'::regclass ORDER BY c.relname"
+            )
+        )
+    )
+
+
+def _secondary_definitions(connection: sa.Connection, table: str) -> list[str]:
+    # Foreign keys and indexes not backing the primary key or a unique
+    # constraint, as statements recreating them on a new `books` table
+    foreign_keys = connection.execute(
+        sa.text(
+            'SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint '
+            "WHERE conrelid = CAST(:table AS regclass) AND contype = 'f'"
+        ),
+        {'table': table},
+    )
+    indexes = connection.scalars(
+        sa.text(
+            'SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i '
+            'WHERE i.indrelid = CAST(:table AS regclass) '
+            'AND NOT i.indisprimary AND NOT i.indisunique'
+        ),
+        {'table': table},
+    )
+
+    return [
+        f'ALTER TABLE books ADD CONSTRAINT {name} {definition}'
+        for name, definition in foreign_keys
+    ] + [
+        definition.replace(f'ON public.{table} ', 'ON public.books ')
+        for definition in indexes
+    ]
+
+
+def _replace_books_table(
+    connection: sa.Connection, old_name: str, partition_by: str
+) -> list[str]:
+    # Move `books` out of the way and create an empty table of the same
+    # shape in its place. Returns the statements recreating its foreign keys
+    # and indexes, which, like the new primary key, can only run once the
+    # old table is dropped, as index names are unique per schema.
+    connection.execute(sa.text('LOCK TABLE books IN ACCESS EXCLUSIVE MODE'))
+    definitions = _secondary_definitions(connection, 'books')
+    connection.execute(sa.text(f'ALTER TABLE books RENAME TO {old_name}'))
+    connection.execute(sa.text('ALTER SEQUENCE books_id_seq OWNED BY NONE'))
+    connection.execute(
+        sa.text(
+            f'CREATE TABLE books (LIKE {old_name} INCLUDING DEFAULTS) '
+            f'{partition_by}'
+        )
+    )
+
+    return definitions
+
+
+def _finish_books_table(
+    connection: sa.Connection, old_name: str, definitions: Sequence[str]
+) -> None:
+    connection.execute(sa.text(f'INSERT INTO books SELECT * FROM {old_name}'))
+    connection.execute(sa.text(f'DROP TABLE {old_name}'))
+    connection.execute(
+        sa.text('ALTER SEQUENCE books_id_seq OWNED BY books.id')
+    )
+    for definition in definitions:
+        connection.execute(sa.text(definition))
+
+
+def create_partition(connection: sa.Connection, start: int, span: int) -> bool:
+    """
+    Create the partition of the years from `start` to `start + span`,
+    unless it exists, and move its rows out of the default partition.
+
+    :param connection: A connection to a database with partitioned books.
+    :param start: The first year of the partition, a multiple of `span`.
+    :param span: The number of years of the partition.
+    :return: Whether the partition was created.
+    """
+    name = partition_name(start)
+    if name in get_partitions(connection):
+        return False
+
+    bounds = {'start': start, 'end': start + span}
+    # Rows may be moved from the default partition: keep the titles of
+    # concurrent writes from getting in between
+    connection.execute(sa.text('LOCK TABLE books IN SHARE ROW EXCLUSIVE MODE'))
+    connection.execute(
+        sa.text(f'CREATE TABLE {name} (LIKE books INCLUDING DEFAULTS)')
+    )
+    # Deleting from the default partition also drops the titles of the
+    # moved books, which are added back once they are in the new partition
+    moved = connection.execute(
+        sa.text(
+            f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} '
+            'WHERE year >= :start AND year < :end RETURNING *) '
+            f'INSERT INTO {name} SELECT * FROM moved'
+        ),
+        bounds,
+    ).rowcount
+    if moved:
+        connection.execute(
+            sa.text(
+                'INSERT INTO book_titles (title, book_id) '
+                f'SELECT title, id FROM {name}'
+            )
+        )
+    connection.execute(
+        sa.text(
+            f'ALTER TABLE books ATTACH PARTITION {name} '
+            f'FOR VALUES FROM ({start}) TO ({start + span})'
+        )
+    )
+    logger.info('Created partition %s, %s rows moved', name, moved)
+
+    return True
+
+
+def create_partitions(
+    connection: sa.Connection, years: Sequence[int], span: int
+) -> list[str]:
+    """
+    Create the missing partitions for the given years.
+
+    :param connection: A connection to a database with partitioned books.
+    :param years: The years the partitions must cover.
+    :param span: The number of years per partition.
+    :return: The names of the created partitions.
+    """
+    starts = sorted({partition_start(year, span) for year in years})
+
+    return [
+        partition_name(start)
+        for start in starts
+        if create_partition(connection, start, span)
+    ]
+
+
+def partition_books(
+    connection: sa.Connection, span: int, years_ahead: Sequence[int]
+) -> None:
+    """
+    Convert `books` into a table partitioned by ranges of years.
+
+    The table is locked and copied, so this is meant for a maintenance
+    window. Partitions are created for the years with books and for
+    `years_ahead`; other years go to the default partition.
+
+    :param connection: A connection to a PostgreSQL database.
+    :param span: The number of years per partition.
+    :param years_ahead: Years to create partitions for, even if empty.
+    """
+    definitions = [
+        'ALTER TABLE books ADD CONSTRAINT books_pkey PRIMARY KEY (id, year)',
+        'CREATE INDEX ix_books_title ON books (title)',
+        *_replace_books_table(
+            connection, 'books_unpartitioned', 'PARTITION BY RANGE (year)'
+        ),
+    ]
+    connection.execute(
+        sa.text(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF books DEFAULT')
+    )
+    connection.execute(
+        sa.text(
+            'CREATE TABLE book_titles '
+            '(title VARCHAR PRIMARY KEY, book_id INTEGER NOT NULL)'
+        )
+    )
+    years = connection.scalars(
+        sa.text('SELECT DISTINCT year FROM books_unpartitioned')
+    )
+    create_partitions(connection, [*years, *years_ahead], span)
+
+    _finish_books_table(connection, 'books_unpartitioned', definitions)
+    connection.execute(
+        sa.text(
+            'INSERT INTO book_titles (title, book_id) '
+            'SELECT title, id FROM books'
+        )
+    )
+    connection.execute(sa.text(UNIQUE_TITLE_FUNCTION))
+    connection.execute(
+        sa.text(
+            'CREATE TRIGGER books_unique_title '
+            'AFTER INSERT OR UPDATE OF title OR DELETE ON books '
+            'FOR EACH ROW EXECUTE FUNCTION books_unique_title()'
+        )
+    )
+
+
+def unpartition_books(connection: sa.Connection) -> None:
+    """
+    Convert a partitioned `books` table back into a single table.
+
+    :param connection: A connection to a database with partitioned books.
+    """
+    definitions = [
+        'ALTER TABLE books ADD CONSTRAINT books_pkey PRIMARY KEY (id)',
+        'ALTER TABLE books ADD CONSTRAINT books_title_key UNIQUE (title)',
+        *(
+            definition
+            for definition in _replace_books_table(
+                connection, 'books_partitioned', ''
+            )
+            if 'ix_books_title' not in definition
+        ),
+    ]
+    _finish_books_table(connection, 'books_partitioned', definitions)
+    connection.execute(sa.text('DROP TABLE book_titles'))
+    connection.execute(sa.text('DROP FUNCTION books_unique_title()'))
@@ -0,0 +1,87 @@
+"""track catalog changes
+
+Revision ID: 5d7f2c9a4e18
+Revises: 18abd14a5f7d
+Create Date: 2026-10-19 16:05:12.431907
+
+"""
+from contextlib import contextmanager
+from typing import Iterator, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.migrations.helpers import (
+    create_index_concurrently,
+    drop_index_concurrently,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d7f2c9a4e18'
+down_revision: Union[str, None] = '18abd14a5f7d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+@contextmanager
+def sqlite_foreign_keys_off() -> Iterator[None]:
+    # Dropping the old authors table would otherwise delete their books.
+    # The pragma is ignored within a transaction.
+    with op.get_context().autocommit_block():
+        op.execute(sa.text('PRAGMA foreign_keys=OFF'))
+    yield
+    with op.get_context().autocommit_block():
+        op.execute(sa.text('PRAGMA foreign_keys=ON'))
+
+
+def upgrade() -> None:
+    op.create_table('catalog_tombstones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('entity', sa.String(), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_catalog_tombstones_entity_version', 'catalog_tombstones', ['entity', 'version'], unique=False)
+    catalog_version = op.create_table('catalog_version',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('value', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Existing rows are all published as version 1
+    op.bulk_insert(catalog_version, [{'id': 1, 'value': 1}])
+
+    for table_name in ('authors', 'books'):
+        # Constant defaults do not rewrite the table on PostgreSQL
+        op.add_column(table_name, sa.Column('version', sa.BigInteger(), server_default='1', nullable=False))
+        if op.get_bind().dialect.name != 'sqlite':
+            op.add_column(table_name, sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False))
+            op.alter_column(table_name, 'version', server_default=None)
+            continue
+
+        # SQLite cannot add a column with a non-constant default, so it is
+        # added empty, backfilled, then made NOT NULL with its default by
+        # recreating the table, which also drops the default of `version`
+        op.add_column(table_name, sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True))
+        op.execute(sa.text(f'UPDATE {table_name} SET updated_at = CURRENT_TIMESTAMP'))
+        with sqlite_foreign_keys_off():
+            with op.batch_alter_table(table_name) as batch_op:
+                batch_op.alter_column('version', existing_type=sa.BigInteger(), server_default=None)
+                batch_op.alter_column('updated_at', existing_type=sa.DateTime(timezone=True), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False)
+
+    create_index_concurrently(op.f('ix_authors_version'), 'authors', ['version'])
+    create_index_concurrently(op.f('ix_books_version'), 'books', ['version'])
+
+
+def downgrade() -> None:
+    drop_index_concurrently(op.f('ix_books_version'), 'books')
+    drop_index_concurrently(op.f('ix_authors_version'), 'authors')
+    op.drop_column('books', 'updated_at')
+    op.drop_column('books', 'version')
+    op.drop_column('authors', 'updated_at')
+    op.drop_column('authors', 'version')
+    op.drop_table('catalog_version')
+    op.drop_index('ix_catalog_tombstones_entity_version', table_name='catalog_tombstones')
+    op.drop_table('catalog_tombstones')
@@ -0,0 +1,49 @@
+"""partition books by year
+
+Revision ID: a4c6e8f1b2d3
+Revises: 5d7f2c9a4e18
+Create Date: 2026-10-19 17:20:41.118204
+
+Only applied on PostgreSQL with BOOKS_PARTITIONING enabled, otherwise a
+no-op. To partition a database that is already past this revision,
+downgrade to 5d7f2c9a4e18 and upgrade again with the setting enabled.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from src.core.settings import settings
+from src.migrations.partitions import (
+    is_partitioned,
+    partition_books,
+    unpartition_books,
+    upcoming_years,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c6e8f1b2d3'
+down_revision: Union[str, None] = '5d7f2c9a4e18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    if connection.dialect.name != 'postgresql' or not settings.BOOKS_PARTITIONING:
+        return
+
+    partition_books(
+        connection,
+        settings.BOOKS_PARTITION_YEARS,
+        upcoming_years(
+            settings.BOOKS_PARTITION_YEARS, settings.BOOKS_PARTITIONS_AHEAD
+        ),
+    )
+
+
+def downgrade() -> None:
+    connection = op.get_bind()
+    if connection.dialect.name == 'postgresql' and is_partitioned(connection):
+        unpartition_books(connection)
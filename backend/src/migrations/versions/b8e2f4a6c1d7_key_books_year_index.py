@@ -0,0 +1,33 @@
+"""key books year index
+
+Revision ID: b8e2f4a6c1d7
+Revises: e5b7d1f3a9c4
+Create Date: 2026-10-20 10:12:41.205318
+
+"""
+from typing import Sequence, Union
+
+from src.migrations.helpers import (
+    create_index_concurrently,
+    drop_index_concurrently,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e2f4a6c1d7'
+down_revision: Union[str, None] = 'e5b7d1f3a9c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The included columns copied every column of the books into the index
+    # for the year filter alone, which the planner only uses to find the
+    # books of a year
+    create_index_concurrently('ix_books_year_id', 'books', ['year', 'id'])
+    drop_index_concurrently('ix_books_year_covering', 'books')
+
+
+def downgrade() -> None:
+    create_index_concurrently('ix_books_year_covering', 'books', ['year'], postgresql_include=['id', 'title', 'author_id'])
+    drop_index_concurrently('ix_books_year_id', 'books')
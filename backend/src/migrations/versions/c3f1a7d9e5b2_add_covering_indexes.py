@@ -0,0 +1,30 @@
+"""add covering indexes
+
+Revision ID: c3f1a7d9e5b2
+Revises: a4c6e8f1b2d3
+Create Date: 2026-10-19 18:02:57.640315
+
+"""
+from typing import Sequence, Union
+
+from src.migrations.helpers import (
+    create_index_concurrently,
+    drop_index_concurrently,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f1a7d9e5b2'
+down_revision: Union[str, None] = 'a4c6e8f1b2d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    create_index_concurrently('ix_books_year_covering', 'books', ['year'], postgresql_include=['id', 'title', 'author_id'])
+    create_index_concurrently('ix_authors_id_covering', 'authors', ['id'], postgresql_include=['name'])
+
+
+def downgrade() -> None:
+    drop_index_concurrently('ix_authors_id_covering', 'authors')
+    drop_index_concurrently('ix_books_year_covering', 'books')
@@ -0,0 +1,30 @@
+"""cover books year index
+
+Revision ID: d7a9c1e3f5b8
+Revises: b8e2f4a6c1d7
+Create Date: 2026-10-20 14:31:08.517264
+
+"""
+from typing import Sequence, Union
+
+from src.migrations.helpers import (
+    create_index_concurrently,
+    drop_index_concurrently,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a9c1e3f5b8'
+down_revision: Union[str, None] = 'b8e2f4a6c1d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    create_index_concurrently('ix_books_year_id_covering', 'books', ['year', 'id'], postgresql_include=['title', 'author_id'])
+    drop_index_concurrently('ix_books_year_id', 'books')
+
+
+def downgrade() -> None:
+    create_index_concurrently('ix_books_year_id', 'books', ['year', 'id'])
+    drop_index_concurrently('ix_books_year_id_covering', 'books')
@@ -0,0 +1,41 @@
+"""notify catalog versions
+
+Revision ID: e5b7d1f3a9c4
+Revises: c3f1a7d9e5b2
+Create Date: 2026-10-19 19:24:08.118452
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b7d1f3a9c4'
+down_revision: Union[str, None] = 'c3f1a7d9e5b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Other databases have no NOTIFY, the catalogue replicas poll instead
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute(
+        'CREATE OR REPLACE FUNCTION notify_catalog_version() RETURNS trigger AS $$ '
+        "BEGIN PERFORM pg_notify('catalog_version', NEW.value::text); "
+        'RETURN NULL; END; $$ LANGUAGE plpgsql'
+    )
+    op.execute(
+        'CREATE TRIGGER catalog_version_notify AFTER UPDATE ON catalog_version '
+        'FOR EACH ROW EXECUTE FUNCTION notify_catalog_version()'
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    op.execute('DROP TRIGGER catalog_version_notify ON catalog_version')
+    op.execute('DROP FUNCTION notify_catalog_version()')
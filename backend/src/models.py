@@ -1,7 +1,17 @@
 from datetime import datetime
 from typing import Any
 
-from sqlalchemy import ForeignKey, func
+from sqlalchemy import (
+    BigInteger,
+    DateTime,
+    ForeignKey,
+    Index,
+    Table,
+    event,
+    func,
+    text,
+)
+from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
@@ -34,8 +44,119 @@ class User(Base):
     )
 
 
+class RefreshToken(Base):
+    __tablename__ = 'refresh_tokens'
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), index=True
+    )
+    token_hash: Mapped[str] = mapped_column(unique=True)
+    family_id: Mapped[str] = mapped_column(index=True)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    revoked_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), default=None, nullable=True
+    )
+    created_at: Mapped[datetime] = mapped_column(server_default=func.now())
+
+
+class RevokedToken(Base):
+    __tablename__ = 'revoked_tokens'
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    # Either a single access token, by its `jti` claim, or every access token
+    # of a user issued up to `revoked_at`
+    jti: Mapped[str] = mapped_column(default=None, nullable=True, index=True)
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'),
+        default=None,
+        nullable=True,
+        index=True,
+    )
+    revoked_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    # Once every token the entry applies to has expired, it can be purged
+    expires_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), index=True
+    )
+
+
+class LoginFailure(Base):
+    __tablename__ = 'login_failures'
+    __table_args__ = (
+        Index('ix_login_failures_key_failed_at', 'key', 'failed_at'),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    # 'account:<email>' or 'ip:<address>'
+    key: Mapped[str]
+    # Unix timestamp
+    failed_at: Mapped[float] = mapped_column(index=True)
+
+
+class CatalogVersion(Base):
+    """
+    Single-row counter handing out the versions of catalogue changes.
+    """
+
+    __tablename__ = 'catalog_version'
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    value: Mapped[int] = mapped_column(BigInteger)
+
+
+# On PostgreSQL, each new catalogue version is sent on this channel with
+# NOTIFY when its transaction commits, for the in-memory catalogue replicas
+CATALOG_VERSION_CHANNEL = 'catalog_version'
+NOTIFY_CATALOG_VERSION = (
+    'CREATE OR REPLACE FUNCTION notify_catalog_version() RETURNS trigger '
+    "AS $$ BEGIN PERFORM pg_notify('catalog_version', NEW.value::text); "
+    'RETURN NULL; END; $$ LANGUAGE plpgsql',
+    'CREATE TRIGGER catalog_version_notify AFTER UPDATE ON catalog_version '
+    'FOR EACH ROW EXECUTE FUNCTION notify_catalog_version()',
+)
+
+
+@event.listens_for(CatalogVersion.__table__, 'after_create')
+def insert_catalog_version(
+    target: Table, connection: Connection, **kw: Any
+) -> None:
+    connection.execute(target.insert().values(id=1, value=0))
+    if connection.dialect.name == 'postgresql':
+        for statement in NOTIFY_CATALOG_VERSION:
+            connection.execute(text(statement))
+
+
+class CatalogTombstone(Base):
+    __tablename__ = 'catalog_tombstones'
+    __table_args__ = (
+        Index('ix_catalog_tombstones_entity_version', 'entity', 'version'),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    # 'book' or 'author'
+    entity: Mapped[str]
+    entity_id: Mapped[int]
+    version: Mapped[int] = mapped_column(BigInteger)
+    deleted_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+
 class Book(Base):
     __tablename__ = 'books'
+    __table_args__ = (
+        # Covers the book list projection, so that pages and counts of the
+        # books of a year are read with index-only scans on PostgreSQL
+        Index(
+            'ix_books_year_id_covering',
+            'year',
+            'id',
+            postgresql_include=['title', 'author_id'],
+        ),
+    )
+    # Fetch `updated_at` with RETURNING, as lazy loads cannot run under
+    # asyncio
+    __mapper_args__ = {'eager_defaults': True}
 
     id: Mapped[int] = mapped_column(primary_key=True)
     year: Mapped[int]
@@ -46,13 +167,29 @@ class Book(Base):
     author: Mapped['Author'] = relationship(
         back_populates='books',
     )
+    version: Mapped[int] = mapped_column(BigInteger, index=True)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
 
 
 class Author(Base):
     __tablename__ = 'authors'
+    __table_args__ = (
+        # Author names joined to the book list projection, read from the
+        # index alone
+        Index('ix_authors_id_covering', 'id', postgresql_include=['name']),
+    )
+    # Fetch `updated_at` with RETURNING, as lazy loads cannot run under
+    # asyncio
+    __mapper_args__ = {'eager_defaults': True}
 
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(unique=True)
+    version: Mapped[int] = mapped_column(BigInteger, index=True)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
     books: Mapped[list[Book]] = relationship(
         back_populates='author',
         cascade='all, delete-orphan',
@@ -1,15 +1,14 @@
-import re
-
 from pydantic import BaseModel, field_validator
 
+from src.schemas.base import normalize_name
+
 
 class AuthorSchema(BaseModel):
     name: str
 
     @field_validator('name')
     def validate_name(cls, v: str) -> str:
-        v = v.lower().strip()
-        return re.sub(r'\s+', ' ', v)
+        return normalize_name(v)
 
 
 # Not inheriting from AuthorSchema to avoid the @field_validator
@@ -23,5 +22,15 @@ class AuthorList(BaseModel):
     total_results: int
 
 
+class AuthorChanges(BaseModel):
+    changed: list[AuthorPublic]
+    deleted: list[int]
+    # Catalogue version of the last change
+    version: int
+    has_more: bool
+    # To be sent as `since` on the next request
+    since: str
+
+
 class DeteleAuthosBulk(BaseModel):
     ids: list[int]
@@ -1,8 +1,17 @@
+import re
 from typing import List
 
 from pydantic import BaseModel
 
 
+def normalize_name(value: str) -> str:
+    """
+    Normalize a book title or an author name: lowercase, with single spaces
+    and no leading or trailing ones.
+    """
+    return re.sub(r'\s+', ' ', value.lower().strip())
+
+
 class Message(BaseModel):
     message: str
 
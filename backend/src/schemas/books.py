@@ -1,23 +1,40 @@
-import re
+from typing import Annotated
 
 from pydantic import BaseModel, Field, field_validator
 
+from src.schemas.base import normalize_name
+
+Year = Annotated[int, Field(gt=0, lt=2025)]
+
 
 class BookSchema(BaseModel):
     title: str
-    year: int = Field(gt=0, lt=2025)
+    year: Year
     author_id: int = Field(gt=0)
 
     @field_validator('title')
     def validate_name(cls, v: str) -> str:
-        v = v.lower().strip()
-        return re.sub(r'\s+', ' ', v)
+        return normalize_name(v)
+
+
+class BookRecord(BaseModel):
+    """
+    A book with the name of its author, as read by the bulk loader.
+    """
+
+    title: str
+    year: Year
+    author: str
+
+    @field_validator('title', 'author')
+    def validate_name(cls, v: str) -> str:
+        return normalize_name(v)
 
 
 class BookPublic(BaseModel):
     id: int
     title: str
-    year: int = Field(gt=0, lt=2025)
+    year: Year
     author: str
 
 
@@ -26,7 +43,7 @@ class BookResponseCreate(BookPublic):
 
 
 class BookUpdate(BaseModel):
-    year: int = Field(gt=0, lt=2025)
+    year: Year
 
 
 class BookList(BaseModel):
@@ -34,5 +51,43 @@ class BookList(BaseModel):
     total_results: int
 
 
+class CompactBook(BaseModel):
+    id: int
+    title: str
+    year: int
+    author_id: int
+
+
+class CompactBookList(BaseModel):
+    books: list[CompactBook]
+    # Names of the authors of the books, by ID
+    authors: dict[int, str]
+    total_results: int
+
+
+class BookColumns(BaseModel):
+    id: list[int]
+    title: list[str]
+    year: list[int]
+    author_id: list[int]
+
+
+class ColumnarBookList(BaseModel):
+    books: BookColumns
+    # Names of the authors of the books, by ID
+    authors: dict[int, str]
+    total_results: int
+
+
+class BookChanges(BaseModel):
+    changed: list[BookPublic]
+    deleted: list[int]
+    # Catalogue version of the last change
+    version: int
+    has_more: bool
+    # To be sent as `since` on the next request
+    since: str
+
+
 class DeteleBooksBulk(BaseModel):
     ids: list[int]
@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+
+
+class PoolStatus(BaseModel):
+    size: int
+    max_overflow: int
+    checked_out: int
+    saturation: float
+    timeout: float
+
+
+class MetricsResponse(BaseModel):
+    counters: dict[str, int]
+    pools: dict[str, PoolStatus]
@@ -4,6 +4,17 @@ from pydantic import BaseModel
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: str | None = None
+
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
+
+class Principal(BaseModel):
+    id: int
+    email: str
+    is_superuser: bool
 
 
 class TokenData(BaseModel):
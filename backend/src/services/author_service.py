@@ -1,8 +1,17 @@
-from sqlalchemy import delete, func, select
+from typing import AsyncIterator, Sequence
+
+from sqlalchemy import Row, delete, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.core.settings import settings
+from src.core.singleflight import SingleFlight
 from src.models import Author
 from src.schemas.authors import AuthorSchema
+from src.services import change_feed, statements
+from src.services.change_feed import ChangeSet
+from src.services.pagination import fetch_page
+
+authors_list_flight = SingleFlight('authors_list', ['author'])
 
 
 async def add_author(session: AsyncSession, author: AuthorSchema) -> Author:
@@ -34,7 +43,7 @@ async def get_author_by_id(
     """
     async with session:
         author_db = await session.scalar(
-            select(Author).where(Author.id == author_id)
+            statements.author_by_id, {'author_id': author_id}
         )
 
     return author_db
@@ -52,12 +61,22 @@ async def get_author_by_name(
     """
     async with session:
         author_db = await session.scalar(
-            select(Author).where(Author.name == author_name)
+            statements.author_by_name, {'author_name': author_name}
         )
 
     return author_db
 
 
+def authors_page_size(limit: int | None) -> int:
+    """
+    :return: The size of an author list page with the given limit, at most
+        `AUTHORS_MAX_PAGE_SIZE`.
+    """
+    return min(
+        limit or settings.AUTHORS_MAX_PAGE_SIZE, settings.AUTHORS_MAX_PAGE_SIZE
+    )
+
+
 async def get_filtered_authors_list(
     session: AsyncSession,
     limit: int | None,
@@ -76,7 +95,9 @@ async def get_filtered_authors_list(
                     queries.
     :param author_name: An optional substring to filter authors by name. If
                         None, no filtering is applied.
-    :param limit: The maximum number of authors to retrieve per page.
+    :param limit: The maximum number of authors to retrieve per page. None,
+                  or a limit above `AUTHORS_MAX_PAGE_SIZE`, retrieves
+                  `AUTHORS_MAX_PAGE_SIZE` authors.
     :param offset: The number of authors to skip before retrieving results
                     (default is 0).
     :return: A tuple containing:
@@ -94,14 +115,69 @@ async def get_filtered_authors_list(
             query = query.filter(filter_condition)
             count_query = count_query.filter(filter_condition)
 
-        if limit:
-            query = query.limit(limit).offset(offset)
+        authors_list, total_count = await fetch_page(
+            session,
+            query.limit(authors_page_size(limit)).offset(offset),
+            count_query,
+        )
+
+    return authors_list, total_count
+
+
+async def stream_authors(
+    session: AsyncSession,
+    author_name: str | None = None,
+    chunk_size: int = settings.AUTHORS_STREAM_CHUNK_SIZE,
+) -> AsyncIterator[Sequence[Row[tuple[int, str]]]]:
+    """
+    Iterate over all the authors whose names contain a substring, in chunks
+    ordered by ID.
+
+    Each chunk is read with its own query, continuing after the last ID of
+    the previous one, and the rows are plain (id, name) tuples rather than
+    `Author` objects. Memory use thus depends on the chunk size only, and
+    the connection is released between chunks.
+
+    :param session: The asynchronous database session used for the queries.
+    :param author_name: An optional substring to filter authors by name.
+    :param chunk_size: The number of authors read per query.
+    :return: An async iterator over lists of (id, name) rows.
+    """
+    query = (
+        select(Author.id, Author.name).order_by(Author.id).limit(chunk_size)
+    )
+    if author_name:
+        query = query.where(Author.name.contains(author_name))
+
+    last_id = 0
+    while True:
+        async with session:
+            rows = (
+                await session.execute(query.where(Author.id > last_id))
+            ).all()
 
-        total_count = await session.scalar(count_query)
-        authors_db = await session.scalars(query)
-        authors_list = authors_db.all()
+        if not rows:
+            return
 
-    return list(authors_list), total_count or 0
+        yield rows
+        last_id = rows[-1].id
+
+
+async def get_filtered_authors_list_shared(
+    session: AsyncSession,
+    limit: int | None,
+    author_name: str | None = None,
+    offset: int = 0,
+) -> tuple[list[Author], int]:
+    """
+    Like `get_filtered_authors_list`, but concurrent calls with the same
+    arguments share a single pair of queries. The returned Authors may be
+    shared with other callers and must not be modified.
+    """
+    return await authors_list_flight.do(
+        (limit, author_name, offset),
+        lambda: get_filtered_authors_list(session, limit, author_name, offset),
+    )
 
 
 async def get_authors_ids_list(
@@ -116,7 +192,7 @@ async def get_authors_ids_list(
     """
     async with session:
         authors_list = await session.scalars(
-            select(Author.id).filter(Author.id.in_(author_ids))
+            statements.author_ids_in, {'author_ids': author_ids}
         )
 
     return list(authors_list.all())
@@ -171,4 +247,23 @@ async def delete_authors_batch(
     :return: None
     """
     async with session.begin():
+        await change_feed.record_bulk_deletion(session, Author, author_ids)
         await session.execute(delete(Author).where(Author.id.in_(author_ids)))
+
+
+async def get_author_changes(
+    session: AsyncSession, since: str, limit: int
+) -> ChangeSet:
+    """
+    Retrieve the authors changed and deleted after a catalogue version.
+
+    :param session: The asynchronous database session used for the query.
+    :param since: The `since` returned by the previous call, or '0' for a
+        full sync.
+    :param limit: The number of changes to return.
+    :return: A `ChangeSet` with the changed `Author` objects and the IDs of
+        the deleted ones.
+    """
+    return await change_feed.get_changes(
+        session, Author, since=since, limit=limit
+    )
@@ -1,9 +1,32 @@
-from sqlalchemy import and_, delete, func, select
+from typing import Any, AsyncIterator, Literal, Sequence
+
+from sqlalchemy import ColumnElement, Row, Select, and_, delete, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import Bundle, selectinload
 
-from src.models import Book
+from src.core.settings import settings
+from src.core.singleflight import SingleFlight
+from src.models import Author, Book
 from src.schemas.books import BookSchema, BookUpdate
+from src.services import change_feed, statements
+from src.services.change_feed import ChangeSet
+from src.services.pagination import fetch_page
+
+# Books are read with the names of their authors
+book_by_id_flight = SingleFlight('book_by_id', ['book', 'author'])
+books_list_flight = SingleFlight('books_list', ['book', 'author'])
+book_rows_list_flight = SingleFlight('book_rows_list', ['book', 'author'])
+
+# The columns of `BookPublic` and the ID of the author, all held by the
+# covering indexes
+book_row: Bundle[Any] = Bundle(
+    'book',
+    Book.id,
+    Book.title,
+    Book.year,
+    Author.name.label('author'),
+    Book.author_id,
+)
 
 
 async def add_book(session: AsyncSession, book: BookSchema) -> Book:
@@ -38,14 +61,31 @@ async def get_book_by_id(session: AsyncSession, book_id: int) -> Book | None:
     """
     async with session:
         book_db = await session.scalar(
-            select(Book)
-            .options(selectinload(Book.author))
-            .where(Book.id == book_id)
+            statements.book_by_id, {'book_id': book_id}
         )
 
     return book_db
 
 
+async def get_book_by_id_shared(
+    session: AsyncSession, book_id: int
+) -> Book | None:
+    """
+    Like `get_book_by_id`, but concurrent calls for the same ID share a
+    single query. The returned Book may be shared with other callers and
+    must not be modified.
+
+    :param session: The asynchronous database session used for the query,
+        if this call runs it.
+    :param book_id: The ID of the book to retrieve.
+    :return: The Book object if found, or None if no book with the specified
+        ID exists.
+    """
+    return await book_by_id_flight.do(
+        book_id, lambda: get_book_by_id(session, book_id)
+    )
+
+
 async def get_book_by_title(
     session: AsyncSession, book_title: str
 ) -> Book | None:
@@ -59,14 +99,36 @@ async def get_book_by_title(
     """
     async with session:
         book_db = await session.scalar(
-            select(Book)
-            .options(selectinload(Book.author))
-            .where(Book.title == book_title)
+            statements.book_by_title, {'book_title': book_title}
         )
 
     return book_db
 
 
+def _books_filter(
+    book_title: str | None, book_year: int | None
+) -> ColumnElement[bool] | None:
+    if book_title and book_year:
+        return and_(Book.title.contains(book_title), Book.year == book_year)
+    if book_title:
+        return Book.title.contains(book_title)
+    if book_year:
+        return Book.year == book_year
+
+    return None
+
+
+def list_query_mode(session: AsyncSession) -> Literal['orm', 'projection']:
+    """
+    Return the book list query mode configured for the dialect the session
+    is bound to, falling back to 'orm'.
+
+    :param session: The asynchronous database session used for the query.
+    """
+    dialect_name = session.get_bind().dialect.name
+    return settings.BOOK_LIST_QUERY_MODES.get(dialect_name, 'orm')
+
+
 async def get_books_list(
     session: AsyncSession,
     limit: int,
@@ -92,32 +154,148 @@ async def get_books_list(
         - The total count of books in the database
         (not filtered by title or year).
     """
+    query = select(Book).options(selectinload(Book.author))
+    count_query = select(func.count(Book.id))
+
+    filter_condition = _books_filter(book_title, book_year)
+    if filter_condition is not None:
+        query = query.where(filter_condition)
+        count_query = count_query.where(filter_condition)
+
+    async with session:
+        books_list, total_count = await fetch_page(
+            session, query.limit(limit).offset(offset), count_query
+        )
+
+    return books_list, total_count
+
+
+async def get_books_list_shared(
+    session: AsyncSession,
+    limit: int,
+    offset: int,
+    book_title: str | None = None,
+    book_year: int | None = None,
+) -> tuple[list[Book], int]:
+    """
+    Like `get_books_list`, but concurrent calls with the same arguments
+    share a single pair of queries. The returned Books may be shared with
+    other callers and must not be modified.
+    """
+    return await books_list_flight.do(
+        (limit, offset, book_title, book_year),
+        lambda: get_books_list(session, limit, offset, book_title, book_year),
+    )
+
+
+def book_rows_queries(
+    limit: int,
+    offset: int,
+    book_title: str | None = None,
+    book_year: int | None = None,
+) -> tuple[Select[Any], Select[tuple[int]]]:
+    """
+    Build the page and count queries of `get_book_rows_list`.
+    """
+    query = select(book_row).join(Book.author)
+    count_query = select(func.count(Book.id))
+
+    filter_condition = _books_filter(book_title, book_year)
+    if filter_condition is not None:
+        query = query.where(filter_condition)
+        count_query = count_query.where(filter_condition)
+
+    return query.limit(limit).offset(offset), count_query
+
+
+async def get_book_rows_list(
+    session: AsyncSession,
+    limit: int,
+    offset: int,
+    book_title: str | None = None,
+    book_year: int | None = None,
+) -> tuple[list[Row[Any]], int]:
+    """
+    Like `get_books_list`, but select only the listed columns, with the name
+    of the author joined, instead of `Book` objects and their authors.
+
+    :return: A tuple containing:
+        - A list of rows with the `id`, `title`, `year`, `author` and
+        `author_id` of the books that match the provided filters (if any).
+        - The total count of books matching the filters.
+    """
+    query, count_query = book_rows_queries(
+        limit, offset, book_title, book_year
+    )
+
     async with session:
-        query = select(Book).options(selectinload(Book.author))
-        count_query = select(func.count(Book.id))
+        rows, total_count = await fetch_page(session, query, count_query)
 
-        has_filter = True
+    return rows, total_count
 
-        if book_title and book_year:
-            filter_condition = and_(
-                Book.title.contains(book_title), Book.year == book_year
-            )
-        elif book_title:
-            filter_condition = Book.title.contains(book_title)
-        elif book_year:
-            filter_condition = Book.year == book_year
-        else:
-            has_filter = False
 
-        if has_filter:
-            query = query.where(filter_condition)
-            count_query = count_query.filter(filter_condition)
+async def get_book_rows_list_shared(
+    session: AsyncSession,
+    limit: int,
+    offset: int,
+    book_title: str | None = None,
+    book_year: int | None = None,
+) -> tuple[list[Row[Any]], int]:
+    """
+    Like `get_book_rows_list`, but concurrent calls with the same arguments
+    share a single pair of queries.
+    """
+    return await book_rows_list_flight.do(
+        (limit, offset, book_title, book_year),
+        lambda: get_book_rows_list(
+            session, limit, offset, book_title, book_year
+        ),
+    )
 
-        total_count = await session.scalar(count_query)
-        books_db = await session.scalars(query.limit(limit).offset(offset))
-        books_list = books_db.all()
 
-    return list(books_list), total_count or 0
+async def stream_book_rows(
+    session: AsyncSession,
+    book_title: str | None = None,
+    book_year: int | None = None,
+    chunk_size: int = settings.BOOKS_EXPORT_BATCH_SIZE,
+) -> AsyncIterator[Sequence[Row[Any]]]:
+    """
+    Iterate over all the books matching the filters, in chunks ordered by
+    ID, as rows with the `id`, `title`, `year` and `author` of the books.
+
+    Like `author_service.stream_authors`, each chunk is read with its own
+    query continuing after the last ID of the previous one, so memory use
+    depends on the chunk size only.
+
+    :param session: The asynchronous database session used for the queries.
+    :param book_title: An optional substring to filter books by their title.
+    :param book_year: An optional year to filter books by their publication
+        year.
+    :param chunk_size: The number of books read per query.
+    :return: An async iterator over lists of rows.
+    """
+    query = (
+        select(Book.id, Book.title, Book.year, Author.name.label('author'))
+        .join(Book.author)
+        .order_by(Book.id)
+        .limit(chunk_size)
+    )
+    filter_condition = _books_filter(book_title, book_year)
+    if filter_condition is not None:
+        query = query.where(filter_condition)
+
+    last_id = 0
+    while True:
+        async with session:
+            rows = (
+                await session.execute(query.where(Book.id > last_id))
+            ).all()
+
+        if not rows:
+            return
+
+        yield rows
+        last_id = rows[-1].id
 
 
 async def get_books_ids_list(
@@ -132,7 +310,7 @@ async def get_books_ids_list(
     """
     async with session:
         books_list = await session.scalars(
-            select(Book.id).filter(Book.id.in_(book_ids))
+            statements.book_ids_in, {'book_ids': book_ids}
         )
 
     return list(books_list.all())
@@ -189,4 +367,27 @@ async def delete_books_batch(
     :return: None
     """
     async with session.begin():
+        await change_feed.record_bulk_deletion(session, Book, book_ids)
         await session.execute(delete(Book).where(Book.id.in_(book_ids)))
+
+
+async def get_book_changes(
+    session: AsyncSession, since: str, limit: int
+) -> ChangeSet:
+    """
+    Retrieve the books changed and deleted after a catalogue version.
+
+    :param session: The asynchronous database session used for the query.
+    :param since: The `since` returned by the previous call, or '0' for a
+        full sync.
+    :param limit: The number of changes to return.
+    :return: A `ChangeSet` with the changed `Book` objects and the IDs of the
+        deleted ones.
+    """
+    return await change_feed.get_changes(
+        session,
+        Book,
+        since=since,
+        limit=limit,
+        options=[selectinload(Book.author)],
+    )
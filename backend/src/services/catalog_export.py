@@ -0,0 +1,174 @@
+"""
+Columnar export of the book catalogue, as Arrow IPC streams or Parquet.
+
+Books are read in chunks of BOOKS_EXPORT_BATCH_SIZE rows with the name of
+their author joined, and each chunk becomes one Arrow record batch, encoded
+and handed out before the next one is read. Memory use thus depends on the
+batch size, not on the size of the catalogue.
+
+pyarrow is an optional dependency, installed with the `export` extra, and
+imported on first use. Without it, `is_available` is false and the export
+functions raise `ExportUnavailable`.
+"""
+
+import io
+from functools import cache
+from pathlib import Path
+from typing import Any, AsyncIterator, Literal
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.settings import settings
+from src.services import book_service
+
+ExportFormat = Literal['arrow', 'parquet']
+
+MEDIA_TYPES: dict[ExportFormat, str] = {
+    'arrow': 'application/vnd.apache.arrow.stream',
+    'parquet': 'application/vnd.apache.parquet',
+}
+FILE_EXTENSIONS: dict[ExportFormat, str] = {
+    'arrow': 'arrows',
+    'parquet': 'parquet',
+}
+
+
+class ExportUnavailable(Exception):
+    pass
+
+
+@cache
+def _pyarrow() -> Any:
+    """
+    Import pyarrow on first use, so that it is not loaded when the app is
+    imported.
+
+    :return: The `pyarrow` module, or None if it is not installed.
+    """
+    try:
+        import pyarrow  # noqa: PLC0415
+        import pyarrow.ipc  # noqa: PLC0415
+        import pyarrow.parquet  # noqa: PLC0415
+    except ImportError:  # pragma: no cover
+        return None
+
+    return pyarrow
+
+
+def is_available() -> bool:
+    return _pyarrow() is not None
+
+
+def book_schema() -> Any:
+    """
+    :return: The Arrow schema of the exported books, with the columns of
+        `BookPublic`.
+    """
+    pa = _pyarrow()
+    if pa is None:
+        raise ExportUnavailable('The columnar export requires pyarrow.')
+
+    return pa.schema([
+        pa.field('id', pa.int64(), nullable=False),
+        pa.field('title', pa.string(), nullable=False),
+        pa.field('year', pa.int32(), nullable=False),
+        pa.field('author', pa.string(), nullable=False),
+    ])
+
+
+async def book_record_batches(
+    session: AsyncSession,
+    book_title: str | None = None,
+    book_year: int | None = None,
+    batch_size: int = settings.BOOKS_EXPORT_BATCH_SIZE,
+) -> AsyncIterator[Any]:
+    """
+    Iterate over the books matching the filters as Arrow record batches.
+
+    :param session: The asynchronous database session used for the queries.
+    :param book_title: An optional substring to filter books by their title.
+    :param book_year: An optional year to filter books by their publication
+        year.
+    :param batch_size: The number of books per record batch.
+    :return: An async iterator over `pyarrow.RecordBatch` objects.
+    """
+    schema = book_schema()
+    pa = _pyarrow()
+
+    async for rows in book_service.stream_book_rows(
+        session, book_title, book_year, chunk_size=batch_size
+    ):
+        # Column-wise from the row tuples, without intermediate dicts
+        columns = zip(*rows)
+        yield pa.RecordBatch.from_arrays(
+            [
+                pa.array(column, type=field.type)
+                for column, field in zip(columns, schema)
+            ],
+            schema=schema,
+        )
+
+
+def _new_writer(export_format: ExportFormat, sink: Any, schema: Any) -> Any:
+    pa = _pyarrow()
+    if export_format == 'parquet':
+        return pa.parquet.ParquetWriter(sink, schema)
+
+    return pa.ipc.new_stream(sink, schema)
+
+
+async def encode_books(
+    session: AsyncSession,
+    export_format: ExportFormat,
+    book_title: str | None = None,
+    book_year: int | None = None,
+) -> AsyncIterator[bytes]:
+    """
+    Encode the books matching the filters as an Arrow IPC stream or a
+    Parquet file, one record batch at a time.
+
+    Each Parquet row group holds one record batch, and the file footer is
+    the last chunk.
+
+    :param session: The asynchronous database session used for the queries.
+    :param export_format: 'arrow' or 'parquet'.
+    :param book_title: An optional substring to filter books by their title.
+    :param book_year: An optional year to filter books by their publication
+        year.
+    :return: An async iterator over the encoded chunks.
+    """
+    sink = io.BytesIO()
+    writer = _new_writer(export_format, sink, book_schema())
+
+    def take() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    async for batch in book_record_batches(session, book_title, book_year):
+        writer.write_batch(batch)
+        yield take()
+
+    writer.close()
+    yield take()
+
+
+async def write_books(
+    session: AsyncSession, path: Path, export_format: ExportFormat
+) -> int:
+    """
+    Write every book to a file, as an Arrow IPC stream or a Parquet file.
+
+    :param session: The asynchronous database session used for the queries.
+    :param path: The file to write.
+    :param export_format: 'arrow' or 'parquet'.
+    :return: The number of books written.
+    """
+    books = 0
+    with _new_writer(export_format, str(path), book_schema()) as writer:
+        async for batch in book_record_batches(session):
+            writer.write_batch(batch)
+            books += batch.num_rows
+
+    return books
@@ -0,0 +1,550 @@
+"""
+In-memory replica of the book catalogue, serving reads without queries.
+
+Books and authors are stored column-wise and ordered by ID: IDs, years and
+author IDs in `array` columns, titles and names in lists. Hash indexes map
+IDs to positions, titles to book IDs and author IDs to their book IDs.
+Books hold the ID of their author, whose name is resolved when a book is
+read, so renaming an author changes a single entry.
+
+The replica follows the catalogue versions. `sync` reads the committed
+`catalog_version`, then applies the rows changed and the tombstones
+recorded after the version it holds, up to that one. On PostgreSQL the
+reads share a snapshot, so the replica then matches the catalogue as of a
+committed version. `run_catalog_replica` syncs whenever PostgreSQL notifies
+a new version, and polls on other databases.
+
+Reads are eventually consistent: a write shows up once the replica has
+synced, typically within milliseconds on PostgreSQL and within
+CATALOG_REPLICA_POLL_SECONDS otherwise. Title and name filters are
+case-sensitive substring matches, as `LIKE` is on PostgreSQL.
+
+With CATALOG_SNAPSHOT_PATH set, the workers of a server share one copy of
+the catalogue instead of holding a replica each. The worker holding the
+lock next to the snapshot file keeps the replica in sync and writes it as
+a snapshot (see `src.core.catalog_snapshot`) whenever its version changes.
+Every worker serves reads from the snapshot it mapped last, and maps the
+new one once it was replaced, within CATALOG_REPLICA_POLL_SECONDS. Should
+the writer exit, another worker takes the lock over and loads a replica.
+"""
+
+import asyncio
+import fcntl
+import logging
+from array import array
+from contextlib import suppress
+from pathlib import Path
+from typing import IO, Any, Sequence
+
+from sqlalchemy import ColumnElement, and_, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.catalog_snapshot import (
+    AuthorRecord,
+    BookRecord,
+    CatalogSnapshot,
+    paginate,
+    write_snapshot,
+)
+from src.core.invalidation import Invalidation, bus
+from src.core.metrics import metrics
+from src.models import (
+    CATALOG_VERSION_CHANNEL,
+    Author,
+    Book,
+    CatalogTombstone,
+    CatalogVersion,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class _Columns:
+    """
+    Records stored column-wise, ordered by their ID in the first column.
+
+    Deleting a record or adding one out of order leaves the columns
+    unordered until `compact` runs, which must happen before positions are
+    read in order again.
+    """
+
+    def __init__(self, typecodes: Sequence[str | None]) -> None:
+        # An array typecode per column, or None for a list of strings
+        self._typecodes = typecodes
+        self.columns: list[Any] = [
+            self._new_column(typecode) for typecode in typecodes
+        ]
+        self.positions: dict[int, int] = {}
+        self._compact_needed = False
+
+    @staticmethod
+    def _new_column(typecode: str | None, values: Any = ()) -> Any:
+        return array(typecode, values) if typecode else list(values)
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def row(self, position: int) -> tuple[Any, ...]:
+        return tuple(column[position] for column in self.columns)
+
+    def get(self, record_id: int) -> tuple[Any, ...] | None:
+        position = self.positions.get(record_id)
+        return None if position is None else self.row(position)
+
+    def upsert(self, record: Sequence[Any]) -> tuple[Any, ...] | None:
+        """
+        :return: The record replaced, if one had the same ID.
+        """
+        position = self.positions.get(record[0])
+        if position is not None:
+            previous = self.row(position)
+            for column, value in zip(self.columns, record):
+                column[position] = value
+            return previous
+
+        ids = self.columns[0]
+        if ids and record[0] < ids[-1]:
+            self._compact_needed = True
+        self.positions[record[0]] = len(ids)
+        for column, value in zip(self.columns, record):
+            column.append(value)
+        return None
+
+    def delete(self, record_id: int) -> tuple[Any, ...] | None:
+        position = self.positions.pop(record_id, None)
+        if position is None:
+            return None
+
+        # The values stay in the columns until the next compaction
+        self._compact_needed = True
+        return self.row(position)
+
+    def compact(self) -> None:
+        if not self._compact_needed:
+            return
+
+        live = sorted(self.positions.items())
+        self.columns = [
+            self._new_column(typecode, (column[p] for _, p in live))
+            for typecode, column in zip(self._typecodes, self.columns)
+        ]
+        self.positions = {
+            record_id: position for position, (record_id, _) in enumerate(live)
+        }
+        self._compact_needed = False
+
+
+class CatalogReplica:
+    def __init__(self) -> None:
+        self.clear()
+
+    def clear(self) -> None:
+        self.version = 0
+        # Whether the replica was loaded and can serve reads
+        self.ready = False
+        # id, title, year, author_id
+        self._books = _Columns(('q', None, 'l', 'q'))
+        # id, name
+        self._authors = _Columns(('q', None))
+        self._book_ids_by_title: dict[str, int] = {}
+        self._book_ids_by_author: dict[int, set[int]] = {}
+
+    def _upsert_book(self, row: Sequence[Any]) -> None:
+        previous = self._books.upsert(row)
+        if previous is not None:
+            self._unindex_book(previous)
+
+        book_id, title, _, author_id = row
+        self._book_ids_by_title[title] = book_id
+        self._book_ids_by_author.setdefault(author_id, set()).add(book_id)
+
+    def _unindex_book(self, row: Sequence[Any]) -> None:
+        book_id, title, _, author_id = row
+        # The title may already belong to another book changed by the sync
+        if self._book_ids_by_title.get(title) == book_id:
+            del self._book_ids_by_title[title]
+
+        book_ids = self._book_ids_by_author[author_id]
+        book_ids.discard(book_id)
+        if not book_ids:
+            del self._book_ids_by_author[author_id]
+
+    def _delete_book(self, book_id: int) -> None:
+        previous = self._books.delete(book_id)
+        if previous is not None:
+            self._unindex_book(previous)
+
+    def _delete_author(self, author_id: int) -> None:
+        # Like the database cascade
+        for book_id in list(self._book_ids_by_author.get(author_id, ())):
+            self._delete_book(book_id)
+        self._authors.delete(author_id)
+
+    async def load(self, session: AsyncSession) -> None:
+        """
+        Replace the content of the replica with the current catalogue.
+
+        :param session: The asynchronous database session used for the
+            queries.
+        """
+        self.clear()
+        await self.sync(session)
+
+    async def sync(self, session: AsyncSession) -> int:
+        """
+        Apply the catalogue changes committed since the last sync.
+
+        :param session: The asynchronous database session used for the
+            queries.
+        :return: The number of changed and deleted rows applied.
+        """
+
+        def changed_since(model: Any) -> ColumnElement[bool]:
+            return and_(model.version > since, model.version <= version)
+
+        since = self.version
+        async with session:
+            if session.get_bind().dialect.name == 'postgresql':
+                # A single snapshot for the version and the rows
+                await session.connection(
+                    execution_options={'isolation_level': 'REPEATABLE READ'}
+                )
+            version = await session.scalar(select(CatalogVersion.value))
+            if version is None or (self.ready and version == since):
+                return 0
+
+            authors = (
+                await session.execute(
+                    select(Author.id, Author.name).where(changed_since(Author))
+                )
+            ).all()
+            books = (
+                await session.execute(
+                    select(
+                        Book.id, Book.title, Book.year, Book.author_id
+                    ).where(changed_since(Book))
+                )
+            ).all()
+            # Nothing to delete from an empty replica
+            deleted = (
+                (
+                    await session.execute(
+                        select(
+                            CatalogTombstone.entity, CatalogTombstone.entity_id
+                        ).where(changed_since(CatalogTombstone))
+                    )
+                ).all()
+                if self.ready
+                else []
+            )
+
+        for author in authors:
+            self._authors.upsert(author)
+        for book in books:
+            self._upsert_book(book)
+        for entity, entity_id in deleted:
+            if entity == 'book':
+                self._delete_book(entity_id)
+            else:
+                self._delete_author(entity_id)
+        self._books.compact()
+        self._authors.compact()
+
+        self.version = version
+        self.ready = True
+        changes = len(authors) + len(books) + len(deleted)
+        metrics.incr('catalog_replica_syncs')
+        metrics.incr('catalog_replica_changes', changes)
+
+        return changes
+
+    def write_snapshot(self, path: Path) -> None:
+        """
+        Write the content of the replica as a snapshot.
+
+        :param path: The snapshot file, replaced atomically.
+        """
+        write_snapshot(
+            path, self.version, self._books.columns, self._authors.columns
+        )
+
+    def _book_record(self, position: int) -> BookRecord:
+        book_id, title, year, author_id = self._books.row(position)
+        authors = self._authors
+        name = authors.columns[1][authors.positions[author_id]]
+        return BookRecord(book_id, title, year, name, author_id)
+
+    def book(self, book_id: int) -> BookRecord | None:
+        position = self._books.positions.get(book_id)
+        return None if position is None else self._book_record(position)
+
+    def book_by_title(self, title: str) -> BookRecord | None:
+        book_id = self._book_ids_by_title.get(title)
+        return None if book_id is None else self.book(book_id)
+
+    def books_by_author(self, author_id: int) -> list[BookRecord]:
+        return [
+            self._book_record(self._books.positions[book_id])
+            for book_id in sorted(self._book_ids_by_author.get(author_id, ()))
+        ]
+
+    def books(
+        self,
+        limit: int,
+        offset: int,
+        title: str | None = None,
+        year: int | None = None,
+    ) -> tuple[list[BookRecord], int]:
+        """
+        Like `book_service.get_book_rows_list`, ordered by ID.
+
+        :return: The page of books matching the filters, and the number of
+            books matching them.
+        """
+        _, titles, years, _ = self._books.columns
+        positions: Sequence[int] = range(len(self._books))
+        if title or year:
+            positions = [
+                position
+                for position in positions
+                if (not title or title in titles[position])
+                and (not year or years[position] == year)
+            ]
+
+        return [
+            self._book_record(position)
+            for position in paginate(positions, limit, offset)
+        ], len(positions)
+
+    def author(self, author_id: int) -> AuthorRecord | None:
+        row = self._authors.get(author_id)
+        return None if row is None else AuthorRecord(*row)
+
+    def authors(
+        self, limit: int, offset: int, name: str | None = None
+    ) -> tuple[list[AuthorRecord], int]:
+        """
+        Like `author_service.get_filtered_authors_list`, ordered by ID and
+        without capping the page size.
+
+        :return: The page of authors matching the filter, and the number of
+            authors matching it.
+        """
+        ids, names = self._authors.columns
+        positions: Sequence[int] = range(len(self._authors))
+        if name:
+            positions = [
+                position for position in positions if name in names[position]
+            ]
+
+        return [
+            AuthorRecord(ids[position], names[position])
+            for position in paginate(positions, limit, offset)
+        ], len(positions)
+
+
+replica = CatalogReplica()
+
+# What the routes read from
+CatalogReader = CatalogReplica | CatalogSnapshot
+
+
+class SharedSnapshot:
+    """
+    The catalogue snapshot shared by the workers through a file.
+    """
+
+    def __init__(self) -> None:
+        # The snapshot file, or None when the workers do not share one
+        self.path: Path | None = None
+        # The snapshot mapped last
+        self.snapshot: CatalogSnapshot | None = None
+        self._lock: IO[bytes] | None = None
+        self._published: int | None = None
+
+    def enable(self, path: Path) -> None:
+        """
+        Share the catalogue through the snapshot at `path`.
+        """
+        self.close()
+        self.path = path
+
+    def lead(self) -> bool:
+        """
+        Take the lock of the writer if no other process holds it.
+
+        :return: Whether this process writes the snapshots.
+        """
+        assert self.path is not None
+        if self._lock is None:
+            lock = self.path.with_name(f'{self.path.name}.lock').open('ab')
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock.close()
+                return False
+            self._lock = lock
+
+        return True
+
+    def publish(self, catalog: CatalogReplica) -> bool:
+        """
+        Write the replica as the snapshot, unless it is already written.
+
+        :return: Whether a snapshot was written.
+        """
+        assert self.path is not None
+        if not catalog.ready or catalog.version == self._published:
+            return False
+
+        catalog.write_snapshot(self.path)
+        self._published = catalog.version
+        metrics.incr('catalog_snapshot_writes')
+        return True
+
+    def refresh(self) -> CatalogSnapshot | None:
+        """
+        Map the snapshot file if it was replaced since it was last mapped.
+
+        :return: The snapshot mapped, if one was written.
+        """
+        assert self.path is not None
+        if self.snapshot is None or self.snapshot.is_replaced():
+            with suppress(FileNotFoundError):
+                snapshot = CatalogSnapshot(self.path)
+                # Reads are synchronous, none is using the previous one
+                if self.snapshot is not None:
+                    self.snapshot.close()
+                self.snapshot = snapshot
+
+        return self.snapshot
+
+    def close(self) -> None:
+        """
+        Unmap the snapshot and stop sharing it.
+        """
+        self.path = None
+        self._published = None
+        if self.snapshot is not None:
+            self.snapshot.close()
+            self.snapshot = None
+        if self._lock is not None:
+            # Closing the file releases the lock
+            self._lock.close()
+            self._lock = None
+
+
+shared = SharedSnapshot()
+
+
+def get_reader() -> CatalogReader | None:
+    """
+    :return: What catalogue reads are served from, or None to query the
+        database.
+    """
+    if shared.path is not None:
+        return shared.snapshot
+    return replica if replica.ready else None
+
+
+def reset() -> None:
+    """
+    Clear the replica and unmap the shared snapshot, if any.
+    """
+    replica.clear()
+    shared.close()
+
+
+async def _listen(session: AsyncSession, changed: asyncio.Event) -> Any:
+    # A dedicated connection, outside of the pool, receiving the catalogue
+    # versions notified by PostgreSQL
+    url = session.get_bind().engine.url
+    if url.get_backend_name() != 'postgresql':
+        return None
+
+    import asyncpg  # noqa: PLC0415
+
+    connection = await asyncpg.connect(
+        url.set(drivername='postgresql').render_as_string(hide_password=False)
+    )
+    await connection.add_listener(
+        CATALOG_VERSION_CHANNEL, lambda *args: changed.set()
+    )
+    return connection
+
+
+async def sync_catalog(
+    session_factory: async_sessionmaker[AsyncSession],
+    changed: asyncio.Event | None = None,
+    listener: Any = None,
+) -> Any:
+    """
+    Sync the replica, then publish and map the shared snapshot, if any.
+
+    Only the writer of the shared snapshot syncs a replica.
+
+    :param session_factory: The factory of the sessions used to sync.
+    :param changed: An event set when PostgreSQL notifies a new version,
+        or None not to listen to the notifications.
+    :param listener: The connection listening to the notifications, if one
+        was opened by the previous call.
+    :return: The connection listening to the notifications, if any.
+    """
+    if shared.path is None or shared.lead():
+        async with session_factory() as session:
+            if changed is not None and (
+                listener is None or listener.is_closed()
+            ):
+                listener = await _listen(session, changed)
+            await replica.sync(session)
+        if shared.path is not None:
+            shared.publish(replica)
+
+    if shared.path is not None:
+        shared.refresh()
+
+    return listener
+
+
+async def run_catalog_replica(
+    session_factory: async_sessionmaker[AsyncSession], interval: float
+) -> None:
+    """
+    Keep the replica, or the shared snapshot, in sync with the catalogue
+    until cancelled.
+
+    On PostgreSQL, the replica syncs as soon as a new version is notified,
+    and polls every `interval` seconds in case a notification was missed
+    while reconnecting. On other databases it polls, and syncs as soon as
+    the invalidation bus delivers a catalogue change. The workers mapping
+    a snapshot written by another one poll only.
+
+    :param session_factory: The factory of the sessions used to sync.
+    :param interval: The longest time between two syncs, in seconds.
+    """
+    changed = asyncio.Event()
+    listener: Any = None
+
+    def invalidate(invalidation: Invalidation) -> None:
+        changed.set()
+
+    # Changes published on the invalidation bus by any worker process
+    for entity in ('book', 'author'):
+        bus.subscribe(entity, invalidate)
+    try:
+        while True:
+            try:
+                listener = await sync_catalog(
+                    session_factory, changed, listener
+                )
+            except Exception:
+                logger.exception('Catalogue replica sync failed')
+
+            with suppress(TimeoutError):
+                await asyncio.wait_for(changed.wait(), interval)
+            changed.clear()
+    finally:
+        for entity in ('book', 'author'):
+            bus.unsubscribe(entity, invalidate)
+        if listener is not None:
+            await listener.close()
@@ -0,0 +1,347 @@
+"""
+Versioning of catalogue changes, for clients syncing deltas.
+
+Every flush that inserts, updates or deletes books or authors takes a new
+version from the single-row `catalog_version` counter and stamps it on the
+changed rows. Deleted rows leave a tombstone with that version. The counter
+row stays locked until the writing transaction ends, so catalogue writes
+are serialized and versions become visible in commit order: a client that
+has seen version N will never later find a change committed with a lower
+version.
+
+Deletes that bypass the ORM, such as bulk deletes, record their
+tombstones with `record_bulk_deletion`. Inserts and updates that bypass it,
+such as bulk loads, must take a new version from the counter themselves:
+the column has no default, as a row stamped with the current version,
+already known to the clients, would never reach them.
+
+The changes of a transaction are published on the invalidation bus once
+it commits, and discarded if it rolls back. Every worker process forwards
+those it receives to its event broker as `CatalogEvent`s.
+"""
+
+from dataclasses import dataclass
+from itertools import chain
+from typing import Any, Literal, Sequence
+
+from sqlalchemy import (
+    ColumnElement,
+    and_,
+    event,
+    insert,
+    inspect,
+    literal,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute, Session
+from sqlalchemy.sql.base import ExecutableOption
+
+from src.core.events import CatalogEvent, broker
+from src.core.invalidation import Invalidation, bus
+from src.models import Author, Book, CatalogTombstone, CatalogVersion
+
+TrackedModel = type[Book] | type[Author]
+
+ENTITY_NAMES: dict[TrackedModel, Literal['book', 'author']] = {
+    Book: 'book',
+    Author: 'author',
+}
+
+# Keys of `Session.info`: objects changed by the flush in progress, and
+# (entity, action, id, version) changes waiting for the commit
+FLUSHED_KEY = 'catalog_flushed'
+EVENTS_KEY = 'catalog_events'
+
+# Position in the change feed: a version whose changes were all received,
+# or a version and the last ID received of its changes
+CURSOR_PATTERN = r'^\d+(:\d+)?$'
+
+
+@dataclass
+class ChangeSet:
+    changed: list[Any]
+    deleted: list[int]
+    version: int
+    has_more: bool
+    # To be passed as `since` on the next call
+    since: str
+
+
+def parse_cursor(cursor: str) -> tuple[int, int | None]:
+    version, _, entity_id = cursor.partition(':')
+
+    return int(version), int(entity_id) if entity_id else None
+
+
+def next_version(session: Session) -> int:
+    version: int = session.execute(
+        update(CatalogVersion)
+        .values(value=CatalogVersion.value + 1)
+        .returning(CatalogVersion.value)
+    ).scalar_one()
+
+    return version
+
+
+def _add_tombstones(
+    session: Session,
+    model: TrackedModel,
+    ids: Sequence[int],
+    version: int,
+    exclude_book_ids: Sequence[int] = (),
+) -> None:
+    entity = ENTITY_NAMES[model]
+    session.execute(
+        insert(CatalogTombstone),
+        [
+            {'entity': entity, 'entity_id': entity_id, 'version': version}
+            for entity_id in ids
+        ],
+    )
+    events = session.info.setdefault(EVENTS_KEY, [])
+    events.extend((entity, 'deleted', entity_id, version) for entity_id in ids)
+
+    if model is Author:
+        # The books of deleted authors are deleted by the database cascade
+        book_ids = session.scalars(
+            insert(CatalogTombstone)
+            .from_select(
+                ['entity', 'entity_id', 'version'],
+                select(literal('book'), Book.id, literal(version)).where(
+                    Book.author_id.in_(ids), Book.id.not_in(exclude_book_ids)
+                ),
+            )
+            .returning(CatalogTombstone.entity_id)
+        )
+        events.extend(
+            ('book', 'deleted', book_id, version) for book_id in book_ids
+        )
+
+
+@event.listens_for(Session, 'before_flush')
+def track_catalog_changes(session: Session, *args: Any) -> None:
+    """
+    Stamp a new version on the books and authors changed by a flush, and
+    write the tombstones of the deleted ones.
+    """
+    changed = [
+        obj
+        for obj in chain(session.new, session.dirty)
+        if isinstance(obj, (Book, Author))
+        and (obj in session.new or session.is_modified(obj))
+    ]
+    deleted = [
+        obj for obj in session.deleted if isinstance(obj, (Book, Author))
+    ]
+    if not changed and not deleted:
+        return
+
+    version = next_version(session)
+    session.info[FLUSHED_KEY] = [
+        (obj, 'created' if obj in session.new else 'updated')
+        for obj in changed
+    ]
+
+    # Books changed by the flush have their own events
+    changed_book_ids = [
+        obj.id
+        for obj in changed
+        if isinstance(obj, Book) and obj not in session.new
+    ]
+    for obj in changed:
+        obj.version = version
+
+        if (
+            isinstance(obj, Author)
+            and obj not in session.new
+            and inspect(obj).attrs.name.history.has_changes()
+        ):
+            # Books are published with the name of their author
+            book_ids = session.scalars(
+                update(Book)
+                .where(
+                    Book.author_id == obj.id,
+                    Book.id.not_in(changed_book_ids),
+                )
+                .values(version=version)
+                .returning(Book.id)
+                .execution_options(synchronize_session=False)
+            )
+            session.info.setdefault(EVENTS_KEY, []).extend(
+                ('book', 'updated', book_id, version) for book_id in book_ids
+            )
+
+    deleted_books = [obj.id for obj in deleted if isinstance(obj, Book)]
+    deleted_authors = [obj.id for obj in deleted if isinstance(obj, Author)]
+    if deleted_books:
+        _add_tombstones(session, Book, deleted_books, version)
+    if deleted_authors:
+        _add_tombstones(
+            session,
+            Author,
+            deleted_authors,
+            version,
+            exclude_book_ids=deleted_books,
+        )
+
+
+@event.listens_for(Session, 'after_flush')
+def collect_catalog_events(session: Session, *args: Any) -> None:
+    # The IDs of new objects are only known once they are flushed
+    events = session.info.setdefault(EVENTS_KEY, [])
+    for obj, action in session.info.pop(FLUSHED_KEY, []):
+        events.append((ENTITY_NAMES[type(obj)], action, obj.id, obj.version))
+
+
+@event.listens_for(Session, 'after_commit')
+def publish_catalog_events(session: Session) -> None:
+    grouped: dict[tuple[Any, Any, int], list[int]] = {}
+    for entity, action, entity_id, version in session.info.pop(EVENTS_KEY, []):
+        grouped.setdefault((entity, action, version), []).append(entity_id)
+
+    for (entity, action, version), ids in grouped.items():
+        bus.publish(Invalidation(entity, action, ids, version))
+
+
+def broadcast_catalog_event(invalidation: Invalidation) -> None:
+    broker.publish(
+        CatalogEvent(
+            entity=invalidation.entity,  # type: ignore[arg-type]
+            action=invalidation.action,  # type: ignore[arg-type]
+            ids=invalidation.ids,
+            version=invalidation.version or 0,
+        )
+    )
+
+
+for entity in ENTITY_NAMES.values():
+    bus.subscribe(entity, broadcast_catalog_event)
+
+
+@event.listens_for(Session, 'after_rollback')
+def discard_catalog_events(session: Session) -> None:
+    session.info.pop(FLUSHED_KEY, None)
+    session.info.pop(EVENTS_KEY, None)
+
+
+async def record_bulk_deletion(
+    session: AsyncSession, model: TrackedModel, ids: Sequence[int]
+) -> None:
+    """
+    Record tombstones for rows about to be deleted without the ORM.
+
+    Must run in the same transaction as the delete, before it.
+
+    :param session: The asynchronous database session used for the operation.
+    :param model: `Book` or `Author`.
+    :param ids: The IDs of the rows to delete.
+    """
+    if not ids:
+        return
+
+    def record(sync_session: Session) -> None:
+        _add_tombstones(sync_session, model, ids, next_version(sync_session))
+
+    await session.run_sync(record)
+
+
+async def get_changes(
+    session: AsyncSession,
+    model: TrackedModel,
+    since: str,
+    limit: int,
+    options: Sequence[ExecutableOption] = (),
+) -> ChangeSet:
+    """
+    Retrieve the rows changed and deleted after a position in the feed.
+
+    Changes are ordered by version, then ID, and a page holds at most
+    `limit` of them, even when a single version has more, e.g. the first
+    full sync or a bulk load.
+
+    :param session: The asynchronous database session used for the query.
+    :param model: `Book` or `Author`.
+    :param since: The `since` returned by the previous call, a version or
+        `version:id`, or '0' for a full sync.
+    :param limit: The number of changes to return.
+    :param options: Loader options for the changed rows.
+    :return: A `ChangeSet` with the changed rows and the deleted IDs, the
+        version of the last change, the position to pass as `since` on the
+        next call, and whether more changes are pending.
+    """
+    entity = ENTITY_NAMES[model]
+    since_version, since_id = parse_cursor(since)
+
+    def after_cursor(
+        version: InstrumentedAttribute[int],
+        entity_id: InstrumentedAttribute[int],
+    ) -> ColumnElement[bool]:
+        if since_id is None:
+            return version > since_version
+
+        return or_(
+            version > since_version,
+            and_(version == since_version, entity_id > since_id),
+        )
+
+    async with session:
+        # Each query may fill the page alone, one more row tells if the
+        # feed goes on
+        changed: list[Any] = list(
+            await session.scalars(
+                select(model)
+                .options(*options)
+                .where(after_cursor(model.version, model.id))
+                .order_by(model.version, model.id)
+                .limit(limit + 1)
+            )
+        )
+        deleted = (
+            await session.execute(
+                select(CatalogTombstone.version, CatalogTombstone.entity_id)
+                .where(
+                    CatalogTombstone.entity == entity,
+                    after_cursor(
+                        CatalogTombstone.version, CatalogTombstone.entity_id
+                    ),
+                )
+                .order_by(CatalogTombstone.version, CatalogTombstone.entity_id)
+                .limit(limit + 1)
+            )
+        ).all()
+
+    positions = sorted(
+        chain(
+            ((row.version, row.id) for row in changed),
+            (
+                (tombstone.version, tombstone.entity_id)
+                for tombstone in deleted
+            ),
+        )
+    )
+    has_more = len(positions) > limit
+    if has_more:
+        last_version, last_id = last = positions[limit - 1]
+        changed = [row for row in changed if (row.version, row.id) <= last]
+        deleted = [
+            tombstone
+            for tombstone in deleted
+            if (tombstone.version, tombstone.entity_id) <= last
+        ]
+        next_since = f'{last_version}:{last_id}'
+    elif positions:
+        last_version = positions[-1][0]
+        next_since = str(last_version)
+    else:
+        last_version, next_since = since_version, since
+
+    return ChangeSet(
+        changed=changed,
+        deleted=[tombstone.entity_id for tombstone in deleted],
+        version=last_version,
+        has_more=has_more,
+        since=next_since,
+    )
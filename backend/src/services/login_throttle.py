@@ -0,0 +1,379 @@
+"""
+Throttling of failed logins, keyed by account and by client IP.
+
+Each failed login is recorded under both keys. Once a key has
+`max_failures` failures within the sliding window, it is locked after
+each new failure for `base_delay * 2 ** (failures - max_failures)`
+seconds, capped at `max_delay`. Locked keys are rejected before the user
+is loaded and its password verified, so a burst of guesses does not turn
+into a burst of argon2 verifications.
+
+The memory backend is per worker process. The database backend shares
+the failures between workers through the `login_failures` table.
+
+A login attempt is checked and, if allowed, recorded as a failure in a
+single step, before its password is verified, and that failure is
+released if the password matches. The check and the record are atomic
+per key: the memory backend does not yield to the event loop in between,
+and the database backend serializes them in a transaction, on PostgreSQL
+with advisory locks and on SQLite with its single write lock. The
+attempts of a concurrent burst therefore see the failures of the ones
+still being verified, and no more guesses than the throttle allows are
+verified at once.
+"""
+
+import math
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.metrics import metrics
+from src.core.settings import settings
+from src.models import LoginFailure
+from src.services import statements
+
+# Enough failures to reach the maximum delay of any sensible configuration
+MAX_FAILURES_KEPT = 64
+
+# The database backend keeps every failure of the window, and the delay
+# of thousands of them would overflow a float
+MAX_DOUBLINGS = 32
+
+
+# Number of failures and time of the last one, for each key
+Failures = list[tuple[int, float | None]]
+
+
+class ThrottleBackend(ABC):
+    @abstractmethod
+    async def get_failures(
+        self, key: str, since: float
+    ) -> tuple[int, float | None]:
+        """
+        :return: The number of failures of a key after `since`, and the time
+            of the last one.
+        """
+
+    @abstractmethod
+    async def record_failure(self, keys: list[str], now: float) -> None:
+        """
+        Record a failure at `now` under each of the keys.
+        """
+
+    @abstractmethod
+    async def reserve(
+        self,
+        keys: list[str],
+        since: float,
+        now: float,
+        wait: Callable[[Failures], float],
+    ) -> float:
+        """
+        Get the failures of the keys after `since`, and record a failure at
+        `now` under each of them unless `wait` returns a delay for those
+        failures, atomically with the other reservations of the keys.
+
+        :return: The delay returned by `wait`.
+        """
+
+    @abstractmethod
+    async def release(self, keys: list[str], at: float) -> None:
+        """
+        Remove a failure recorded at `at` under each of the keys.
+        """
+
+    @abstractmethod
+    async def reset(self, key: str) -> None:
+        """
+        Forget the failures of a key.
+        """
+
+
+class MemoryThrottleBackend(ThrottleBackend):
+    def __init__(self, sweep_every: int = 1000) -> None:
+        self._failures: dict[str, deque[float]] = {}
+        self._sweep_every = sweep_every
+        self._records_since_sweep = 0
+
+    async def get_failures(
+        self, key: str, since: float
+    ) -> tuple[int, float | None]:
+        return self._get_failures(key, since)
+
+    async def record_failure(self, keys: list[str], now: float) -> None:
+        self._record_failure(keys, now)
+
+    async def reserve(
+        self,
+        keys: list[str],
+        since: float,
+        now: float,
+        wait: Callable[[Failures], float],
+    ) -> float:
+        # Without awaiting, so that no other attempt runs in between
+        delay = wait([self._get_failures(key, since) for key in keys])
+        if not delay:
+            self._record_failure(keys, now)
+
+        return delay
+
+    async def release(self, keys: list[str], at: float) -> None:
+        for key in keys:
+            failures = self._failures.get(key)
+            if failures and at in failures:
+                failures.remove(at)
+
+    async def reset(self, key: str) -> None:
+        self._failures.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._failures)
+
+    def _get_failures(
+        self, key: str, since: float
+    ) -> tuple[int, float | None]:
+        failures = self._failures.get(key)
+        if not failures:
+            return 0, None
+
+        while failures and failures[0] <= since:
+            failures.popleft()
+
+        return len(failures), failures[-1] if failures else None
+
+    def _record_failure(self, keys: list[str], now: float) -> None:
+        for key in keys:
+            self._failures.setdefault(
+                key, deque(maxlen=MAX_FAILURES_KEPT)
+            ).append(now)
+
+        self._records_since_sweep += 1
+        if self._records_since_sweep >= self._sweep_every:
+            self._sweep(now - settings.LOGIN_THROTTLE_WINDOW_SECONDS)
+
+    def _sweep(self, since: float) -> None:
+        # Forget the keys with no failure left in the window, so that
+        # guesses over many emails do not grow memory without bound
+        self._records_since_sweep = 0
+        self._failures = {
+            key: failures
+            for key, failures in self._failures.items()
+            if failures and failures[-1] > since
+        }
+
+
+class DatabaseThrottleBackend(ThrottleBackend):
+    def __init__(self, session: AsyncSession) -> None:
+        self._session = session
+
+    async def get_failures(
+        self, key: str, since: float
+    ) -> tuple[int, float | None]:
+        async with self._session:
+            return await self._get_failures(key, since)
+
+    async def record_failure(self, keys: list[str], now: float) -> None:
+        async with self._session.begin():
+            await self._delete_expired(now)
+            self._add_failures(keys, now)
+
+    async def reserve(
+        self,
+        keys: list[str],
+        since: float,
+        now: float,
+        wait: Callable[[Failures], float],
+    ) -> float:
+        async with self._session.begin():
+            if self._session.get_bind().dialect.name == 'postgresql':
+                # In a fixed order, so that attempts sharing keys cannot
+                # deadlock
+                for key in sorted(keys):
+                    await self._session.execute(
+                        select(func.pg_advisory_xact_lock(lock_id(key)))
+                    )
+            # On SQLite, the first write takes the database lock
+            await self._delete_expired(now)
+
+            delay = wait([
+                await self._get_failures(key, since) for key in keys
+            ])
+            if not delay:
+                self._add_failures(keys, now)
+
+        return delay
+
+    async def release(self, keys: list[str], at: float) -> None:
+        async with self._session.begin():
+            for key in keys:
+                await self._session.execute(
+                    delete(LoginFailure).where(
+                        LoginFailure.id
+                        == select(LoginFailure.id)
+                        .where(
+                            LoginFailure.key == key,
+                            LoginFailure.failed_at == at,
+                        )
+                        .limit(1)
+                        .scalar_subquery()
+                    )
+                )
+
+    async def reset(self, key: str) -> None:
+        async with self._session.begin():
+            await self._session.execute(
+                delete(LoginFailure).where(LoginFailure.key == key)
+            )
+
+    async def _get_failures(
+        self, key: str, since: float
+    ) -> tuple[int, float | None]:
+        result = await self._session.execute(
+            statements.login_failures_since, {'key': key, 'since': since}
+        )
+        count, last_failure = result.one()
+
+        return count, last_failure
+
+    def _add_failures(self, keys: list[str], now: float) -> None:
+        self._session.add_all(
+            LoginFailure(key=key, failed_at=now) for key in keys
+        )
+
+    async def _delete_expired(self, now: float) -> None:
+        # Failures out of the window are useless, drop them on the way
+        await self._session.execute(
+            delete(LoginFailure).where(
+                LoginFailure.failed_at
+                <= now - settings.LOGIN_THROTTLE_WINDOW_SECONDS
+            )
+        )
+
+
+def lock_id(key: str) -> int:
+    # Stable across processes, unlike `hash`
+    return zlib.crc32(key.encode())
+
+
+memory_backend = MemoryThrottleBackend()
+
+
+@dataclass
+class LoginAttempt:
+    # Seconds to wait before the next attempt, or 0 if this one may go on
+    retry_after: int
+    # Keys under which a failure is recorded until the attempt succeeds
+    keys: list[str] = field(default_factory=list)
+    reserved_at: float = 0
+
+
+class LoginThrottle:
+    def __init__(self, backend: ThrottleBackend) -> None:
+        self.backend = backend
+
+    @staticmethod
+    def _keys(email: str, client_ip: str | None) -> list[tuple[str, int]]:
+        keys = [
+            (
+                f'account:{email.lower()}',
+                settings.LOGIN_THROTTLE_MAX_FAILURES_PER_ACCOUNT,
+            )
+        ]
+        if client_ip:
+            keys.append((
+                f'ip:{client_ip}',
+                settings.LOGIN_THROTTLE_MAX_FAILURES_PER_IP,
+            ))
+
+        return keys
+
+    @staticmethod
+    def _wait(
+        keys: list[tuple[str, int]], failures: Failures, now: float
+    ) -> float:
+        wait = 0.0
+        for (_, max_failures), (count, last_failure) in zip(keys, failures):
+            if last_failure is None or count < max_failures:
+                continue
+
+            delay = min(
+                settings.LOGIN_THROTTLE_BASE_DELAY_SECONDS
+                * 2 ** min(count - max_failures, MAX_DOUBLINGS),
+                settings.LOGIN_THROTTLE_MAX_DELAY_SECONDS,
+            )
+            wait = max(wait, last_failure + delay - now)
+
+        return wait
+
+    async def retry_after(self, email: str, client_ip: str | None) -> int:
+        """
+        Check whether a login attempt would be allowed, without recording it.
+
+        :param email: The email the login is attempted for.
+        :param client_ip: The IP address of the client, if known.
+        :return: The number of seconds to wait before the next attempt, or 0
+            if the attempt is allowed.
+        """
+        now = time.time()
+        since = now - settings.LOGIN_THROTTLE_WINDOW_SECONDS
+        keys = self._keys(email, client_ip)
+        failures = [
+            await self.backend.get_failures(key, since) for key, _ in keys
+        ]
+
+        return self._retry_after(self._wait(keys, failures, now))
+
+    async def acquire(self, email: str, client_ip: str | None) -> LoginAttempt:
+        """
+        Check whether a login attempt is allowed and, if so, record it as a
+        failure until it is released.
+
+        :param email: The email the login is attempted for.
+        :param client_ip: The IP address of the client, if known.
+        :return: The attempt, with the number of seconds to wait before the
+            next one if it is not allowed.
+        """
+        now = time.time()
+        keys = self._keys(email, client_ip)
+        names = [key for key, _ in keys]
+        wait = await self.backend.reserve(
+            names,
+            now - settings.LOGIN_THROTTLE_WINDOW_SECONDS,
+            now,
+            lambda failures: self._wait(keys, failures, now),
+        )
+        if wait > 0:
+            return LoginAttempt(retry_after=self._retry_after(wait))
+
+        return LoginAttempt(retry_after=0, keys=names, reserved_at=now)
+
+    async def release(self, attempt: LoginAttempt) -> None:
+        """
+        Remove the failure recorded for a successful attempt.
+        """
+        await self.backend.release(attempt.keys, attempt.reserved_at)
+
+    @staticmethod
+    def _retry_after(wait: float) -> int:
+        if wait > 0:
+            metrics.incr('password_verifications_avoided')
+            return math.ceil(wait)
+
+        return 0
+
+    async def record_failure(self, email: str, client_ip: str | None) -> None:
+        keys = [key for key, _ in self._keys(email, client_ip)]
+        await self.backend.record_failure(keys, time.time())
+
+    async def reset(self, email: str) -> None:
+        """
+        Clear the failures of an account after a successful login. Those of
+        the client IP are kept.
+        """
+        await self.backend.reset(f'account:{email.lower()}')
@@ -0,0 +1,106 @@
+import asyncio
+from enum import StrEnum
+from typing import Any
+
+from sqlalchemy import Select, func
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from src.core.settings import settings
+
+
+class CountStrategy(StrEnum):
+    """
+    How a list query and its total count are sent to the database.
+
+    - SEQUENTIAL: the count query and the page query are executed one after
+      the other on the session connection (two round-trips in series).
+    - WINDOW: a single statement returning the page rows together with a
+      `count(*) OVER ()` column (one round-trip).
+    - CONCURRENT: the count query runs on a separate pooled connection while
+      the page query runs on the session connection.
+    """
+
+    SEQUENTIAL = 'sequential'
+    WINDOW = 'window'
+    CONCURRENT = 'concurrent'
+
+
+def resolve_count_strategy(session: AsyncSession) -> CountStrategy:
+    """
+    Return the count strategy configured for the dialect the session is bound
+    to, falling back to `CountStrategy.SEQUENTIAL`.
+
+    :param session: The asynchronous database session used for the query.
+    :return: The `CountStrategy` to use.
+    """
+    dialect_name = session.get_bind().dialect.name
+    strategy = settings.LIST_COUNT_STRATEGIES.get(
+        dialect_name, CountStrategy.SEQUENTIAL
+    )
+
+    return CountStrategy(strategy)
+
+
+async def _count_on_own_connection(
+    engine: AsyncEngine, count_query: Select[tuple[int]]
+) -> int | None:
+    async with engine.connect() as connection:
+        total_count: int | None = await connection.scalar(count_query)
+
+    return total_count
+
+
+async def fetch_page(
+    session: AsyncSession,
+    query: Select[Any],
+    count_query: Select[tuple[int]],
+    strategy: CountStrategy | None = None,
+) -> tuple[list[Any], int]:
+    """
+    Execute a paginated ORM query and its total count using the given
+    strategy.
+
+    `query` must select a single ORM entity, with filters, limit and offset
+    already applied. `count_query` must select a single count column with the
+    same filters and no limit.
+
+    :param session: The asynchronous database session used for the queries.
+    :param query: The page query.
+    :param count_query: The total count query.
+    :param strategy: The `CountStrategy` to use. If None, it is resolved from
+        the session dialect with `resolve_count_strategy`.
+    :return: A tuple containing the list of entities in the page and the
+        total count of rows matching the filters.
+    """
+    if strategy is None:
+        strategy = resolve_count_strategy(session)
+
+    if strategy is CountStrategy.WINDOW:
+        rows = (
+            await session.execute(
+                query.add_columns(func.count().over().label('total_count'))
+            )
+        ).all()
+
+        if rows:
+            return [row[0] for row in rows], rows[0].total_count
+
+        # An empty page carries no count, either because nothing matches or
+        # because the offset is past the last row.
+        total_count = await session.scalar(count_query)
+        return [], total_count or 0
+
+    engine = session.bind
+    if strategy is CountStrategy.CONCURRENT and isinstance(
+        engine, AsyncEngine
+    ):
+        total_count, entities = await asyncio.gather(
+            _count_on_own_connection(engine, count_query),
+            session.scalars(query),
+        )
+        return list(entities.all()), total_count or 0
+
+    total_count = await session.scalar(count_query)
+    entities = await session.scalars(query)
+
+    return list(entities.all()), total_count or 0
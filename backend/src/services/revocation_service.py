@@ -0,0 +1,229 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Hashable
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.bloom import BloomFilter
+from src.core.invalidation import Invalidation, bus
+from src.core.metrics import metrics
+from src.core.security import access_token_max_lifetime
+from src.core.settings import settings
+from src.models import RefreshToken, RevokedToken
+from src.services import statements
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationList:
+    """
+    In-process Bloom filter over the `revoked_tokens` table.
+
+    It holds the `jti` of revoked tokens and the ids of users whose tokens
+    were all revoked. A key not in the filter is certainly not revoked, so
+    the database is only queried on a probable hit.
+    """
+
+    def __init__(self) -> None:
+        self._filter = BloomFilter(
+            settings.REVOCATION_FILTER_CAPACITY,
+            settings.REVOCATION_FILTER_ERROR_RATE,
+        )
+        # Keys added while the filter is being rebuilt, so they are not lost
+        # when the new filter replaces the current one
+        self._added_during_rebuild: list[Hashable] | None = None
+
+    def add(self, key: Hashable) -> None:
+        self._filter.add(key)
+        if self._added_during_rebuild is not None:
+            self._added_during_rebuild.append(key)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._filter
+
+    def __len__(self) -> int:
+        return len(self._filter)
+
+    async def rebuild(self, session: AsyncSession) -> None:
+        """
+        Replace the filter with one built from the unexpired revocations.
+
+        :param session: The asynchronous database session used for the query.
+        """
+        self._added_during_rebuild = []
+        try:
+            async with session:
+                result = await session.execute(
+                    select(RevokedToken.jti, RevokedToken.user_id).where(
+                        RevokedToken.expires_at
+                        > datetime.now(tz=ZoneInfo('UTC'))
+                    )
+                )
+                rows = result.all()
+
+            new_filter = BloomFilter(
+                max(settings.REVOCATION_FILTER_CAPACITY, 2 * len(rows)),
+                settings.REVOCATION_FILTER_ERROR_RATE,
+            )
+            for jti, user_id in rows:
+                new_filter.add(jti if jti is not None else user_id)
+            for key in self._added_during_rebuild:
+                new_filter.add(key)
+
+            self._filter = new_filter
+        finally:
+            self._added_during_rebuild = None
+
+
+revocation_list = RevocationList()
+
+
+def add_revocations(invalidation: Invalidation) -> None:
+    # Revocations made by any worker process
+    for key in invalidation.ids:
+        revocation_list.add(key)
+
+
+bus.subscribe('revocation', add_revocations)
+
+
+async def is_token_revoked(
+    session: AsyncSession, payload: dict[str, Any]
+) -> bool:
+    """
+    Check whether a decoded access token was revoked.
+
+    :param session: The asynchronous database session used for the query,
+        only on a probable hit of the revocation filter.
+    :param payload: The decoded access token claims.
+    :return: True if the token or all the tokens of its user were revoked.
+    """
+    jti = payload.get('jti')
+    user_id = payload.get('uid')
+
+    probable_hit = (jti is not None and jti in revocation_list) or (
+        user_id is not None and user_id in revocation_list
+    )
+    if not probable_hit:
+        return False
+
+    metrics.incr('revocation_filter_hits')
+    issued_at = datetime.fromtimestamp(
+        payload.get('iat', 0), tz=ZoneInfo('UTC')
+    )
+
+    async with session:
+        revoked = await session.scalar(
+            statements.token_revoked,
+            {'jti': jti, 'user_id': user_id, 'issued_at': issued_at},
+        )
+
+    if not revoked:
+        metrics.incr('revocation_filter_false_positives')
+
+    return bool(revoked)
+
+
+async def revoke_token(session: AsyncSession, jti: str) -> None:
+    """
+    Revoke a single access token by its `jti` claim.
+
+    :param session: The asynchronous database session used for the operation.
+    :param jti: The id of the token to revoke.
+    """
+    now = datetime.now(tz=ZoneInfo('UTC'))
+
+    async with session.begin():
+        session.add(
+            RevokedToken(
+                jti=jti,
+                revoked_at=now,
+                expires_at=now + access_token_max_lifetime(),
+            )
+        )
+
+    bus.publish(Invalidation('revocation', 'created', [jti]))
+
+
+async def revoke_user_tokens(session: AsyncSession, user_id: int) -> None:
+    """
+    Revoke all the access and refresh tokens issued to a user so far.
+
+    Tokens issued afterwards, i.e. on the next login, are not affected.
+    The `iat` claim keeps the fraction of a second, and a token issued at
+    the very instant of the revocation is revoked too.
+
+    :param session: The asynchronous database session used for the operation.
+    :param user_id: The ID of the user whose tokens are revoked.
+    """
+    now = datetime.now(tz=ZoneInfo('UTC'))
+
+    async with session.begin():
+        session.add(
+            RevokedToken(
+                user_id=user_id,
+                revoked_at=now,
+                expires_at=now + access_token_max_lifetime(),
+            )
+        )
+        await session.execute(
+            update(RefreshToken)
+            .where(
+                RefreshToken.user_id == user_id,
+                RefreshToken.revoked_at.is_(None),
+            )
+            .values(revoked_at=now)
+        )
+
+    bus.publish(Invalidation('revocation', 'created', [user_id]))
+
+
+async def purge_expired_revocations(session: AsyncSession) -> int:
+    """
+    Delete the revocations whose tokens have all expired.
+
+    :param session: The asynchronous database session used for the operation.
+    :return: The number of revocations deleted.
+    """
+    async with session.begin():
+        result = await session.scalars(
+            delete(RevokedToken)
+            .where(RevokedToken.expires_at <= datetime.now(tz=ZoneInfo('UTC')))
+            .returning(RevokedToken.id)
+        )
+        purged = len(result.all())
+
+    return purged
+
+
+async def run_revocation_maintenance(
+    session_factory: async_sessionmaker[AsyncSession], interval: float
+) -> None:
+    """
+    Periodically purge expired revocations and rebuild the filter.
+
+    Runs until cancelled. Rebuilding drops the purged entries from the
+    filter and adds the revocations made by other worker processes that
+    the invalidation bus did not deliver.
+
+    :param session_factory: The factory of the sessions used on each run.
+    :param interval: The time to sleep between runs, in seconds.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with session_factory() as session:
+                purged = await purge_expired_revocations(session)
+                await revocation_list.rebuild(session)
+        except Exception:
+            logger.exception('Revocation maintenance failed')
+            continue
+
+        logger.info(
+            'Purged %s expired revocations, %s remaining',
+            purged,
+            len(revocation_list),
+        )
@@ -0,0 +1,77 @@
+"""
+Pre-built, parameterised statements for the hot lookup queries.
+
+Building a `select()` construct and generating its cache key has a Python
+cost on every call. The statements below are built once at import time and
+only receive new parameter values per call, so SQLAlchemy reuses both the
+memoized cache key and the compiled form from the engine's compiled cache.
+"""
+
+from sqlalchemy import and_, bindparam, exists, func, or_, select
+from sqlalchemy.orm import selectinload
+
+from src.models import (
+    Author,
+    Book,
+    LoginFailure,
+    RefreshToken,
+    RevokedToken,
+    User,
+)
+
+book_by_id = (
+    select(Book)
+    .options(selectinload(Book.author))
+    .where(Book.id == bindparam('book_id'))
+)
+
+book_by_title = (
+    select(Book)
+    .options(selectinload(Book.author))
+    .where(Book.title == bindparam('book_title'))
+)
+
+book_ids_in = select(Book.id).where(
+    Book.id.in_(bindparam('book_ids', expanding=True))
+)
+
+author_by_id = select(Author).where(Author.id == bindparam('author_id'))
+
+author_by_name = select(Author).where(Author.name == bindparam('author_name'))
+
+author_ids_in = select(Author.id).where(
+    Author.id.in_(bindparam('author_ids', expanding=True))
+)
+
+user_by_id = select(User).where(User.id == bindparam('user_id'))
+
+user_by_email = select(User).where(User.email == bindparam('user_email'))
+
+user_by_username_or_email = select(User).where(
+    (User.username == bindparam('username'))
+    | (User.email == bindparam('user_email'))
+)
+
+refresh_token_by_hash = select(RefreshToken).where(
+    RefreshToken.token_hash == bindparam('token_hash'),
+    RefreshToken.expires_at > bindparam('now'),
+)
+
+token_revoked = select(
+    exists().where(
+        or_(
+            RevokedToken.jti == bindparam('jti'),
+            and_(
+                RevokedToken.user_id == bindparam('user_id'),
+                RevokedToken.revoked_at >= bindparam('issued_at'),
+            ),
+        )
+    )
+)
+
+login_failures_since = select(
+    func.count(), func.max(LoginFailure.failed_at)
+).where(
+    LoginFailure.key == bindparam('key'),
+    LoginFailure.failed_at > bindparam('since'),
+)
@@ -0,0 +1,105 @@
+import uuid
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.security import generate_refresh_token, hash_refresh_token
+from src.core.settings import settings
+from src.models import RefreshToken, User
+from src.services import statements
+
+
+async def add_refresh_token(
+    session: AsyncSession, user_id: int, family_id: str | None = None
+) -> str:
+    """
+    Create and persist a new refresh token for a user.
+
+    Only a hash of the token is stored in the database.
+
+    :param session: The asynchronous database session used for the operation.
+    :param user_id: The ID of the user the token is issued to.
+    :param family_id: The family of the rotated token this one replaces. If
+        None, a new family is started (i.e. on login).
+    :return: The refresh token to hand over to the client.
+    """
+    refresh_token = generate_refresh_token()
+    new_token = RefreshToken(
+        user_id=user_id,
+        token_hash=hash_refresh_token(refresh_token),
+        family_id=family_id or uuid.uuid4().hex,
+        expires_at=datetime.now(tz=ZoneInfo('UTC'))
+        + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+
+    async with session.begin():
+        session.add(new_token)
+
+    return refresh_token
+
+
+async def rotate_refresh_token(
+    session: AsyncSession, refresh_token: str
+) -> tuple[User, str] | None:
+    """
+    Exchange a refresh token for a new one, revoking the one presented.
+
+    A refresh token can only be used once. Presenting an already rotated
+    token means it leaked, so the whole token family is revoked. The user is
+    loaded here, so deleted or deactivated accounts stop being able to renew
+    their access tokens.
+
+    :param session: The asynchronous database session used for the operation.
+    :param refresh_token: The refresh token presented by the client.
+    :return: A tuple with the token owner and the new refresh token, or None
+        if the token is unknown, expired, reused, or its user is no longer
+        active.
+    """
+    now = datetime.now(tz=ZoneInfo('UTC'))
+
+    async with session.begin():
+        token_db = await session.scalar(
+            statements.refresh_token_by_hash,
+            {'token_hash': hash_refresh_token(refresh_token), 'now': now},
+        )
+
+        if not token_db:
+            return None
+
+        # Conditional update, so two concurrent rotations of the same token
+        # cannot both succeed
+        revoked_id = await session.scalar(
+            update(RefreshToken)
+            .where(
+                RefreshToken.id == token_db.id,
+                RefreshToken.revoked_at.is_(None),
+            )
+            .values(revoked_at=now)
+            .returning(RefreshToken.id)
+        )
+
+        if revoked_id is None:
+            await session.execute(
+                update(RefreshToken)
+                .where(
+                    RefreshToken.family_id == token_db.family_id,
+                    RefreshToken.revoked_at.is_(None),
+                )
+                .values(revoked_at=now)
+            )
+            return None
+
+        user = await session.scalar(
+            statements.user_by_id, {'user_id': token_db.user_id}
+        )
+
+    if not user or not user.is_active:
+        return None
+
+    new_refresh_token = await add_refresh_token(
+        session, user_id=user.id, family_id=token_db.family_id
+    )
+
+    return user, new_refresh_token
@@ -1,6 +1,8 @@
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from src.core.invalidation import Invalidation, bus
+from src.core.metrics import metrics
 from src.core.security import get_password_hash
 from src.models import User
 from src.schemas.users import (
@@ -9,6 +11,7 @@ from src.schemas.users import (
     UserRequestCreate,
     UserRequestUpdate,
 )
+from src.services import statements
 
 
 async def add_user(
@@ -50,9 +53,8 @@ async def get_user(
     """
     async with session:
         user_db = await session.scalar(
-            select(User).where(
-                (User.username == username) | (User.email == user_email)
-            )
+            statements.user_by_username_or_email,
+            {'username': username, 'user_email': user_email},
         )
 
     return user_db
@@ -67,7 +69,9 @@ async def get_user_by_id(session: AsyncSession, user_id: int) -> User | None:
     :return: The User object if found, otherwise None.
     """
     async with session:
-        user = await session.scalar(select(User).where(User.id == user_id))
+        user = await session.scalar(
+            statements.user_by_id, {'user_id': user_id}
+        )
 
     return user
 
@@ -113,6 +117,7 @@ async def update_user_info(
 
     async with session.begin():
         session.add(user_to_update)
+    bus.publish(Invalidation('user', 'updated', [user_to_update.id]))
 
     return user_to_update
 
@@ -127,6 +132,7 @@ async def delete_user(session: AsyncSession, user_to_delete: User) -> None:
     """
     async with session.begin():
         await session.delete(user_to_delete)
+    bus.publish(Invalidation('user', 'deleted', [user_to_delete.id]))
 
 
 async def change_password(
@@ -149,5 +155,35 @@ async def change_password(
 
     async with session.begin():
         session.add(user_to_update)
+    bus.publish(Invalidation('user', 'updated', [user_to_update.id]))
 
     return user_to_update
+
+
+async def update_password_hash(
+    session_factory: async_sessionmaker[AsyncSession],
+    user_id: int,
+    old_hash: str,
+    new_hash: str,
+) -> None:
+    """
+    Replace a password hash with a rehash of the same password.
+
+    The hash is only replaced if it is still `old_hash`, so a password
+    changed in the meantime is not overwritten. Run after the response is
+    sent, once the session of the request is closed, so it opens its own.
+
+    :param session_factory: The factory of the session used for the
+        operation.
+    :param user_id: The ID of the user whose hash is replaced.
+    :param old_hash: The hash the new one was computed from.
+    :param new_hash: The new password hash.
+    """
+    async with session_factory() as session, session.begin():
+        await session.execute(
+            update(User)
+            .where(User.id == user_id, User.password_hash == old_hash)
+            .values(password_hash=new_hash)
+        )
+
+    metrics.incr('password_rehashes')
@@ -0,0 +1,85 @@
+"""
+Create the partitions of the partitioned `books` table ahead of time.
+
+Usage:
+    python -m src.utils.book_partitions [--ahead 2] [--year 1999 ...]
+
+Creates the partitions of the current span of BOOKS_PARTITION_YEARS years
+and of the `--ahead` next ones, plus those of any `--year` given, then
+lists the partitions. Existing partitions are left alone. Rows already in
+the default partition for a new partition's years are moved into it.
+
+Run it regularly, e.g. yearly from cron, so that new books never land in
+the default partition. Requires PostgreSQL with BOOKS_PARTITIONING applied
+by the migrations.
+"""
+
+import argparse
+import asyncio
+import sys
+
+from sqlalchemy import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.core.settings import settings
+from src.migrations.partitions import (
+    create_partitions,
+    get_partitions,
+    is_partitioned,
+    upcoming_years,
+)
+
+
+def maintain_partitions(
+    connection: Connection, ahead: int, years: list[int]
+) -> list[str] | None:
+    """
+    :return: The names of the created partitions, or None if `books` is not
+        partitioned.
+    """
+    if connection.dialect.name != 'postgresql' or not is_partitioned(
+        connection
+    ):
+        return None
+
+    span = settings.BOOKS_PARTITION_YEARS
+    return create_partitions(
+        connection, [*upcoming_years(span, ahead), *years], span
+    )
+
+
+async def main(ahead: int, years: list[int]) -> int:
+    engine = create_async_engine(settings.DATABASE_URL)
+    try:
+        async with engine.begin() as connection:
+            created = await connection.run_sync(
+                maintain_partitions, ahead, years
+            )
+            partitions = (
+                await connection.run_sync(get_partitions)
+                if created is not None
+                else []
+            )
+    finally:
+        await engine.dispose()
+
+    if created is None:
+        print('The books table is not partitioned.', file=sys.stderr)
+        return 1
+
+    for name in partitions:
+        print(f'{name}{" (created)" if name in created else ""}')
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--ahead', type=int, default=settings.BOOKS_PARTITIONS_AHEAD
+    )
+    parser.add_argument(
+        '--year', type=int, action='append', default=[], dest='years'
+    )
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(main(args.ahead, args.years)))
@@ -0,0 +1,285 @@
+"""
+Bulk load books and their authors from a CSV or NDJSON file.
+
+Usage:
+    python -m src.utils.bulk_load FILE [--format csv|ndjson]
+        [--batch-size 10000]
+
+Each record has a `title`, a `year` and an `author` name, as CSV columns
+with a header line or as the keys of one JSON object per line. Records are
+validated and normalized with the schemas of the API.
+
+Records are streamed in batches into a temporary staging table: with COPY
+(asyncpg `copy_records_to_table`) on PostgreSQL, with batched
+`executemany` on other databases. They are then merged in a few set-based
+statements: missing authors are created, author names are resolved to ids,
+existing titles are updated and new ones inserted. When a title appears
+more than once, its last record wins. Records the API would refuse, e.g.
+with a missing field or an invalid year, are skipped and counted as
+rejected.
+
+Everything runs in one transaction, under a single new catalogue version,
+so the change feeds pick up the whole load at once. Change notifications
+are not published to the event stream of the running workers.
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import sys
+import time
+from dataclasses import dataclass
+from itertools import batched
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Literal
+
+from pydantic import ValidationError
+from sqlalchemy import (
+    Column,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    exists,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from src.core.settings import settings
+from src.models import Author, Book, CatalogVersion
+from src.schemas.books import BookRecord
+
+Record = tuple[int, str, int, str]
+
+staging_metadata = MetaData()
+
+staging_table = Table(
+    'bulk_load_staging',
+    staging_metadata,
+    # Position of the record in the file, the last one of a title wins
+    Column('seq', Integer),
+    Column('title', String),
+    Column('year', Integer),
+    Column('author', String),
+    prefixes=['TEMPORARY'],
+)
+
+resolved_table = Table(
+    'bulk_load_resolved',
+    staging_metadata,
+    Column('title', String, primary_key=True),
+    Column('year', Integer),
+    Column('author_id', Integer),
+    prefixes=['TEMPORARY'],
+)
+
+
+@dataclass
+class LoadResult:
+    records: int = 0
+    rejected: int = 0
+    authors_created: int = 0
+    books_created: int = 0
+    books_updated: int = 0
+    seconds: float = 0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.records / self.seconds if self.seconds else 0
+
+
+def read_records(
+    lines: Iterable[str], file_format: Literal['csv', 'ndjson']
+) -> Iterator[dict[str, Any]]:
+    if file_format == 'csv':
+        yield from csv.DictReader(lines)
+        return
+
+    for line in lines:
+        if line.strip():
+            yield json.loads(line)
+
+
+def parse_records(
+    raw_records: Iterable[dict[str, Any]], result: LoadResult
+) -> Iterator[Record]:
+    """
+    Validate and normalize the records, counting the rejected ones.
+    """
+    for seq, raw in enumerate(raw_records):
+        try:
+            record = BookRecord.model_validate(raw)
+        except ValidationError:
+            result.rejected += 1
+            continue
+
+        result.records += 1
+        yield seq, record.title, record.year, record.author
+
+
+async def _stage(
+    connection: AsyncConnection, records: Iterable[Record], batch_size: int
+) -> None:
+    columns = [column.name for column in staging_table.columns]
+
+    if connection.dialect.name == 'postgresql':
+        raw_connection = await connection.get_raw_connection()
+        copy_connection = raw_connection.driver_connection
+        if copy_connection is None:
+            raise RuntimeError('The database connection was closed.')
+        for batch in batched(records, batch_size):
+            await copy_connection.copy_records_to_table(
+                staging_table.name, records=batch, columns=columns
+            )
+        return
+
+    for batch in batched(records, batch_size):
+        await connection.execute(
+            insert(staging_table),
+            [dict(zip(columns, record)) for record in batch],
+        )
+
+
+async def _merge(connection: AsyncConnection, result: LoadResult) -> None:
+    version = await connection.scalar(
+        update(CatalogVersion)
+        .values(value=CatalogVersion.value + 1)
+        .returning(CatalogVersion.value)
+    )
+
+    authors = await connection.execute(
+        insert(Author).from_select(
+            ['name', 'version'],
+            select(staging_table.c.author, literal(version))
+            .where(~exists().where(Author.name == staging_table.c.author))
+            .distinct(),
+        )
+    )
+    result.authors_created = authors.rowcount
+
+    ranked = (
+        select(
+            staging_table.c.title,
+            staging_table.c.year,
+            Author.id.label('author_id'),
+            func.row_number()
+            .over(
+                partition_by=staging_table.c.title,
+                order_by=staging_table.c.seq.desc(),
+            )
+            .label('rank'),
+        )
+        .join(Author, Author.name == staging_table.c.author)
+        .subquery()
+    )
+    await connection.execute(
+        insert(resolved_table).from_select(
+            ['title', 'year', 'author_id'],
+            select(ranked.c.title, ranked.c.year, ranked.c.author_id).where(
+                ranked.c.rank == 1
+            ),
+        )
+    )
+
+    # Updates and inserts rather than an upsert, as `title` has no unique
+    # index to conflict on when books are partitioned
+    updated = await connection.execute(
+        update(Book)
+        .where(
+            Book.title == resolved_table.c.title,
+            or_(
+                Book.year != resolved_table.c.year,
+                Book.author_id != resolved_table.c.author_id,
+            ),
+        )
+        .values(
+            year=resolved_table.c.year,
+            author_id=resolved_table.c.author_id,
+            version=version,
+        )
+    )
+    result.books_updated = updated.rowcount
+
+    created = await connection.execute(
+        insert(Book).from_select(
+            ['title', 'year', 'author_id', 'version'],
+            select(
+                resolved_table.c.title,
+                resolved_table.c.year,
+                resolved_table.c.author_id,
+                literal(version),
+            ).where(~exists().where(Book.title == resolved_table.c.title)),
+        )
+    )
+    result.books_created = created.rowcount
+
+
+async def load(
+    connection: AsyncConnection,
+    raw_records: Iterable[dict[str, Any]],
+    batch_size: int = 10_000,
+) -> LoadResult:
+    """
+    Load records in the transaction of the connection.
+
+    :param connection: A connection with a transaction begun.
+    :param raw_records: Dicts with a `title`, a `year` and an `author`.
+    :param batch_size: The number of records sent to the database at once.
+    :return: The counts of the load and its duration.
+    """
+    result = LoadResult()
+    start = time.perf_counter()
+
+    # Temporary tables, only visible to this connection
+    await connection.run_sync(staging_metadata.create_all)
+    await _stage(connection, parse_records(raw_records, result), batch_size)
+    await _merge(connection, result)
+    await connection.run_sync(staging_metadata.drop_all)
+
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+async def main(
+    path: Path, file_format: Literal['csv', 'ndjson'], batch_size: int
+) -> LoadResult:
+    engine = create_async_engine(settings.DATABASE_URL)
+    try:
+        with path.open(newline='') as lines:
+            async with engine.begin() as connection:
+                return await load(
+                    connection, read_records(lines, file_format), batch_size
+                )
+    finally:
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('file', type=Path)
+    parser.add_argument('--format', choices=['csv', 'ndjson'], default=None)
+    parser.add_argument('--batch-size', type=int, default=10_000)
+    args = parser.parse_args()
+
+    file_format: Literal['csv', 'ndjson'] = args.format or (
+        'csv' if args.file.suffix.lower() == '.csv' else 'ndjson'
+    )
+    result = asyncio.run(main(args.file, file_format, args.batch_size))
+
+    print(
+        f'Loaded {result.records} records in {result.seconds:.2f} s '
+        f'({result.rows_per_second:,.0f} rows/s)'
+    )
+    print(
+        f'  authors created: {result.authors_created}\n'
+        f'  books created:   {result.books_created}\n'
+        f'  books updated:   {result.books_updated}\n'
+        f'  rejected:        {result.rejected}'
+    )
+    sys.exit(1 if result.rejected and not result.records else 0)
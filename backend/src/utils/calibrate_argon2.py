@@ -0,0 +1,133 @@
+"""
+Pick argon2 costs that meet a target password verification latency.
+
+Usage:
+    python -m src.utils.calibrate_argon2 [--target-ms 250]
+        [--max-memory-mib 256] [--parallelism 4] [--runs 3]
+        [--env-file .env]
+
+Following RFC 9106, memory is the preferred cost: the command starts from
+`--max-memory-mib` with a single pass and halves the memory until a verify
+fits in the target. The number of passes is then raised as long as it still
+fits. The result is printed as settings, and written to `--env-file` when
+given, replacing previous values. Run it on the production hardware, as the
+costs only hold for the host they were measured on.
+"""
+
+import argparse
+import time
+from pathlib import Path
+from typing import Callable
+
+from argon2 import PasswordHasher
+
+from src.core.settings import settings
+
+MIN_MEMORY_KIB = 8 * 1024
+CALIBRATION_PASSWORD = 'calibration-password'
+
+
+def measure_verify_ms(
+    time_cost: int, memory_cost: int, parallelism: int, runs: int = 3
+) -> float:
+    """
+    Measure the best verify time of a hash made with the given costs.
+
+    :param time_cost: The number of argon2 passes.
+    :param memory_cost: The memory used, in KiB.
+    :param parallelism: The number of lanes.
+    :param runs: The number of measured verifies.
+    :return: The fastest verify time, in milliseconds.
+    """
+    hasher = PasswordHasher(
+        time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism
+    )
+    password_hash = hasher.hash(CALIBRATION_PASSWORD)
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        hasher.verify(password_hash, CALIBRATION_PASSWORD)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return min(timings)
+
+
+def calibrate(
+    target_ms: float,
+    max_memory_kib: int,
+    measure: Callable[[int, int], float],
+) -> tuple[int, int]:
+    """
+    Find the costs with the most memory, then the most passes, that keep a
+    verify within the target latency.
+
+    :param target_ms: The target verify latency, in milliseconds.
+    :param max_memory_kib: The memory to start from, in KiB.
+    :param measure: Returns the verify latency for a time and memory cost.
+    :return: The time cost and memory cost, in KiB.
+    """
+    memory_cost = max_memory_kib
+    while memory_cost > MIN_MEMORY_KIB and measure(1, memory_cost) > target_ms:
+        memory_cost //= 2
+    memory_cost = max(memory_cost, MIN_MEMORY_KIB)
+
+    time_cost = 1
+    while measure(time_cost + 1, memory_cost) <= target_ms:
+        time_cost += 1
+
+    return time_cost, memory_cost
+
+
+def write_env_file(path: Path, values: dict[str, int]) -> None:
+    """
+    Set variables in a dotenv file, keeping its other lines.
+
+    :param path: The dotenv file, created if missing.
+    :param values: The variables to set.
+    """
+    lines = path.read_text().splitlines() if path.exists() else []
+    lines = [
+        line for line in lines if line.split('=', 1)[0].strip() not in values
+    ]
+    lines.extend(f'{key}={value}' for key, value in values.items())
+    path.write_text('\n'.join(lines) + '\n')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--target-ms', type=float, default=250)
+    parser.add_argument('--max-memory-mib', type=int, default=256)
+    parser.add_argument(
+        '--parallelism', type=int, default=settings.ARGON2_PARALLELISM
+    )
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--env-file', type=Path, default=None)
+    args = parser.parse_args()
+
+    def measure(time_cost: int, memory_cost: int) -> float:
+        elapsed_ms = measure_verify_ms(
+            time_cost, memory_cost, args.parallelism, args.runs
+        )
+        print(
+            f'  t={time_cost} m={memory_cost // 1024} MiB: {elapsed_ms:.1f} ms'
+        )
+        return elapsed_ms
+
+    print(f'Calibrating for a {args.target_ms} ms verify')
+    time_cost, memory_cost = calibrate(
+        args.target_ms, args.max_memory_mib * 1024, measure
+    )
+    values = {
+        'ARGON2_TIME_COST': time_cost,
+        'ARGON2_MEMORY_COST': memory_cost,
+        'ARGON2_PARALLELISM': args.parallelism,
+    }
+
+    print()
+    for key, value in values.items():
+        print(f'{key}={value}')
+
+    if args.env_file:
+        write_env_file(args.env_file, values)
+        print(f'\nWritten to {args.env_file}')
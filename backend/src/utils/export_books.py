@@ -0,0 +1,58 @@
+"""
+Export the book catalogue to a Parquet file or an Arrow IPC stream file.
+
+Usage:
+    python -m src.utils.export_books FILE [--format parquet|arrow]
+
+The format defaults to Arrow for `.arrow` and `.arrows` files, and to
+Parquet otherwise. Books are written one record batch of
+BOOKS_EXPORT_BATCH_SIZE rows at a time, with the name of their author.
+Requires pyarrow, installed with the `export` extra.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from src.core.settings import settings
+from src.services import catalog_export
+from src.services.catalog_export import ExportFormat
+
+
+async def main(path: Path, export_format: ExportFormat) -> int:
+    if not catalog_export.is_available():
+        print('The export requires pyarrow.', file=sys.stderr)
+        return 1
+
+    engine = create_async_engine(settings.DATABASE_URL)
+    start = time.perf_counter()
+    try:
+        async with AsyncSession(engine) as session:
+            books = await catalog_export.write_books(
+                session, path, export_format
+            )
+    finally:
+        await engine.dispose()
+
+    elapsed = time.perf_counter() - start
+    print(
+        f'Exported {books} books to {path} in {elapsed:.2f} s '
+        f'({path.stat().st_size / 2**20:.1f} MiB)'
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('file', type=Path)
+    parser.add_argument('--format', choices=['parquet', 'arrow'], default=None)
+    args = parser.parse_args()
+
+    export_format: ExportFormat = args.format or (
+        'arrow' if args.file.suffix in {'.arrow', '.arrows'} else 'parquet'
+    )
+    sys.exit(asyncio.run(main(args.file, export_format)))
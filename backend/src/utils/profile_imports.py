@@ -0,0 +1,127 @@
+"""
+Report the per-module import cost of the application.
+
+Usage:
+    python -m src.utils.profile_imports [--module src.app] [--top 20]
+        [--runs 3] [--budget-ms N]
+
+The module is imported in a fresh interpreter with `-X importtime`. The best
+of `--runs` runs is reported, so the cost of writing bytecode caches on the
+first run does not skew the results. With `--budget-ms` the command exits
+with status 1 when the total import time exceeds the budget.
+"""
+
+import argparse
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+
+IMPORT_TIME_PREFIX = 'import time:'
+PROJECT_DIR = Path(__file__).parents[2]
+
+
+@dataclass
+class ImportRecord:
+    module: str
+    depth: int
+    self_us: int
+    cumulative_us: int
+
+
+def parse_importtime(output: str) -> list[ImportRecord]:
+    """
+    Parse the stderr output of `python -X importtime`.
+
+    :param output: The raw stderr output.
+    :return: One `ImportRecord` per imported module, in the order they were
+        reported by the interpreter.
+    """
+    records = []
+    for line in output.splitlines():
+        if not line.startswith(IMPORT_TIME_PREFIX):
+            continue
+
+        self_us, cumulative_us, name = line[len(IMPORT_TIME_PREFIX) :].split(
+            '|'
+        )
+        if not self_us.strip().isdigit():
+            # Header line
+            continue
+
+        indent = len(name) - len(name.lstrip())
+        records.append(
+            ImportRecord(
+                module=name.strip(),
+                depth=(indent - 1) // 2,
+                self_us=int(self_us),
+                cumulative_us=int(cumulative_us),
+            )
+        )
+
+    return records
+
+
+def measure_imports(module: str = 'src.app') -> list[ImportRecord]:
+    """
+    Import a module in a fresh interpreter and return its import records.
+
+    :param module: The dotted name of the module to import.
+    :return: The parsed `ImportRecord` list.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=PROJECT_DIR,
+    )
+
+    return parse_importtime(result.stderr)
+
+
+def total_import_time_us(records: list[ImportRecord]) -> int:
+    return sum(record.cumulative_us for record in records if not record.depth)
+
+
+def self_time_by_package(records: list[ImportRecord]) -> dict[str, int]:
+    packages: defaultdict[str, int] = defaultdict(int)
+    for record in records:
+        packages[record.module.split('.')[0]] += record.self_us
+
+    return dict(sorted(packages.items(), key=lambda item: -item[1]))
+
+
+def report(records: list[ImportRecord], top: int) -> None:
+    print(f'Total import time: {total_import_time_us(records) / 1000:.1f} ms')
+
+    print(f'\nTop {top} packages by self time:')
+    for package, self_us in list(self_time_by_package(records).items())[:top]:
+        print(f'{self_us / 1000:10.1f} ms  {package}')
+
+    print(f'\nTop {top} modules by cumulative time:')
+    by_cumulative = sorted(records, key=lambda record: -record.cumulative_us)
+    for record in by_cumulative[:top]:
+        print(
+            f'{record.cumulative_us / 1000:10.1f} ms  '
+            f'{record.self_us / 1000:8.1f} ms self  {record.module}'
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--module', default='src.app')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--budget-ms', type=float, default=None)
+    args = parser.parse_args()
+
+    runs = [measure_imports(args.module) for _ in range(args.runs)]
+    records = min(runs, key=total_import_time_us)
+    report(records, args.top)
+
+    total_ms = total_import_time_us(records) / 1000
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f'\nImport time {total_ms:.1f} ms exceeds {args.budget_ms} ms')
+        sys.exit(1)
@@ -0,0 +1,206 @@
+"""
+Run the API with uvicorn, sized for the host.
+
+Usage:
+    python -m src.utils.serve [--host 0.0.0.0] [--port 8000] [--workers N]
+        [--backlog 2048] [--keepalive 65]
+
+Runs `--workers` worker processes, by default SERVER_WORKERS, or when 0 one
+per CPU available to the process: the CPUs it may run on, capped by the
+CPU quota of its cgroup, e.g. `docker run --cpus`. uvloop and httptools
+are used when installed, as they are with the `standard` extra of FastAPI.
+
+Each worker has its own engine pools, one per kind of work. The pools are
+sized so that all the connections of the workers, including those opened
+outside of the pools to listen to PostgreSQL notifications, stay within
+DB_MAX_CONNECTIONS: when the sizes and overflows of DB_POOL_SIZES and
+DB_POOL_MAX_OVERFLOW add up to more than the share of a worker, they are
+lowered in proportion, keeping at least one connection per pool.
+
+More than one worker requires the state the workers share to live out of
+their processes: INVALIDATION_BUS other than 'local', or the token
+revocations of one worker go unseen by the others until their filters
+are rebuilt, and LOGIN_THROTTLE_BACKEND 'database', or each worker
+throttles failed logins on its own. The server refuses to start
+otherwise.
+"""
+
+import argparse
+import json
+import math
+import os
+from importlib.util import find_spec
+from pathlib import Path
+
+import uvicorn
+
+from src.core.settings import PoolName, settings
+
+CGROUP_ROOT = Path('/sys/fs/cgroup')
+
+
+def cgroup_cpu_quota(root: Path = CGROUP_ROOT) -> float | None:
+    """
+    :param root: Where the cgroup filesystem is mounted.
+    :return: The number of CPUs the cgroup of the process may use, or None
+        if it has no quota.
+    """
+    # cgroup v2, e.g. '150000 100000', or 'max 100000' without quota
+    cpu_max = root / 'cpu.max'
+    if cpu_max.exists():
+        quota, period = cpu_max.read_text().split()
+        if quota == 'max':
+            return None
+        return int(quota) / int(period)
+
+    # cgroup v1, with -1 as the quota when there is none
+    quota_file = root / 'cpu' / 'cpu.cfs_quota_us'
+    period_file = root / 'cpu' / 'cpu.cfs_period_us'
+    if quota_file.exists() and period_file.exists():
+        quota_us = int(quota_file.read_text())
+        if quota_us <= 0:
+            return None
+        return quota_us / int(period_file.read_text())
+
+    return None
+
+
+def available_cpus(root: Path = CGROUP_ROOT) -> int:
+    """
+    :param root: Where the cgroup filesystem is mounted.
+    :return: The number of CPUs the process may use, rounded up.
+    """
+    cpus = len(os.sched_getaffinity(0))
+    quota = cgroup_cpu_quota(root)
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(cpus, 1)
+
+
+def dedicated_connections() -> int:
+    """
+    :return: The number of connections each worker opens outside of its
+        pool on PostgreSQL.
+    """
+    # The catalogue version listener and the invalidation bus transport
+    return int(settings.CATALOG_REPLICA) + int(
+        settings.INVALIDATION_BUS == 'postgres'
+    )
+
+
+def check_shared_state(workers: int) -> None:
+    """
+    :param workers: The number of worker processes.
+    :raises ValueError: If the workers would each keep state that must be
+        shared.
+    """
+    if workers == 1:
+        return
+
+    per_process = []
+    if settings.INVALIDATION_BUS == 'local':
+        per_process.append("INVALIDATION_BUS 'local'")
+    if settings.LOGIN_THROTTLE_BACKEND == 'memory':
+        per_process.append("LOGIN_THROTTLE_BACKEND 'memory'")
+    if per_process:
+        raise ValueError(
+            f'{workers} workers cannot run with {" and ".join(per_process)}'
+            ', which are per process. Use another invalidation bus and the '
+            "'database' throttle backend, or a single worker."
+        )
+
+
+def pool_sizes(
+    workers: int,
+    max_connections: int,
+    sizes: dict[PoolName, int],
+    overflows: dict[PoolName, int],
+) -> tuple[dict[PoolName, int], dict[PoolName, int]]:
+    """
+    Share a connection budget between the pools of the workers.
+
+    :param workers: The number of worker processes.
+    :param max_connections: The connections that all the workers may open.
+    :param sizes: The connections each pool keeps open, at least 1.
+    :param overflows: The connections each pool may open beyond its size.
+    :return: The sizes and overflows of the pools of each worker, lowered
+        in proportion if they exceed its share.
+    :raises ValueError: If the budget leaves a pool no connection.
+    """
+    share = max_connections // workers - dedicated_connections()
+    if share < len(sizes):
+        raise ValueError(
+            f'{max_connections} connections are not enough for '
+            f'{workers} workers.'
+        )
+
+    # Past the first connection of each pool
+    wanted = sum(sizes.values()) - len(sizes) + sum(overflows.values())
+    ratio = min(1, (share - len(sizes)) / wanted) if wanted else 1
+    return (
+        {
+            name: 1 + math.floor((size - 1) * ratio)
+            for name, size in sizes.items()
+        },
+        {
+            name: math.floor(overflow * ratio)
+            for name, overflow in overflows.items()
+        },
+    )
+
+
+def configure_pools(
+    sizes: dict[PoolName, int], overflows: dict[PoolName, int]
+) -> None:
+    # The workers started by uvicorn read their settings again from the
+    # environment, and a single worker runs in this process
+    settings.DB_POOL_SIZES = sizes
+    settings.DB_POOL_MAX_OVERFLOW = overflows
+    os.environ['DB_POOL_SIZES'] = json.dumps(sizes)
+    os.environ['DB_POOL_MAX_OVERFLOW'] = json.dumps(overflows)
+
+
+def main(args: argparse.Namespace) -> None:
+    workers = args.workers or available_cpus()
+    check_shared_state(workers)
+    sizes, overflows = pool_sizes(
+        workers,
+        settings.DB_MAX_CONNECTIONS,
+        settings.DB_POOL_SIZES,
+        settings.DB_POOL_MAX_OVERFLOW,
+    )
+    configure_pools(sizes, overflows)
+
+    loop = 'uvloop' if find_spec('uvloop') else 'asyncio'
+    http = 'httptools' if find_spec('httptools') else 'h11'
+    pools = ', '.join(
+        f'{name} {size} + {overflows[name]}' for name, size in sizes.items()
+    )
+    print(f'{workers} workers ({loop}, {http}), pools: {pools}')
+    uvicorn.run(
+        'src.app:app',
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        backlog=args.backlog,
+        timeout_keep_alive=args.keepalive,
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--host', default=settings.SERVER_HOST)
+    parser.add_argument('--port', type=int, default=settings.SERVER_PORT)
+    parser.add_argument('--workers', type=int, default=settings.SERVER_WORKERS)
+    parser.add_argument('--backlog', type=int, default=settings.SERVER_BACKLOG)
+    parser.add_argument(
+        '--keepalive', type=int, default=settings.SERVER_KEEPALIVE_SECONDS
+    )
+    args = parser.parse_args()
+
+    try:
+        main(args)
+    except ValueError as error:
+        parser.error(str(error))
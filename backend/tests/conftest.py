@@ -12,13 +12,23 @@ from sqlalchemy.ext.asyncio import (
 )
 from testcontainers.postgres import PostgresContainer
 
-from src.api.dependencies import get_session
+from src.api.dependencies import (
+    get_auth_session,
+    get_bulk_session,
+    get_login_throttle,
+    get_session,
+    get_write_session,
+    get_write_session_factory,
+)
 from src.app import app
 from src.core.security import get_password_hash
 from src.core.settings import settings
 from src.models import Author, Base, Book, User
 from src.schemas.token import Token
 from src.schemas.users import UserResponse
+from src.services import catalog_replica
+from src.services.catalog_replica import CatalogReplica
+from src.services.login_throttle import LoginThrottle, MemoryThrottleBackend
 
 
 class UserFactory(factory.Factory):  # type: ignore[misc]
@@ -93,7 +103,24 @@ async def async_session(
 async def async_client(
     async_session: AsyncSession,
 ) -> AsyncGenerator[AsyncClient, None]:
-    app.dependency_overrides[get_session] = lambda: async_session
+    # A single session for all the pools
+    for dependency in (
+        get_session,
+        get_write_session,
+        get_auth_session,
+        get_bulk_session,
+    ):
+        app.dependency_overrides[dependency] = lambda: async_session
+    # Background tasks open their own sessions on the test database
+    session_factory = async_sessionmaker(
+        bind=async_session.bind, expire_on_commit=False, class_=AsyncSession
+    )
+    app.dependency_overrides[get_write_session_factory] = (
+        lambda: session_factory
+    )
+    # Failed logins must not be throttled across tests
+    throttle = LoginThrottle(MemoryThrottleBackend())
+    app.dependency_overrides[get_login_throttle] = lambda: throttle
     _transport = ASGITransport(app=app)
 
     async with AsyncClient(
@@ -198,3 +225,11 @@ async def book(async_session: AsyncSession, author: Author) -> Book:
         async_session.add(book)
 
     return book
+
+
+@pytest.fixture
+def replica() -> Generator[CatalogReplica, None, None]:
+    # The catalogue replica of the app, serving reads once loaded
+    yield catalog_replica.replica
+
+    catalog_replica.reset()
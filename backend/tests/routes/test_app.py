@@ -1,6 +1,19 @@
+import asyncio
 from http import HTTPStatus
+from pathlib import Path
+from typing import Any
 
+import pytest
 from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.app import app, lifespan
+from src.core.invalidation import Invalidation, bus
+from src.core.settings import settings
+from src.models import Book
+from src.services import catalog_replica, revocation_service
+from src.services.catalog_replica import CatalogReplica
+from src.services.revocation_service import RevocationList
 
 
 async def test_read_home_root(async_client: AsyncClient) -> None:
@@ -8,3 +21,99 @@ async def test_read_home_root(async_client: AsyncClient) -> None:
 
     assert response.status_code == HTTPStatus.OK
     assert response.json() == {'message': 'Root Endpoint!'}
+
+
+async def test_lifespan_loads_revocations(
+    async_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    await revocation_service.revoke_token(async_session, 'abc')
+    revocation_list = RevocationList()
+    monkeypatch.setattr(revocation_service, 'revocation_list', revocation_list)
+    monkeypatch.setattr(
+        'src.app.AsyncSessionLocal',
+        async_sessionmaker(bind=async_session.bind, expire_on_commit=False),
+    )
+
+    async with lifespan(app):
+        assert 'abc' in revocation_list
+
+
+async def test_lifespan_loads_catalog_replica(
+    async_session: AsyncSession,
+    replica: CatalogReplica,
+    book: Book,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, 'CATALOG_REPLICA', True)
+    monkeypatch.setattr(
+        'src.app.AsyncSessionLocal',
+        async_sessionmaker(bind=async_session.bind, expire_on_commit=False),
+    )
+
+    async with lifespan(app):
+        assert replica.book(book.id) is not None
+
+    assert not replica.ready
+
+
+@pytest.mark.usefixtures('replica')
+async def test_lifespan_shares_catalog_snapshot(
+    async_session: AsyncSession,
+    book: Book,
+    monkeypatch: pytest.MonkeyPatch,
+    tmp_path: Path,
+) -> None:
+    monkeypatch.setattr(settings, 'CATALOG_REPLICA', True)
+    monkeypatch.setattr(
+        settings, 'CATALOG_SNAPSHOT_PATH', str(tmp_path / 'catalog')
+    )
+    monkeypatch.setattr(
+        'src.app.AsyncSessionLocal',
+        async_sessionmaker(bind=async_session.bind, expire_on_commit=False),
+    )
+
+    async with lifespan(app):
+        reader = catalog_replica.get_reader()
+        assert reader is catalog_replica.shared.snapshot
+        assert reader is not None
+        assert reader.book(book.id) is not None
+
+    assert catalog_replica.get_reader() is None
+    assert (tmp_path / 'catalog').exists()
+
+
+class RecordingTransport:
+    def __init__(self) -> None:
+        self.sent: list[str] = []
+
+    async def connect(self, receive: Any) -> None:
+        pass
+
+    def is_connected(self) -> bool:
+        return self.sent is not None
+
+    async def send(self, payload: str) -> None:
+        self.sent.append(payload)
+
+    async def close(self) -> None:
+        pass
+
+
+async def test_lifespan_runs_invalidation_bus(
+    async_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    transport = RecordingTransport()
+    monkeypatch.setattr('src.app.create_transport', lambda: transport)
+    monkeypatch.setattr(
+        'src.app.AsyncSessionLocal',
+        async_sessionmaker(bind=async_session.bind, expire_on_commit=False),
+    )
+
+    async with lifespan(app):
+        await asyncio.sleep(0)
+        bus.publish(Invalidation('user', 'deleted', [1]))
+        async with asyncio.timeout(5):
+            while not transport.sent:
+                await asyncio.sleep(0.01)
+
+    assert Invalidation.decode(transport.sent[0]).ids == [1]
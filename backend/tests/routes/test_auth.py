@@ -1,14 +1,27 @@
 import typing
+from collections.abc import Generator
+from datetime import datetime, timedelta
 from http import HTTPStatus
+from zoneinfo import ZoneInfo
 
 import pytest
 from fastapi import HTTPException
 from freezegun import freeze_time
 from httpx import AsyncClient
+from jwt import decode
+from sqlalchemy import delete, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.api.dependencies import get_current_user
-from src.core.security import create_access_token
+from src.core.metrics import metrics
+from src.core.security import (
+    create_access_token,
+    get_password_context,
+    verify_password,
+)
+from src.core.settings import settings
+from src.models import User
+from src.schemas.token import Token
 from tests.conftest import MockedUser
 
 
@@ -143,3 +156,265 @@ async def test_token_with_empty_email_sub(async_session: AsyncSession) -> None:
 
     assert exc_info.value.status_code == HTTPStatus.UNAUTHORIZED
     assert exc_info.value.detail == 'Could not validate credentials.'
+
+
+@pytest.fixture
+def claims_mode(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, 'ACCESS_TOKEN_MODE', 'claims')
+
+
+async def login(async_client: AsyncClient, user: MockedUser) -> Token:
+    response = await async_client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': user.clean_password},
+    )
+    assert response.status_code == HTTPStatus.OK
+
+    return Token.model_validate(response.json())
+
+
+@pytest.mark.usefixtures('claims_mode')
+async def test_claims_mode_access_token_is_not_refreshed_alone(
+    async_client: AsyncClient, user_token: str
+) -> None:
+    response = await async_client.post(
+        '/auth/refresh_token/',
+        headers={'Authorization': f'Bearer {user_token}'},
+    )
+
+    assert response.status_code == HTTPStatus.GONE
+    assert response.json() == {
+        'detail': 'Use /auth/refresh with a refresh token.'
+    }
+
+
+@pytest.mark.usefixtures('claims_mode')
+async def test_claims_mode_token_carries_claims(
+    async_client: AsyncClient, user: MockedUser
+) -> None:
+    with freeze_time('2024-01-01 12:00:00'):
+        token = await login(async_client, user)
+
+    payload = decode(
+        token.access_token,
+        settings.SECRET_KEY,
+        algorithms=[settings.ALGORITHM],
+        options={'verify_exp': False},
+    )
+    expected_exp = datetime(
+        2024, 1, 1, 12, tzinfo=ZoneInfo('UTC')
+    ) + timedelta(minutes=settings.CLAIMS_ACCESS_TOKEN_EXPIRE_MINUTES)
+
+    assert token.refresh_token
+    assert payload['sub'] == user.email
+    assert payload['uid'] == user.id
+    assert payload['su'] is False
+    assert payload['exp'] == expected_exp.timestamp()
+
+
+@pytest.mark.usefixtures('claims_mode')
+async def test_claims_mode_authorizes_without_user_lookup(
+    async_client: AsyncClient, async_session: AsyncSession, user: MockedUser
+) -> None:
+    token = await login(async_client, user)
+
+    # The access token stays valid until it expires, even without its user
+    async with async_session.begin():
+        await async_session.execute(delete(User).where(User.id == user.id))
+
+    response = await async_client.post(
+        '/author',
+        headers={'Authorization': f'Bearer {token.access_token}'},
+        json={'name': 'test-name'},
+    )
+    assert response.status_code == HTTPStatus.CREATED
+
+    # But it can no longer be renewed
+    response = await async_client.post(
+        '/auth/refresh', json={'refresh_token': token.refresh_token}
+    )
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert response.json() == {'detail': 'Invalid refresh token.'}
+
+
+@pytest.mark.usefixtures('claims_mode')
+async def test_claims_mode_superuser_claim(
+    async_client: AsyncClient, superuser: MockedUser, user: MockedUser
+) -> None:
+    superuser_token = await login(async_client, superuser)
+    user_token = await login(async_client, user)
+
+    response = await async_client.get(
+        '/superuser/all',
+        headers={'Authorization': f'Bearer {superuser_token.access_token}'},
+    )
+    assert response.status_code == HTTPStatus.OK
+
+    response = await async_client.get(
+        '/superuser/all',
+        headers={'Authorization': f'Bearer {user_token.access_token}'},
+    )
+    assert response.status_code == HTTPStatus.FORBIDDEN
+
+
+@pytest.mark.usefixtures('claims_mode')
+async def test_refresh_token_rotation(
+    async_client: AsyncClient, user: MockedUser
+) -> None:
+    token = await login(async_client, user)
+
+    response = await async_client.post(
+        '/auth/refresh', json={'refresh_token': token.refresh_token}
+    )
+    rotated = Token.model_validate(response.json())
+
+    assert response.status_code == HTTPStatus.OK
+    assert rotated.refresh_token
+    assert rotated.refresh_token != token.refresh_token
+
+    response = await async_client.get(
+        '/users/me',
+        headers={'Authorization': f'Bearer {rotated.access_token}'},
+    )
+    assert response.json()['email'] == user.email
+
+
+@pytest.mark.usefixtures('claims_mode')
+async def test_refresh_token_reuse_revokes_family(
+    async_client: AsyncClient, user: MockedUser
+) -> None:
+    token = await login(async_client, user)
+    response = await async_client.post(
+        '/auth/refresh', json={'refresh_token': token.refresh_token}
+    )
+    rotated = Token.model_validate(response.json())
+
+    # Replaying the already rotated token revokes the tokens issued from it
+    response = await async_client.post(
+        '/auth/refresh', json={'refresh_token': token.refresh_token}
+    )
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+    response = await async_client.post(
+        '/auth/refresh', json={'refresh_token': rotated.refresh_token}
+    )
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.usefixtures('claims_mode')
+async def test_refresh_token_expired(
+    async_client: AsyncClient, user: MockedUser
+) -> None:
+    with freeze_time('2024-01-01 12:00:00'):
+        token = await login(async_client, user)
+
+    with freeze_time('2024-01-09 12:00:00'):
+        response = await async_client.post(
+            '/auth/refresh', json={'refresh_token': token.refresh_token}
+        )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.usefixtures('claims_mode')
+async def test_refresh_token_inactive_user(
+    async_client: AsyncClient, async_session: AsyncSession, user: MockedUser
+) -> None:
+    token = await login(async_client, user)
+
+    async with async_session.begin():
+        await async_session.execute(
+            update(User).where(User.id == user.id).values(is_active=False)
+        )
+
+    response = await async_client.post(
+        '/auth/refresh', json={'refresh_token': token.refresh_token}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.fixture
+def cheap_argon2_costs(
+    monkeypatch: pytest.MonkeyPatch,
+) -> Generator[None, None, None]:
+    monkeypatch.setattr(settings, 'ARGON2_TIME_COST', 1)
+    monkeypatch.setattr(settings, 'ARGON2_MEMORY_COST', 8 * 1024)
+    get_password_context.cache_clear()
+
+    yield
+
+    get_password_context.cache_clear()
+
+
+async def test_login_rehashes_outdated_password_hash(
+    async_client: AsyncClient,
+    async_session: AsyncSession,
+    user: MockedUser,
+    cheap_argon2_costs: None,
+) -> None:
+    metrics.reset()
+    async with async_session.begin():
+        old_hash = await async_session.scalar(
+            select(User.password_hash).where(User.id == user.id)
+        )
+
+    for _ in range(2):
+        await login(async_client, user)
+
+    async with async_session.begin():
+        password_hash = await async_session.scalar(
+            select(User.password_hash).where(User.id == user.id)
+        )
+
+    assert password_hash
+    assert password_hash != old_hash
+    assert '$m=8192,t=1,' in password_hash
+    assert verify_password(user.clean_password, password_hash)
+    # The second login found an up to date hash
+    assert metrics.get('password_rehashes') == 1
+
+
+async def test_login_keeps_up_to_date_password_hash(
+    async_client: AsyncClient, async_session: AsyncSession, user: MockedUser
+) -> None:
+    async with async_session.begin():
+        old_hash = await async_session.scalar(
+            select(User.password_hash).where(User.id == user.id)
+        )
+
+    await login(async_client, user)
+
+    async with async_session.begin():
+        password_hash = await async_session.scalar(
+            select(User.password_hash).where(User.id == user.id)
+        )
+
+    assert password_hash == old_hash
+
+
+async def test_login_is_throttled_before_verifying_password(
+    async_client: AsyncClient, user: MockedUser
+) -> None:
+    max_failures = settings.LOGIN_THROTTLE_MAX_FAILURES_PER_ACCOUNT
+    metrics.reset()
+
+    for _ in range(max_failures):
+        response = await async_client.post(
+            '/auth/token',
+            data={'username': user.email, 'password': 'wrong-password'},
+        )
+        assert response.status_code == HTTPStatus.BAD_REQUEST
+
+    response = await async_client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': user.clean_password},
+    )
+
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert response.json() == {
+        'detail': 'Too many login attempts. Try again later.'
+    }
+    assert response.headers['Retry-After'] == '1'
+    assert metrics.get('password_verifications') == max_failures
+    assert metrics.get('password_verifications_avoided') == 1
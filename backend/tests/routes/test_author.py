@@ -1,9 +1,17 @@
+import json
+import tracemalloc
 from http import HTTPStatus
 
+import pytest
 from httpx import AsyncClient
+from sqlalchemy import String, cast, insert, literal, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.models import Author
+from src.api.routes.author import authors_json_stream
+from src.core.settings import settings
+from src.models import Author, Book
+from src.services import author_service
+from src.services.catalog_replica import CatalogReplica
 from tests.conftest import AuthorFactory
 
 
@@ -279,3 +287,172 @@ async def test_list_authors_pagination_with_name_filter_return_10_authors(
 
     assert len(response.json()['authors']) == expected_authors
     assert response.json()['total_results'] == expected_results
+
+
+async def test_list_authors_page_size_is_capped(
+    async_client: AsyncClient,
+    async_session: AsyncSession,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    expected_authors = 5
+    expected_results = 10
+    monkeypatch.setattr(settings, 'AUTHORS_MAX_PAGE_SIZE', expected_authors)
+
+    async with async_session.begin():
+        async_session.add_all(AuthorFactory.create_batch(10))
+
+    response = await async_client.get('/author')
+    too_large = await async_client.get('/author?limit=6')
+
+    assert len(response.json()['authors']) == expected_authors
+    assert response.json()['total_results'] == expected_results
+    assert too_large.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert too_large.json() == {'detail': 'The limit is at most 5 authors.'}
+
+
+async def test_stream_authors(
+    async_client: AsyncClient, async_session: AsyncSession
+) -> None:
+    async with async_session.begin():
+        async_session.add_all(
+            Author(name=name) for name in ('author_a', 'author_b', 'other')
+        )
+
+    response = await async_client.get('/author/stream')
+    filtered = await async_client.get('/author/stream?name=author')
+    empty = await async_client.get('/author/stream?name=missing')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'application/json'
+    assert response.json() == [
+        {'id': 1, 'name': 'author_a'},
+        {'id': 2, 'name': 'author_b'},
+        {'id': 3, 'name': 'other'},
+    ]
+    assert [author['id'] for author in filtered.json()] == [1, 2]
+    assert empty.json() == []
+
+
+async def test_stream_authors_reads_in_chunks(
+    async_session: AsyncSession,
+) -> None:
+    async with async_session.begin():
+        async_session.add_all(AuthorFactory.create_batch(5))
+
+    chunks = [
+        [row.id for row in rows]
+        async for rows in author_service.stream_authors(
+            async_session, chunk_size=2
+        )
+    ]
+
+    assert chunks == [[1, 2], [3, 4], [5]]
+
+
+async def test_stream_one_million_authors_within_memory_budget(
+    async_session: AsyncSession,
+) -> None:
+    expected_authors = 1_000_000
+    budget = 16 * 1024 * 1024
+
+    numbers = select(literal(1).label('n')).cte('numbers', recursive=True)
+    numbers = numbers.union_all(
+        select(numbers.c.n + 1).where(numbers.c.n < expected_authors)
+    )
+    async with async_session.begin():
+        await async_session.execute(
+            insert(Author).from_select(
+                ['name', 'version'],
+                select(
+                    literal('author_').concat(cast(numbers.c.n, String)),
+                    literal(1),
+                ),
+            )
+        )
+
+    streamed = 0
+    body: list[str] = []
+    tracemalloc.start()
+    try:
+        async for chunk in authors_json_stream(async_session, None):
+            streamed += chunk.count('"id"')
+            if len(body) < 2:  # noqa: PLR2004
+                body.append(chunk)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert streamed == expected_authors
+    assert json.loads(''.join(body) + ']')[0] == {'id': 1, 'name': 'author_1'}
+    # Loading the whole list as `Author` objects takes gigabytes
+    assert peak < budget
+
+
+async def test_author_changes(
+    async_client: AsyncClient,
+    user_token: str,
+    author: Author,
+    book: Book,
+) -> None:
+    headers = {'Authorization': f'Bearer {user_token}'}
+    response = await async_client.get('/author/changes')
+    full_sync = response.json()
+
+    assert response.status_code == HTTPStatus.OK
+    assert full_sync['changed'] == [{'id': author.id, 'name': author.name}]
+
+    await async_client.delete('/author/1', headers=headers)
+
+    response = await async_client.get(
+        '/author/changes', params={'since': full_sync['since']}
+    )
+    assert response.json()['deleted'] == [1]
+
+    # The books deleted along with their author are in the books feed
+    response = await async_client.get(
+        '/book/changes', params={'since': full_sync['since']}
+    )
+    assert response.json()['deleted'] == [book.id]
+
+
+async def test_author_changes_batch_delete(
+    async_client: AsyncClient, async_session: AsyncSession, user_token: str
+) -> None:
+    async_session.add_all(AuthorFactory.create_batch(3))
+    await async_session.commit()
+    since = (await async_client.get('/author/changes')).json()['since']
+
+    await async_client.post(
+        '/author/delete/batch',
+        headers={'Authorization': f'Bearer {user_token}'},
+        json={'ids': [1, 3]},
+    )
+    response = await async_client.get(
+        '/author/changes', params={'since': since}
+    )
+
+    assert sorted(response.json()['deleted']) == [1, 3]
+
+
+async def test_read_authors_from_replica(
+    async_client: AsyncClient,
+    async_session: AsyncSession,
+    replica: CatalogReplica,
+    author: Author,
+) -> None:
+    await replica.load(async_session)
+    async with async_session.begin():
+        # Not replicated, as the catalogue version is left as is
+        await async_session.execute(
+            update(Author).values(name='renamed').where(Author.id == author.id)
+        )
+        async_session.add(Author(name='new'))
+
+    response = await async_client.get(f'/author/{author.id}')
+    list_response = await async_client.get('/author?name=renamed')
+    new_author = await async_client.get('/author/2')
+
+    assert response.json() == {'id': author.id, 'name': author.name}
+    assert list_response.json() == {'authors': [], 'total_results': 0}
+    # Authors not replicated yet are read from the database
+    assert new_author.json() == {'id': 2, 'name': 'new'}
@@ -1,10 +1,17 @@
 from http import HTTPStatus
+from typing import Any
 
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.core.settings import settings
 from src.models import Author, Book
+from src.services import catalog_export
+from src.services.catalog_replica import CatalogReplica
 from tests.conftest import BookFactory
 
 
@@ -359,3 +366,263 @@ async def test_list_books_pagination_with_filter(
 
     assert len(response.json()['books']) == expected_books
     assert response.json()['total_results'] == expected_results
+
+
+@pytest.mark.parametrize('mode', ['orm', 'projection'])
+async def test_list_books_query_modes(
+    async_client: AsyncClient,
+    monkeypatch: pytest.MonkeyPatch,
+    author: Author,
+    book: Book,
+    mode: str,
+) -> None:
+    monkeypatch.setattr(
+        settings, 'BOOK_LIST_QUERY_MODES', {'postgresql': mode, 'sqlite': mode}
+    )
+
+    response = await async_client.get(f'/book?year={book.year}')
+
+    assert response.json() == {
+        'books': [
+            {
+                'id': book.id,
+                'title': book.title,
+                'year': book.year,
+                'author': author.name,
+            }
+        ],
+        'total_results': 1,
+    }
+
+
+async def test_book_changes(
+    async_client: AsyncClient, user_token: str, author: Author
+) -> None:
+    headers = {'Authorization': f'Bearer {user_token}'}
+    for title in ('first', 'second'):
+        await async_client.post(
+            '/book',
+            headers=headers,
+            json={'year': 2000, 'title': title, 'author_id': author.id},
+        )
+
+    response = await async_client.get('/book/changes')
+    full_sync = response.json()
+
+    assert response.status_code == HTTPStatus.OK
+    assert [book['title'] for book in full_sync['changed']] == [
+        'first',
+        'second',
+    ]
+    assert full_sync['changed'][0]['author'] == author.name
+    assert not full_sync['deleted']
+    assert not full_sync['has_more']
+
+    await async_client.patch('/book/1', headers=headers, json={'year': 1999})
+    await async_client.delete('/book/2', headers=headers)
+
+    response = await async_client.get(
+        '/book/changes', params={'since': full_sync['since']}
+    )
+    delta = response.json()
+
+    assert [(book['id'], book['year']) for book in delta['changed']] == [
+        (1, 1999)
+    ]
+    assert delta['deleted'] == [2]
+    assert delta['version'] > full_sync['version']
+
+    response = await async_client.get(
+        '/book/changes', params={'since': delta['since']}
+    )
+
+    assert response.json() == {
+        'changed': [],
+        'deleted': [],
+        'version': delta['version'],
+        'has_more': False,
+        'since': delta['since'],
+    }
+
+
+async def test_book_changes_batch_delete(
+    async_client: AsyncClient,
+    async_session: AsyncSession,
+    user_token: str,
+    author: Author,
+) -> None:
+    async_session.add_all(BookFactory.create_batch(3))
+    await async_session.commit()
+    since = (await async_client.get('/book/changes')).json()['since']
+
+    await async_client.post(
+        '/book/delete/batch',
+        headers={'Authorization': f'Bearer {user_token}'},
+        json={'ids': [1, 2]},
+    )
+    response = await async_client.get('/book/changes', params={'since': since})
+
+    assert sorted(response.json()['deleted']) == [1, 2]
+
+
+@pytest.mark.parametrize(
+    'params', [{'since': -1}, {'since': '1:'}, {'limit': 0}]
+)
+async def test_book_changes_invalid_params(
+    async_client: AsyncClient, params: dict[str, int | str]
+) -> None:
+    response = await async_client.get('/book/changes', params=params)
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+async def test_export_books_as_arrow(
+    async_client: AsyncClient, async_session: AsyncSession, author: Author
+) -> None:
+    async with async_session.begin():
+        async_session.add_all([
+            Book(title='dune', year=1965, author_id=author.id),
+            Book(title='emma', year=1815, author_id=author.id),
+        ])
+
+    response = await async_client.get('/book/export')
+    filtered = await async_client.get('/book/export?year=1815')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == (
+        'application/vnd.apache.arrow.stream'
+    )
+    assert response.headers['content-disposition'] == (
+        'attachment; filename="books.arrows"'
+    )
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.to_pylist() == [
+        {'id': 1, 'title': 'dune', 'year': 1965, 'author': author.name},
+        {'id': 2, 'title': 'emma', 'year': 1815, 'author': author.name},
+    ]
+    filtered_table = pa.ipc.open_stream(filtered.content).read_all()
+    assert filtered_table.column('title').to_pylist() == ['emma']
+
+
+async def test_export_books_as_parquet(
+    async_client: AsyncClient, book: Book
+) -> None:
+    response = await async_client.get('/book/export?format=parquet')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'application/vnd.apache.parquet'
+    table = pq.read_table(pa.BufferReader(response.content))
+    assert table.column('title').to_pylist() == [book.title]
+
+
+async def test_export_books_without_pyarrow(
+    async_client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(catalog_export, '_pyarrow', lambda: None)
+
+    response = await async_client.get('/book/export')
+
+    assert response.status_code == HTTPStatus.NOT_IMPLEMENTED
+    assert response.json() == {
+        'detail': 'The columnar export is not installed.'
+    }
+
+
+async def test_read_books_from_replica(
+    async_client: AsyncClient,
+    async_session: AsyncSession,
+    replica: CatalogReplica,
+    book: Book,
+) -> None:
+    await replica.load(async_session)
+    async with async_session.begin():
+        # Not replicated, as the catalogue version is left as is
+        await async_session.execute(
+            update(Book).values(year=1999).where(Book.id == book.id)
+        )
+        async_session.add(Book(title='new', year=2000, author_id=1))
+
+    response = await async_client.get(f'/book/{book.id}')
+    list_response = await async_client.get('/book?year=1999')
+    new_book = await async_client.get('/book/2')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['year'] == book.year
+    assert list_response.json() == {'books': [], 'total_results': 0}
+    # Books not replicated yet are read from the database
+    assert new_book.json()['title'] == 'new'
+
+
+@pytest.mark.parametrize('list_format', ['full', 'compact', 'columnar'])
+async def test_list_books_formats(
+    async_client: AsyncClient,
+    async_session: AsyncSession,
+    replica: CatalogReplica,
+    monkeypatch: pytest.MonkeyPatch,
+    list_format: str,
+) -> None:
+    authors = [Author(name='jane austen'), Author(name='james joyce')]
+    async with async_session.begin():
+        async_session.add_all(authors)
+    books = [
+        Book(title='emma', year=1815, author_id=authors[0].id),
+        Book(title='ulysses', year=1922, author_id=authors[1].id),
+        Book(title='persuasion', year=1817, author_id=authors[0].id),
+    ]
+    async with async_session.begin():
+        async_session.add_all(books)
+    names = {author.id: author.name for author in authors}
+    bodies: dict[str, dict[str, Any]] = {
+        'full': {
+            'books': [
+                {
+                    'id': book.id,
+                    'title': book.title,
+                    'year': book.year,
+                    'author': names[book.author_id],
+                }
+                for book in books
+            ]
+        },
+        'compact': {
+            'books': [
+                {
+                    'id': book.id,
+                    'title': book.title,
+                    'year': book.year,
+                    'author_id': book.author_id,
+                }
+                for book in books
+            ],
+            'authors': {str(key): name for key, name in names.items()},
+        },
+        'columnar': {
+            'books': {
+                'id': [book.id for book in books],
+                'title': [book.title for book in books],
+                'year': [book.year for book in books],
+                'author_id': [book.author_id for book in books],
+            },
+            'authors': {str(key): name for key, name in names.items()},
+        },
+    }
+    expected = bodies[list_format] | {'total_results': len(books)}
+
+    for mode in ('orm', 'projection'):
+        monkeypatch.setattr(
+            settings,
+            'BOOK_LIST_QUERY_MODES',
+            {'postgresql': mode, 'sqlite': mode},
+        )
+        response = await async_client.get(f'/book?format={list_format}')
+        assert response.json() == expected
+
+    await replica.load(async_session)
+    response = await async_client.get(f'/book?format={list_format}')
+    assert response.json() == expected
+
+
+async def test_list_books_invalid_format(async_client: AsyncClient) -> None:
+    response = await async_client.get('/book?format=xml')
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
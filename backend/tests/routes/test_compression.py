@@ -0,0 +1,194 @@
+import gzip
+from http import HTTPStatus
+from typing import Any
+
+import brotli
+import pytest
+import zstandard
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api import compression
+from src.api.compression import CompressionMiddleware, choose_encoding
+from src.core.metrics import metrics
+from src.models import Author
+from tests.conftest import BookFactory
+
+BODY = b'{"message": "a response body long enough to be compressed"}' * 20
+
+
+@pytest.mark.parametrize(
+    ('accept_encoding', 'expected'),
+    [
+        (None, None),
+        ('identity', None),
+        ('deflate', None),
+        ('gzip', 'gzip'),
+        ('gzip, br', 'br'),
+        ('gzip, deflate, br, zstd', 'zstd'),
+        ('br;q=0.5, gzip', 'gzip'),
+        ('*', 'zstd'),
+        ('zstd;q=0, *', 'br'),
+        ('gzip;q=x', None),
+    ],
+)
+def test_choose_encoding(accept_encoding: str | None, expected: str) -> None:
+    assert choose_encoding(accept_encoding) == expected
+
+
+def test_choose_encoding_without_optional_encoders(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(compression, '_brotli', lambda: None)
+    monkeypatch.setattr(compression, '_zstandard', lambda: None)
+
+    assert choose_encoding('zstd, br') is None
+    assert choose_encoding('zstd, br, gzip;q=0.1') == 'gzip'
+
+
+def compressed_app(**options: Any) -> FastAPI:
+    app = FastAPI()
+
+    @app.get('/body')
+    def body(size: int = len(BODY)) -> Response:
+        return Response(BODY[:size], media_type='application/json')
+
+    @app.get('/encoded')
+    def encoded() -> Response:
+        return Response(
+            gzip.compress(BODY), headers={'Content-Encoding': 'gzip'}
+        )
+
+    @app.get('/stream')
+    def stream() -> StreamingResponse:
+        return StreamingResponse(iter([BODY, BODY]))
+
+    app.add_middleware(CompressionMiddleware, **options)
+    return app
+
+
+def compressed_client(**options: Any) -> AsyncClient:
+    return AsyncClient(
+        transport=ASGITransport(app=compressed_app(**options)),
+        base_url='http://test',
+    )
+
+
+DECOMPRESS = {
+    'gzip': gzip.decompress,
+    'br': brotli.decompress,
+    'zstd': zstandard.decompress,
+}
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize('encoding', ['gzip', 'br', 'zstd'])
+async def test_compress_response(encoding: str) -> None:
+    async with compressed_client(levels={'gzip': 9}) as client:
+        # Compressed as sent, without decoding
+        async with client.stream(
+            'GET', '/body', headers={'Accept-Encoding': encoding}
+        ) as response:
+            compressed = b''.join([c async for c in response.aiter_raw()])
+
+    assert response.headers['content-encoding'] == encoding
+    assert response.headers['content-length'] == str(len(compressed))
+    assert response.headers['vary'] == 'Accept-Encoding'
+    assert len(compressed) < len(BODY)
+    assert DECOMPRESS[encoding](compressed) == BODY
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    ('path', 'headers'),
+    [
+        ('/body', {'Accept-Encoding': ''}),
+        ('/body', {'Accept-Encoding': 'identity'}),
+        ('/body?size=99', {'Accept-Encoding': 'gzip'}),
+        ('/encoded', {'Accept-Encoding': 'br'}),
+        ('/stream', {'Accept-Encoding': 'gzip'}),
+    ],
+)
+async def test_responses_sent_as_they_are(
+    path: str, headers: dict[str, str]
+) -> None:
+    async with compressed_client(minimum_size=100) as client:
+        async with client.stream('GET', path, headers=headers) as response:
+            await response.aread()
+
+    assert response.status_code == HTTPStatus.OK
+    assert 'vary' not in response.headers
+    if path != '/encoded':
+        assert 'content-encoding' not in response.headers
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    ('cache_size', 'expected_hits'),
+    [(0, 0), (1, 1), (2, 2)],
+)
+async def test_compressed_bodies_cache(
+    cache_size: int, expected_hits: int
+) -> None:
+    hits = metrics.get('compression_cache_hits')
+    headers = {'Accept-Encoding': 'gzip'}
+
+    async with compressed_client(
+        minimum_size=100, cache_size=cache_size
+    ) as client:
+        for size in (200, 200, 300, 200):
+            response = await client.get(
+                '/body', params={'size': size}, headers=headers
+            )
+            assert response.content == BODY[:size]
+
+    assert metrics.get('compression_cache_hits') - hits == expected_hits
+
+
+@pytest.mark.anyio
+async def test_other_scopes_pass_through() -> None:
+    received: list[dict[str, Any]] = []
+
+    async def app(scope: Any, receive: Any, send: Any) -> None:
+        received.append(scope)
+
+    scope = {'type': 'lifespan'}
+    await CompressionMiddleware(app)(scope, None, None)  # type: ignore[arg-type]
+
+    assert received == [scope]
+
+
+async def test_app_compresses_lists(
+    async_client: AsyncClient, async_session: AsyncSession, author: Author
+) -> None:
+    async with async_session.begin():
+        async_session.add_all(BookFactory.create_batch(50))
+
+    plain = await async_client.get(
+        '/book?limit=50', headers={'Accept-Encoding': 'identity'}
+    )
+    response = await async_client.get(
+        '/book?limit=50', headers={'Accept-Encoding': 'br'}
+    )
+
+    assert 'content-encoding' not in plain.headers
+    assert response.headers['content-encoding'] == 'br'
+    assert response.headers['vary'] == 'Accept, Accept-Encoding'
+    assert response.json() == plain.json()
+
+
+async def test_app_does_not_compress_streams(
+    async_client: AsyncClient, async_session: AsyncSession, author: Author
+) -> None:
+    async with async_session.begin():
+        async_session.add_all(BookFactory.create_batch(50))
+
+    for path in ('/author/stream', '/book/export'):
+        response = await async_client.get(
+            path, headers={'Accept-Encoding': 'gzip'}
+        )
+
+        assert response.status_code == HTTPStatus.OK
+        assert 'content-encoding' not in response.headers
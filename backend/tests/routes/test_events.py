@@ -0,0 +1,136 @@
+import asyncio
+import json
+from http import HTTPStatus
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api.routes import events
+from src.core.events import CatalogEvent, LocalBroker
+from src.core.settings import settings
+from src.models import Author, Book
+
+
+@pytest.fixture
+def broker(monkeypatch: pytest.MonkeyPatch) -> LocalBroker:
+    broker = LocalBroker()
+    monkeypatch.setattr(events, 'broker', broker)
+    monkeypatch.setattr('src.services.change_feed.broker', broker)
+
+    return broker
+
+
+async def wait_for_subscribers(broker: LocalBroker) -> None:
+    while not len(broker):
+        await asyncio.sleep(0.01)
+
+
+async def test_stream_events(
+    async_client: AsyncClient,
+    broker: LocalBroker,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, 'EVENTS_KEEPALIVE_SECONDS', 0.01)
+    request = asyncio.create_task(async_client.get('/events'))
+    await wait_for_subscribers(broker)
+
+    await asyncio.sleep(0.05)
+    broker.publish(
+        CatalogEvent(entity='author', action='deleted', ids=[1], version=3)
+    )
+    broker.close()
+    response = await request
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/event-stream')
+    assert response.text.startswith(': connected\n\n: keep-alive\n\n')
+    assert response.text.endswith(
+        'event: author\n'
+        'data: {"entity": "author", "action": "deleted", "ids": [1], '
+        '"version": 3}\n\n'
+    )
+
+
+async def test_write_paths_publish_events(
+    async_client: AsyncClient,
+    broker: LocalBroker,
+    user_token: str,
+    author: Author,
+) -> None:
+    headers = {'Authorization': f'Bearer {user_token}'}
+    subscription = broker.subscribe()
+
+    await async_client.post(
+        '/book',
+        headers=headers,
+        json={'year': 2000, 'title': 'title', 'author_id': author.id},
+    )
+    await async_client.patch(
+        f'/author/{author.id}', headers=headers, json={'name': 'renamed'}
+    )
+    await async_client.delete(f'/author/{author.id}', headers=headers)
+    broker.close()
+
+    messages = []
+    while message := await subscription.get():
+        messages.append(message.splitlines()[1])
+
+    assert [message.split(', "version"')[0] for message in messages] == [
+        'data: {"entity": "book", "action": "created", "ids": [1]',
+        # The books of a renamed author are published with its new name
+        'data: {"entity": "book", "action": "updated", "ids": [1]',
+        'data: {"entity": "author", "action": "updated", "ids": [1]',
+        'data: {"entity": "author", "action": "deleted", "ids": [1]',
+        'data: {"entity": "book", "action": "deleted", "ids": [1]',
+    ]
+
+
+async def test_rolled_back_changes_are_not_published(
+    async_session: AsyncSession, broker: LocalBroker
+) -> None:
+    subscription = broker.subscribe()
+
+    with pytest.raises(IntegrityError):
+        async with async_session.begin():
+            async_session.add_all([Author(name='name'), Author(name='name')])
+
+    async with async_session.begin():
+        async_session.add(Author(name='other'))
+    broker.close()
+
+    message = await subscription.get()
+    assert message
+    # The version taken by the rolled back transaction is given again
+    assert '"action": "created"' in message
+    assert message.endswith('"version": 1}\n\n')
+    assert await subscription.get() is None
+
+
+async def test_author_rename_publishes_each_book_once(
+    async_session: AsyncSession, broker: LocalBroker, book: Book
+) -> None:
+    async with async_session.begin():
+        other = Book(title='other', year=1990, author_id=book.author_id)
+        async_session.add(other)
+    subscription = broker.subscribe()
+
+    async with async_session.begin():
+        author = await async_session.get(Author, book.author_id)
+        assert author
+        author.name = 'renamed'
+        book.year = 1999
+        async_session.add(Book(title='new', year=2000, author=author))
+    broker.close()
+
+    ids: dict[tuple[str, str], list[int]] = {}
+    while message := await subscription.get():
+        event = json.loads(message.splitlines()[1].removeprefix('data: '))
+        ids[event['entity'], event['action']] = sorted(event['ids'])
+
+    assert ids == {
+        ('book', 'updated'): [book.id, other.id],
+        ('book', 'created'): [other.id + 1],
+        ('author', 'updated'): [author.id],
+    }
@@ -0,0 +1,222 @@
+from http import HTTPStatus
+from typing import Any
+
+import msgpack
+import pytest
+from fastapi import APIRouter, FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from src.api import negotiation
+from src.api.negotiation import (
+    MSGPACK_MEDIA_TYPE,
+    NegotiatedRoute,
+    prefers_msgpack,
+)
+from src.models import Author, Book
+from src.schemas.books import BookPublic, BookResponseCreate
+
+MSGPACK_HEADERS = {'Accept': MSGPACK_MEDIA_TYPE}
+
+
+@pytest.mark.parametrize(
+    ('accept', 'expected'),
+    [
+        (None, False),
+        ('application/json', False),
+        ('*/*', False),
+        ('application/msgpack', True),
+        ('application/x-msgpack', True),
+        ('application/json, application/msgpack', True),
+        ('application/json, application/msgpack;q=0.5', False),
+        ('application/json;q=0.5, application/msgpack', True),
+        ('application/msgpack;q=0, */*', False),
+        ('application/msgpack;q=x', False),
+    ],
+)
+def test_prefers_msgpack(accept: str | None, expected: bool) -> None:
+    assert prefers_msgpack(accept) is expected
+
+
+async def test_msgpack_response(async_client: AsyncClient, book: Book) -> None:
+    json_response = await async_client.get('/book')
+    response = await async_client.get('/book', headers=MSGPACK_HEADERS)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == MSGPACK_MEDIA_TYPE
+    assert response.headers['vary'] == 'Accept'
+    assert msgpack.unpackb(response.content) == json_response.json()
+
+    assert json_response.headers['content-type'] == 'application/json'
+    assert json_response.headers['vary'] == 'Accept'
+
+
+async def test_errors_stay_json(async_client: AsyncClient) -> None:
+    response = await async_client.get('/book/1', headers=MSGPACK_HEADERS)
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert response.headers['content-type'] == 'application/json'
+    assert response.json() == {'detail': 'Book not found in MADR.'}
+
+
+async def test_msgpack_request_bodies(
+    async_client: AsyncClient, user_token: str, author: Author
+) -> None:
+    headers = {
+        'Authorization': f'Bearer {user_token}',
+        'Content-Type': MSGPACK_MEDIA_TYPE,
+        'Accept': MSGPACK_MEDIA_TYPE,
+    }
+
+    response = await async_client.post(
+        '/author',
+        headers=headers,
+        content=msgpack.packb({'name': 'other author'}),
+    )
+    assert response.status_code == HTTPStatus.CREATED
+    assert msgpack.unpackb(response.content) == {
+        'id': 2,
+        'name': 'other author',
+    }
+
+    response = await async_client.post(
+        '/book',
+        headers=headers,
+        content=msgpack.packb({
+            'year': 2024,
+            'title': 'book title',
+            'author_id': 2,
+        }),
+    )
+    assert response.status_code == HTTPStatus.CREATED
+    assert msgpack.unpackb(response.content)['author'] == 'other author'
+
+    response = await async_client.post(
+        '/book/delete/batch',
+        headers=headers,
+        content=msgpack.packb({'ids': [1]}),
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert msgpack.unpackb(response.content) == {
+        'message': 'Books deleted from MADR.'
+    }
+
+
+async def test_invalid_msgpack_request_body(
+    async_client: AsyncClient, user_token: str
+) -> None:
+    response = await async_client.post(
+        '/author',
+        headers={
+            'Authorization': f'Bearer {user_token}',
+            'Content-Type': MSGPACK_MEDIA_TYPE,
+        },
+        content=b'\xc1',
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'There was an error parsing the body'}
+
+
+async def test_without_msgpack(
+    async_client: AsyncClient,
+    user_token: str,
+    book: Book,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(negotiation, '_msgpack', lambda: None)
+
+    response = await async_client.get('/book', headers=MSGPACK_HEADERS)
+    assert response.headers['content-type'] == 'application/json'
+    assert response.json()['total_results'] == 1
+
+    response = await async_client.post(
+        '/author',
+        headers={
+            'Authorization': f'Bearer {user_token}',
+            'Content-Type': MSGPACK_MEDIA_TYPE,
+        },
+        content=msgpack.packb({'name': 'other author'}),
+    )
+    assert response.status_code == HTTPStatus.UNSUPPORTED_MEDIA_TYPE
+    assert response.json() == {'detail': 'MessagePack is not installed.'}
+
+
+def models_app() -> FastAPI:
+    router = APIRouter(route_class=NegotiatedRoute)
+    # Out of the range of the model, to tell whether it was validated
+    book = BookPublic.model_construct(id=1, title='t', year=9999, author='a')
+
+    @router.get('/instance', response_model=BookPublic, status_code=201)
+    async def instance() -> Any:
+        return book
+
+    @router.get('/subclass', response_model=BookPublic)
+    async def subclass() -> Any:
+        return BookResponseCreate(
+            id=1, title='t', year=1999, author='a', author_id=1
+        )
+
+    @router.get(
+        '/filtered', response_model=BookPublic, response_model_exclude={'id'}
+    )
+    async def filtered() -> Any:
+        return book
+
+    @router.get('/sync', response_model=BookPublic)
+    def sync() -> Any:
+        return book
+
+    app = FastAPI()
+    app.include_router(router)
+    return app
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    ('path', 'status_code', 'body'),
+    [
+        (
+            '/instance',
+            HTTPStatus.CREATED,
+            {'id': 1, 'title': 't', 'year': 9999, 'author': 'a'},
+        ),
+        (
+            '/subclass',
+            HTTPStatus.OK,
+            {'id': 1, 'title': 't', 'year': 1999, 'author': 'a'},
+        ),
+    ],
+)
+async def test_model_instances_are_not_validated_again(
+    path: str, status_code: int, body: dict[str, Any]
+) -> None:
+    async with AsyncClient(
+        transport=ASGITransport(app=models_app()), base_url='http://test'
+    ) as client:
+        response = await client.get(path)
+        packed = await client.get(path, headers=MSGPACK_HEADERS)
+
+    assert response.status_code == status_code
+    assert response.json() == body
+    assert response.headers['vary'] == 'Accept'
+    assert msgpack.unpackb(packed.content) == body
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize(
+    ('path', 'body'),
+    [
+        ('/filtered', {'title': 't', 'year': 9999, 'author': 'a'}),
+        ('/sync', {'id': 1, 'title': 't', 'year': 9999, 'author': 'a'}),
+    ],
+)
+async def test_model_instances_serialised_by_fastapi(
+    path: str, body: dict[str, Any]
+) -> None:
+    async with AsyncClient(
+        transport=ASGITransport(app=models_app()), base_url='http://test'
+    ) as client:
+        response = await client.get(path)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == body
@@ -17,6 +17,31 @@ def test_jwt() -> None:
 
     assert result['sub'] == data['sub']
     assert result['exp']
+    assert result['iat']
+    assert result['jti']
+
+
+def test_jwt_ids_are_unique() -> None:
+    data = {'sub': 'test@test.com'}
+    tokens = [create_access_token(data) for _ in range(2)]
+
+    first, second = (
+        decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        for token in tokens
+    )
+
+    assert first['jti'] != second['jti']
+
+
+def test_jwt_issued_at_keeps_the_fraction_of_a_second() -> None:
+    tokens = [create_access_token({'sub': 'test@test.com'}) for _ in range(2)]
+
+    first, second = (
+        decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        for token in tokens
+    )
+
+    assert first['iat'] < second['iat']
 
 
 async def test_jwt_invalid_token(async_client: AsyncClient) -> None:
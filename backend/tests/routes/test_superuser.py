@@ -1,11 +1,17 @@
+from datetime import datetime, timedelta
 from http import HTTPStatus
 from typing import Callable
+from zoneinfo import ZoneInfo
 
 import pytest
+from freezegun import freeze_time
 from httpx import AsyncClient
+from jwt import decode
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.models import User
+from src.core.settings import settings
+from src.models import Book, User
+from src.schemas.token import Token
 from src.services import user_service
 from tests.conftest import MockedUser, UserFactory
 
@@ -44,6 +50,34 @@ async def test_get_all_users_access_denied_if_not_superuser(
     assert response.json() == {'detail': 'Insufficient permissions.'}
 
 
+async def test_get_metrics(
+    async_client: AsyncClient, superuser_token: str, book: Book
+) -> None:
+    for _ in range(2):
+        await async_client.get(f'/book/{book.id}')
+
+    response = await async_client.get(
+        '/superuser/metrics',
+        headers={'Authorization': f'Bearer {superuser_token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['counters']['sql_compiled_cache_hits'] > 0
+    assert set(response.json()['pools']) == {'auth', 'read', 'write', 'bulk'}
+
+
+async def test_get_metrics_access_denied_if_not_superuser(
+    async_client: AsyncClient, user_token: str
+) -> None:
+    response = await async_client.get(
+        '/superuser/metrics',
+        headers={'Authorization': f'Bearer {user_token}'},
+    )
+
+    assert response.status_code == HTTPStatus.FORBIDDEN
+    assert response.json() == {'detail': 'Insufficient permissions.'}
+
+
 async def test_get_user_by_id(
     async_client: AsyncClient, superuser_token: str, user: MockedUser
 ) -> None:
@@ -322,3 +356,87 @@ async def test_delete_superuser_denied(
     assert response.json() == {
         'detail': 'Super users are not allowed to delete themselves.'
     }
+
+
+async def test_revoke_token(
+    async_client: AsyncClient, superuser_token: str, user_token: str
+) -> None:
+    jti = decode(
+        user_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+    )['jti']
+
+    response = await async_client.post(
+        f'/superuser/revocations/token/{jti}',
+        headers={'Authorization': f'Bearer {superuser_token}'},
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {'message': 'Token revoked.'}
+
+    response = await async_client.get(
+        '/users/me', headers={'Authorization': f'Bearer {user_token}'}
+    )
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+    # Other tokens are not affected
+    response = await async_client.get(
+        '/superuser/all',
+        headers={'Authorization': f'Bearer {superuser_token}'},
+    )
+    assert response.status_code == HTTPStatus.OK
+
+
+async def test_revoke_user_tokens(
+    async_client: AsyncClient,
+    monkeypatch: pytest.MonkeyPatch,
+    superuser_token: str,
+    user: MockedUser,
+) -> None:
+    monkeypatch.setattr(settings, 'ACCESS_TOKEN_MODE', 'claims')
+    with freeze_time(datetime.now(tz=ZoneInfo('UTC')) - timedelta(seconds=2)):
+        response = await async_client.post(
+            '/auth/token',
+            data={'username': user.email, 'password': user.clean_password},
+        )
+    token = Token.model_validate(response.json())
+
+    response = await async_client.post(
+        f'/superuser/revocations/user/{user.id}',
+        headers={'Authorization': f'Bearer {superuser_token}'},
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {'message': 'User tokens revoked.'}
+
+    response = await async_client.post(
+        '/author',
+        headers={'Authorization': f'Bearer {token.access_token}'},
+        json={'name': 'test-name'},
+    )
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+    response = await async_client.post(
+        '/auth/refresh', json={'refresh_token': token.refresh_token}
+    )
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+async def test_revoke_user_tokens_user_not_found(
+    async_client: AsyncClient, superuser_token: str
+) -> None:
+    response = await async_client.post(
+        '/superuser/revocations/user/999',
+        headers={'Authorization': f'Bearer {superuser_token}'},
+    )
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert response.json() == {'detail': 'User not found.'}
+
+
+async def test_revoke_access_denied_if_not_superuser(
+    async_client: AsyncClient, user_token: str, user: MockedUser
+) -> None:
+    response = await async_client.post(
+        f'/superuser/revocations/user/{user.id}',
+        headers={'Authorization': f'Bearer {user_token}'},
+    )
+
+    assert response.status_code == HTTPStatus.FORBIDDEN
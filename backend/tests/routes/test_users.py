@@ -5,6 +5,7 @@ import pytest
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.core.invalidation import Invalidation, bus
 from src.core.security import verify_password
 from src.models import User
 from src.services import user_service
@@ -215,3 +216,24 @@ async def test_delete_user(async_client: AsyncClient, user_token: str) -> None:
 
     assert response.status_code == HTTPStatus.OK
     assert response.json() == {'message': 'User deleted.'}
+
+
+async def test_user_changes_are_published(
+    async_client: AsyncClient, user: MockedUser, user_token: str
+) -> None:
+    published: list[Invalidation] = []
+    bus.subscribe('user', published.append)
+    headers = {'Authorization': f'Bearer {user_token}'}
+
+    try:
+        await async_client.patch(
+            '/users/me', headers=headers, json={'username': 'renamed'}
+        )
+        await async_client.delete('/users/me', headers=headers)
+    finally:
+        bus.unsubscribe('user', published.append)
+
+    assert [(i.action, i.ids) for i in published] == [
+        ('updated', [user.id]),
+        ('deleted', [user.id]),
+    ]
@@ -0,0 +1,87 @@
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models import Author
+from src.services import catalog_export
+from tests.conftest import BookFactory
+
+
+@pytest.fixture
+async def books(async_session: AsyncSession, author: Author) -> None:
+    async with async_session.begin():
+        async_session.add_all(
+            BookFactory(title=f'book {n}', year=1990 + n, author_id=author.id)
+            for n in range(5)
+        )
+
+
+@pytest.mark.usefixtures('books')
+async def test_book_record_batches(
+    async_session: AsyncSession, author: Author
+) -> None:
+    batches = [
+        batch
+        async for batch in catalog_export.book_record_batches(
+            async_session, batch_size=2
+        )
+    ]
+
+    assert [batch.num_rows for batch in batches] == [2, 2, 1]
+    assert batches[0].schema == catalog_export.book_schema()
+    assert batches[2].to_pylist() == [
+        {'id': 5, 'title': 'book 4', 'year': 1994, 'author': author.name}
+    ]
+
+    filtered = [
+        batch.column('id').to_pylist()
+        async for batch in catalog_export.book_record_batches(
+            async_session, book_title='book', book_year=1991
+        )
+    ]
+    assert filtered == [[2]]
+
+
+@pytest.mark.usefixtures('books')
+@pytest.mark.parametrize('export_format', ['arrow', 'parquet'])
+async def test_write_books(
+    async_session: AsyncSession,
+    tmp_path: Path,
+    export_format: catalog_export.ExportFormat,
+) -> None:
+    path = tmp_path / 'books'
+
+    written = await catalog_export.write_books(
+        async_session, path, export_format
+    )
+
+    if export_format == 'parquet':
+        table = pq.read_table(path)
+    else:
+        table = pa.ipc.open_stream(path.read_bytes()).read_all()
+    assert written == table.num_rows == 5  # noqa: PLR2004
+    assert table.column('title').to_pylist() == [f'book {n}' for n in range(5)]
+
+
+async def test_encode_books_without_books(
+    async_session: AsyncSession,
+) -> None:
+    chunks = [
+        chunk
+        async for chunk in catalog_export.encode_books(async_session, 'arrow')
+    ]
+
+    table = pa.ipc.open_stream(b''.join(chunks)).read_all()
+    assert table.num_rows == 0
+    assert table.schema == catalog_export.book_schema()
+
+
+def test_book_schema_without_pyarrow(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(catalog_export, '_pyarrow', lambda: None)
+
+    assert not catalog_export.is_available()
+    with pytest.raises(catalog_export.ExportUnavailable):
+        catalog_export.book_schema()
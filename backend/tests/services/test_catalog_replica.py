@@ -0,0 +1,398 @@
+import asyncio
+from pathlib import Path
+from typing import Any
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from src.core.catalog_snapshot import AuthorRecord, BookRecord
+from src.core.metrics import metrics
+from src.models import Author, Book
+from src.schemas.authors import AuthorSchema
+from src.schemas.books import BookUpdate
+from src.services import (
+    author_service,
+    book_service,
+    catalog_replica,
+)
+from src.services.catalog_replica import (
+    CatalogReader,
+    CatalogReplica,
+    SharedSnapshot,
+)
+from src.utils.bulk_load import load
+
+
+async def assert_consistent(
+    async_session: AsyncSession, replica: CatalogReader
+) -> None:
+    async with async_session:
+        books = [
+            BookRecord(*row)
+            for row in await async_session.execute(
+                select(Book.id, Book.title, Book.year, Author.name, Author.id)
+                .join(Book.author)
+                .order_by(Book.id)
+            )
+        ]
+        authors = [
+            AuthorRecord(*row)
+            for row in await async_session.execute(
+                select(Author.id, Author.name).order_by(Author.id)
+            )
+        ]
+
+    assert replica.books(len(books) + 1, 0) == (books, len(books))
+    assert replica.authors(len(authors) + 1, 0) == (authors, len(authors))
+    for book in books:
+        assert replica.book(book.id) == book
+        assert replica.book_by_title(book.title) == book
+    for author in authors:
+        assert replica.author(author.id) == author
+        assert replica.books_by_author(author.id) == [
+            book for book in books if book.author == author.name
+        ]
+
+
+async def add_books(
+    async_session: AsyncSession, author: Author, *books: tuple[str, int]
+) -> list[Book]:
+    new_books = [
+        Book(title=title, year=year, author_id=author.id)
+        for title, year in books
+    ]
+    async with async_session.begin():
+        async_session.add_all(new_books)
+
+    return new_books
+
+
+@pytest.fixture
+async def catalog(async_session: AsyncSession, author: Author) -> Author:
+    other = Author(name='other author')
+    async with async_session.begin():
+        async_session.add(other)
+    await add_books(async_session, author, ('dune', 1965), ('emma', 1815))
+    await add_books(async_session, other, ('dubliners', 1914))
+
+    return other
+
+
+async def test_load(
+    async_session: AsyncSession, replica: CatalogReplica, catalog: Author
+) -> None:
+    assert not replica.ready
+
+    await replica.load(async_session)
+
+    assert replica.ready
+    await assert_consistent(async_session, replica)
+    assert replica.book(100) is None
+    assert replica.book_by_title('missing') is None
+    assert replica.author(100) is None
+    assert replica.books_by_author(100) == []
+
+
+@pytest.mark.usefixtures('catalog')
+@pytest.mark.parametrize(
+    ('filters', 'limit', 'offset'),
+    [
+        ((None, None), 2, 1),
+        (('du', None), 20, 0),
+        ((None, 1815), 20, 0),
+        (('du', 1914), 20, 0),
+        (('missing', None), 20, 0),
+        ((None, None), 20, 5),
+    ],
+)
+async def test_book_lists_match_database(
+    async_session: AsyncSession,
+    replica: CatalogReplica,
+    filters: tuple[str | None, int | None],
+    limit: int,
+    offset: int,
+) -> None:
+    await replica.load(async_session)
+
+    rows, total = await book_service.get_book_rows_list(
+        async_session, limit, offset, *filters
+    )
+    books, replica_total = replica.books(limit, offset, *filters)
+
+    assert replica_total == total
+    assert [book._asdict() for book in books] == [
+        dict(row._mapping) for row in sorted(rows, key=lambda row: row.id)
+    ]
+
+
+@pytest.mark.usefixtures('catalog')
+@pytest.mark.parametrize(
+    ('name', 'offset'), [(None, 0), ('other', 0), (None, 1)]
+)
+async def test_author_lists_match_database(
+    async_session: AsyncSession,
+    replica: CatalogReplica,
+    name: str | None,
+    offset: int,
+) -> None:
+    await replica.load(async_session)
+
+    authors, total = await author_service.get_filtered_authors_list(
+        async_session, 20, name, offset
+    )
+
+    assert replica.authors(20, offset, name) == (
+        [AuthorRecord(author.id, author.name) for author in authors],
+        total,
+    )
+
+
+async def test_sync_applies_changes(
+    async_session: AsyncSession,
+    replica: CatalogReplica,
+    author: Author,
+    catalog: Author,
+) -> None:
+    await replica.load(async_session)
+    syncs = metrics.get('catalog_replica_syncs')
+
+    assert await replica.sync(async_session) == 0
+
+    [book] = await add_books(async_session, author, ('persuasion', 1817))
+    assert await replica.sync(async_session) == 1
+    await assert_consistent(async_session, replica)
+
+    await book_service.update_book_in_db(
+        async_session, BookUpdate(year=1818), book
+    )
+    await author_service.update_author_info(
+        async_session, catalog, AuthorSchema(name='james joyce')
+    )
+    await replica.sync(async_session)
+    await assert_consistent(async_session, replica)
+    assert replica.book(book.id) == (
+        book.id,
+        'persuasion',
+        1818,
+        author.name,
+        author.id,
+    )
+
+    await book_service.delete_book(async_session, book)
+    await author_service.delete_author(async_session, catalog)
+    await replica.sync(async_session)
+    await assert_consistent(async_session, replica)
+    assert replica.books(20, 0)[1] == 2  # noqa: PLR2004
+
+    engine = async_session.bind
+    assert isinstance(engine, AsyncEngine)
+    async with engine.begin() as connection:
+        await load(
+            connection,
+            [
+                {'title': 'dune', 'year': 1966, 'author': 'frank herbert'},
+                {'title': 'ulysses', 'year': 1922, 'author': 'james joyce'},
+            ],
+        )
+    await replica.sync(async_session)
+    await assert_consistent(async_session, replica)
+    assert metrics.get('catalog_replica_syncs') == syncs + 4
+
+
+@pytest.mark.usefixtures('catalog')
+async def test_sync_moves_titles_between_books(
+    async_session: AsyncSession, replica: CatalogReplica, author: Author
+) -> None:
+    await replica.load(async_session)
+
+    async with async_session.begin():
+        book = await async_session.scalar(
+            select(Book).where(Book.title == 'dune')
+        )
+        assert book is not None
+        book.title = 'dune messiah'
+    # The old title is taken by a new book within the same sync
+    [new_book] = await add_books(async_session, author, ('dune', 1984))
+    await replica.sync(async_session)
+
+    await assert_consistent(async_session, replica)
+    assert replica.book_by_title('dune') == replica.book(new_book.id)
+
+
+async def test_sync_keeps_books_ordered_by_id(
+    async_session: AsyncSession, replica: CatalogReplica, author: Author
+) -> None:
+    async with async_session.begin():
+        async_session.add(
+            Book(id=10, title='b', year=2000, author_id=author.id)
+        )
+    await replica.load(async_session)
+
+    async with async_session.begin():
+        async_session.add(
+            Book(id=5, title='a', year=2000, author_id=author.id)
+        )
+    await replica.sync(async_session)
+
+    books, _ = replica.books(20, 0)
+    assert [book.id for book in books] == [5, 10]
+    await assert_consistent(async_session, replica)
+
+
+async def wait_for(condition: Any, timeout: float = 5) -> None:
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+async def test_run_catalog_replica(
+    async_session: AsyncSession,
+    replica: CatalogReplica,
+    author: Author,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    session_factory = async_sessionmaker(
+        bind=async_session.bind, expire_on_commit=False
+    )
+    failing_sync = True
+    sync = replica.sync
+
+    async def sync_failing_once(session: AsyncSession) -> int:
+        nonlocal failing_sync
+        if failing_sync:
+            failing_sync = False
+            raise ConnectionError
+        return await sync(session)
+
+    monkeypatch.setattr(replica, 'sync', sync_failing_once)
+    # PostgreSQL notifies the changes, other databases are polled
+    postgresql = async_session.get_bind().dialect.name == 'postgresql'
+    task = asyncio.create_task(
+        catalog_replica.run_catalog_replica(
+            session_factory, 60 if postgresql else 0.01
+        )
+    )
+
+    try:
+        if postgresql:
+            # The first sync failed, the next one follows a notification
+            await asyncio.sleep(0.1)
+            assert not replica.ready
+        [book] = await add_books(async_session, author, ('dune', 1965))
+        await wait_for(lambda: replica.book(book.id) is not None)
+        await add_books(async_session, author, ('emma', 1815))
+        await wait_for(lambda: replica.book_by_title('emma') is not None)
+    finally:
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+
+async def test_run_catalog_replica_follows_invalidations(
+    async_session: AsyncSession, replica: CatalogReplica, author: Author
+) -> None:
+    session_factory = async_sessionmaker(
+        bind=async_session.bind, expire_on_commit=False
+    )
+    task = asyncio.create_task(
+        catalog_replica.run_catalog_replica(session_factory, 60)
+    )
+
+    try:
+        await wait_for(lambda: replica.ready)
+        # Published on the invalidation bus once committed
+        [book] = await add_books(async_session, author, ('dune', 1965))
+        await wait_for(lambda: replica.book(book.id) is not None)
+    finally:
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+
+@pytest.mark.anyio
+async def test_listen_only_on_postgresql() -> None:
+    engine = create_async_engine('sqlite+aiosqlite://')
+
+    async with AsyncSession(engine) as session:
+        assert await catalog_replica._listen(session, asyncio.Event()) is None
+
+    await engine.dispose()
+
+
+@pytest.mark.usefixtures('catalog')
+async def test_write_snapshot(
+    async_session: AsyncSession, replica: CatalogReplica, tmp_path: Path
+) -> None:
+    await replica.load(async_session)
+    snapshot = SharedSnapshot()
+    snapshot.enable(tmp_path / 'catalog')
+
+    assert snapshot.refresh() is None
+    assert snapshot.publish(replica)
+    assert not snapshot.publish(replica)
+    mapped = snapshot.refresh()
+
+    assert mapped is not None
+    assert mapped.version == replica.version
+    await assert_consistent(async_session, mapped)
+    snapshot.close()
+    assert snapshot.snapshot is None
+
+
+def test_shared_snapshot_has_one_writer(tmp_path: Path) -> None:
+    writer, follower = SharedSnapshot(), SharedSnapshot()
+    writer.enable(tmp_path / 'catalog')
+    follower.enable(tmp_path / 'catalog')
+
+    assert writer.lead()
+    assert writer.lead()
+    assert not follower.lead()
+
+    writer.close()
+    assert follower.lead()
+    follower.close()
+
+
+async def test_sync_catalog_shares_snapshot(
+    async_session: AsyncSession,
+    replica: CatalogReplica,
+    author: Author,
+    tmp_path: Path,
+) -> None:
+    session_factory = async_sessionmaker(
+        bind=async_session.bind, expire_on_commit=False
+    )
+    catalog_replica.shared.enable(tmp_path / 'catalog')
+    # Another worker, mapping the snapshot written by this one
+    follower = SharedSnapshot()
+    follower.enable(tmp_path / 'catalog')
+    writes = metrics.get('catalog_snapshot_writes')
+
+    await catalog_replica.sync_catalog(session_factory)
+    reader = catalog_replica.get_reader()
+
+    assert reader is catalog_replica.shared.snapshot
+    assert reader is not None
+    assert not follower.lead()
+    assert follower.refresh() is not None
+
+    [book] = await add_books(async_session, author, ('dune', 1965))
+    await catalog_replica.sync_catalog(session_factory)
+    await catalog_replica.sync_catalog(session_factory)
+
+    reader = catalog_replica.get_reader()
+    assert reader is not None
+    assert reader.book(book.id) is not None
+    await assert_consistent(async_session, reader)
+    assert metrics.get('catalog_snapshot_writes') == writes + 2
+
+    snapshot = follower.refresh()
+    assert snapshot is not None
+    assert snapshot.version == replica.version
+    follower.close()
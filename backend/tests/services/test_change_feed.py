@@ -0,0 +1,150 @@
+import pytest
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from src.core.events import broker
+from src.core.invalidation import Invalidation, bus
+from src.models import Author, Book, CatalogVersion
+from src.services import author_service, book_service, change_feed
+from tests.conftest import AuthorFactory, BookFactory
+
+
+async def current_version(session: AsyncSession) -> int:
+    async with session.begin():
+        version = await session.scalar(select(CatalogVersion.value))
+
+    assert version is not None
+    return version
+
+
+async def test_flush_stamps_new_version(
+    async_session: AsyncSession, author: Author
+) -> None:
+    books = BookFactory.create_batch(2)
+    async with async_session.begin():
+        async_session.add_all(books)
+
+    version = await current_version(async_session)
+
+    assert [book.version for book in books] == [version, version]
+    assert author.version < version
+
+
+async def test_unmodified_objects_keep_their_version(
+    async_session: AsyncSession, book: Book
+) -> None:
+    version = book.version
+
+    async with async_session.begin():
+        book.year = book.year  # noqa: PLW0127
+        async_session.add(book)
+
+    assert book.version == version
+    assert await current_version(async_session) == version
+
+
+async def test_author_rename_bumps_its_books(
+    async_session: AsyncSession, author: Author, book: Book
+) -> None:
+    async with async_session.begin():
+        author.name = 'renamed'
+
+    changes = await book_service.get_book_changes(
+        async_session, since=str(book.version), limit=10
+    )
+
+    assert [changed.id for changed in changes.changed] == [book.id]
+    assert changes.changed[0].author.name == 'renamed'
+
+
+async def test_deleting_author_with_loaded_books(
+    async_session: AsyncSession, book: Book
+) -> None:
+    since = await current_version(async_session)
+
+    async with async_session.begin():
+        author = await async_session.scalar(
+            select(Author).options(selectinload(Author.books))
+        )
+        await async_session.delete(author)
+
+    changes = await book_service.get_book_changes(
+        async_session, since=str(since), limit=10
+    )
+
+    # A single tombstone, not one from the ORM and one for the cascade
+    assert changes.deleted == [book.id]
+
+
+async def test_changes_pages_split_versions(
+    async_session: AsyncSession,
+) -> None:
+    async with async_session.begin():
+        async_session.add_all(AuthorFactory.create_batch(3))
+    async with async_session.begin():
+        async_session.add_all(AuthorFactory.create_batch(2))
+    first_version = await current_version(async_session) - 1
+    async with async_session.begin():
+        await change_feed.record_bulk_deletion(async_session, Author, [2])
+        await async_session.execute(delete(Author).where(Author.id.in_([2])))
+
+    pages = [
+        await author_service.get_author_changes(
+            async_session, since='0', limit=2
+        )
+    ]
+    while pages[-1].has_more:
+        pages.append(
+            await author_service.get_author_changes(
+                async_session, since=pages[-1].since, limit=2
+            )
+        )
+
+    assert [
+        ([author.id for author in page.changed], page.deleted)
+        for page in pages
+    ] == [([1, 3], []), ([4, 5], []), ([], [2])]
+    assert [page.since for page in pages] == [
+        f'{first_version}:3',
+        f'{first_version + 1}:5',
+        str(first_version + 2),
+    ]
+    assert pages[-1].version == first_version + 2
+
+
+async def test_bulk_inserted_rows_need_a_version(
+    async_session: AsyncSession,
+) -> None:
+    with pytest.raises(IntegrityError):
+        async with async_session.begin():
+            await async_session.execute(insert(Author), [{'name': 'bulk'}])
+
+
+async def test_record_bulk_deletion_without_ids(
+    async_session: AsyncSession,
+) -> None:
+    version = await current_version(async_session)
+
+    async with async_session.begin():
+        await change_feed.record_bulk_deletion(async_session, Book, [])
+
+    assert await current_version(async_session) == version
+
+
+@pytest.mark.anyio
+async def test_catalog_events_of_other_workers_reach_broker() -> None:
+    subscription = broker.subscribe()
+    try:
+        bus.receive(
+            Invalidation('author', 'deleted', [4], 9, origin='other').encode()
+        )
+
+        assert await subscription.get() == (
+            'event: author\n'
+            'data: {"entity": "author", "action": "deleted", "ids": [4], '
+            '"version": 9}\n\n'
+        )
+    finally:
+        broker.unsubscribe(subscription)
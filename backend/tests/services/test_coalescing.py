@@ -0,0 +1,94 @@
+import asyncio
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.metrics import metrics
+from src.models import Author, Book
+from src.services import author_service, book_service
+
+
+def count_calls(
+    monkeypatch: pytest.MonkeyPatch, module: object, name: str
+) -> list[int]:
+    calls: list[int] = []
+    original = getattr(module, name)
+
+    async def counted(*args: object) -> object:
+        calls.append(1)
+        # Let the other callers arrive while this one is in flight
+        await asyncio.sleep(0.01)
+        return await original(*args)
+
+    monkeypatch.setattr(module, name, counted)
+    return calls
+
+
+async def test_concurrent_book_reads_share_one_query(
+    async_session: AsyncSession,
+    book: Book,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    metrics.reset()
+    calls = count_calls(monkeypatch, book_service, 'get_book_by_id')
+    expected_readers = 10
+
+    books = await asyncio.gather(
+        *(
+            book_service.get_book_by_id_shared(async_session, book.id)
+            for _ in range(expected_readers)
+        )
+    )
+
+    assert len(calls) == 1
+    assert all(shared is books[0] for shared in books)
+    assert books[0] is not None
+    assert books[0].title == book.title
+    assert metrics.get('singleflight_book_by_id_saved') == (
+        expected_readers - 1
+    )
+
+
+async def test_book_lists_share_one_query_per_arguments(
+    async_session: AsyncSession,
+    book: Book,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    calls = count_calls(monkeypatch, book_service, 'get_books_list')
+
+    results = await asyncio.gather(
+        book_service.get_books_list_shared(async_session, 20, 0),
+        book_service.get_books_list_shared(async_session, 20, 0),
+    )
+    filtered = await book_service.get_books_list_shared(
+        async_session, 20, 0, book_year=book.year + 1
+    )
+
+    assert len(calls) == 2  # noqa: PLR2004
+    assert results[0] is results[1]
+    assert results[0][1] == 1
+    assert filtered == ([], 0)
+
+
+async def test_concurrent_author_lists_share_one_query(
+    async_session: AsyncSession,
+    author: Author,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    metrics.reset()
+    calls = count_calls(
+        monkeypatch, author_service, 'get_filtered_authors_list'
+    )
+
+    results = await asyncio.gather(
+        *(
+            author_service.get_filtered_authors_list_shared(
+                async_session, 10, author_name=author.name
+            )
+            for _ in range(3)
+        )
+    )
+
+    assert len(calls) == 1
+    assert results[0][0][0].name == author.name
+    assert metrics.get('singleflight_authors_list_saved') == 2  # noqa: PLR2004
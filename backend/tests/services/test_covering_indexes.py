@@ -0,0 +1,98 @@
+from typing import Any
+
+import pytest
+from sqlalchemy import Select, insert, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from src.models import Author, Book
+from src.services import book_service
+
+
+@pytest.fixture
+async def catalog(async_session: AsyncSession) -> None:
+    if async_session.get_bind().dialect.name != 'postgresql':
+        pytest.skip('Covering indexes are specific to PostgreSQL.')
+
+    async with async_session.begin():
+        await async_session.execute(
+            insert(Author),
+            [{'name': f'author {i}', 'version': 1} for i in range(50)],
+        )
+        await async_session.execute(
+            insert(Book),
+            [
+                {
+                    'title': f'title {i}',
+                    'year': 1900 + i % 100,
+                    'author_id': 1 + i % 50,
+                    'version': 1,
+                }
+                for i in range(2000)
+            ],
+        )
+
+    # Index-only scans skip the heap for pages marked all-visible by VACUUM
+    engine = async_session.bind
+    assert isinstance(engine, AsyncEngine)
+    async with engine.connect() as connection:
+        autocommit = await connection.execution_options(
+            isolation_level='AUTOCOMMIT'
+        )
+        await autocommit.execute(text('VACUUM ANALYZE books, authors'))
+
+
+async def explain(async_session: AsyncSession, query: Select[Any]) -> str:
+    statement = query.compile(
+        async_session.get_bind(), compile_kwargs={'literal_binds': True}
+    )
+    async with async_session.begin():
+        plan = await async_session.scalars(text(f'EXPLAIN {statement}'))
+
+        return '\n'.join(plan)
+
+
+@pytest.mark.usefixtures('catalog')
+@pytest.mark.parametrize('book_title', [None, 'title 1'])
+async def test_year_page_is_read_from_covering_index(
+    async_session: AsyncSession, book_title: str | None
+) -> None:
+    query, count_query = book_service.book_rows_queries(
+        20, 0, book_title, 1950
+    )
+
+    plan = await explain(async_session, query)
+    count_plan = await explain(async_session, count_query)
+
+    assert 'Index Only Scan using ix_books_year_id_covering on books' in plan
+    assert 'Index Only Scan using ix_books_year_id_covering' in count_plan
+
+
+@pytest.mark.usefixtures('catalog')
+async def test_author_names_are_joined_from_covering_index(
+    async_session: AsyncSession,
+) -> None:
+    query, _ = book_service.book_rows_queries(20, 40)
+
+    plan = await explain(async_session, query)
+
+    assert 'Index Only Scan using ix_authors_id_covering on authors' in plan
+
+
+@pytest.mark.usefixtures('catalog')
+async def test_book_rows_list_returns_listed_columns(
+    async_session: AsyncSession,
+) -> None:
+    expected_results = 20
+
+    rows, total_count = await book_service.get_book_rows_list(
+        async_session, 5, 0, book_year=1950
+    )
+
+    assert total_count == expected_results
+    assert rows[0]._asdict() == {
+        'id': 51,
+        'title': 'title 50',
+        'year': 1950,
+        'author': 'author 0',
+        'author_id': rows[0].author_id,
+    }
@@ -0,0 +1,215 @@
+import asyncio
+from collections.abc import Callable
+
+import pytest
+from freezegun import freeze_time
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.api.dependencies import get_login_throttle
+from src.core.metrics import metrics
+from src.core.settings import settings
+from src.services.login_throttle import (
+    DatabaseThrottleBackend,
+    LoginThrottle,
+    MemoryThrottleBackend,
+    ThrottleBackend,
+)
+
+EMAIL = 'user@test.com'
+IP = '10.0.0.1'
+
+BackendFactory = Callable[[AsyncSession], ThrottleBackend]
+
+
+@pytest.fixture(
+    params=[
+        lambda _: MemoryThrottleBackend(),
+        DatabaseThrottleBackend,
+    ],
+    ids=['memory', 'database'],
+)
+def throttle(
+    request: pytest.FixtureRequest, async_session: AsyncSession
+) -> LoginThrottle:
+    backend_factory: BackendFactory = request.param
+
+    return LoginThrottle(backend_factory(async_session))
+
+
+async def fail(throttle: LoginThrottle, times: int, ip: str = IP) -> None:
+    for _ in range(times):
+        await throttle.record_failure(EMAIL, ip)
+
+
+async def test_throttle_with_exponential_backoff(
+    throttle: LoginThrottle,
+) -> None:
+    max_failures = settings.LOGIN_THROTTLE_MAX_FAILURES_PER_ACCOUNT
+
+    with freeze_time('2024-01-01 12:00:00') as frozen_time:
+        await fail(throttle, max_failures - 1)
+        assert not await throttle.retry_after(EMAIL, IP)
+
+        await fail(throttle, 1)
+        assert await throttle.retry_after(EMAIL, IP) == 1
+
+        frozen_time.tick(1)
+        assert not await throttle.retry_after(EMAIL, IP)
+
+        # Each new failure doubles the delay
+        await fail(throttle, 1)
+        assert await throttle.retry_after(EMAIL, IP) == 2  # noqa: PLR2004
+        await fail(throttle, 1)
+        assert await throttle.retry_after(EMAIL, IP) == 4  # noqa: PLR2004
+
+
+async def test_throttle_delay_is_capped(
+    throttle: LoginThrottle, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    max_delay = 3
+    monkeypatch.setattr(
+        settings, 'LOGIN_THROTTLE_MAX_DELAY_SECONDS', max_delay
+    )
+
+    with freeze_time('2024-01-01 12:00:00'):
+        await fail(throttle, 10)
+
+        assert await throttle.retry_after(EMAIL, IP) == max_delay
+
+
+@pytest.mark.anyio
+async def test_throttle_delay_of_many_failures_does_not_overflow(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    throttle = LoginThrottle(MemoryThrottleBackend())
+
+    # As the database backend, which keeps all the failures of the window
+    async def get_failures(key: str, since: float) -> tuple[int, float]:
+        return 5000, since + settings.LOGIN_THROTTLE_WINDOW_SECONDS
+
+    monkeypatch.setattr(throttle.backend, 'get_failures', get_failures)
+
+    assert (
+        await throttle.retry_after(EMAIL, IP)
+        == settings.LOGIN_THROTTLE_MAX_DELAY_SECONDS
+    )
+
+
+async def test_throttle_failures_leave_the_window(
+    throttle: LoginThrottle,
+) -> None:
+    with freeze_time('2024-01-01 12:00:00') as frozen_time:
+        await fail(throttle, settings.LOGIN_THROTTLE_MAX_FAILURES_PER_ACCOUNT)
+
+        frozen_time.tick(settings.LOGIN_THROTTLE_WINDOW_SECONDS + 1)
+        await fail(throttle, 1)
+
+        assert not await throttle.retry_after(EMAIL, IP)
+
+
+async def test_throttle_reset_keeps_ip_failures(
+    throttle: LoginThrottle,
+) -> None:
+    max_failures = settings.LOGIN_THROTTLE_MAX_FAILURES_PER_IP
+
+    with freeze_time('2024-01-01 12:00:00'):
+        await fail(throttle, max_failures)
+        await throttle.reset(EMAIL)
+
+        assert await throttle.retry_after(EMAIL, IP)
+        assert await throttle.retry_after('other@test.com', IP)
+        assert not await throttle.retry_after(EMAIL, '10.0.0.2')
+
+
+async def test_throttle_account_across_ips(throttle: LoginThrottle) -> None:
+    with freeze_time('2024-01-01 12:00:00'):
+        for i in range(settings.LOGIN_THROTTLE_MAX_FAILURES_PER_ACCOUNT):
+            await fail(throttle, 1, ip=f'10.0.0.{i}')
+
+        assert await throttle.retry_after(EMAIL, '10.0.1.1')
+        assert await throttle.retry_after(EMAIL.upper(), None)
+
+
+async def test_throttle_counts_avoided_verifications(
+    throttle: LoginThrottle,
+) -> None:
+    metrics.reset()
+
+    with freeze_time('2024-01-01 12:00:00'):
+        await fail(throttle, settings.LOGIN_THROTTLE_MAX_FAILURES_PER_ACCOUNT)
+        for _ in range(3):
+            await throttle.retry_after(EMAIL, IP)
+
+    assert metrics.get('password_verifications_avoided') == 3  # noqa: PLR2004
+
+
+@pytest.mark.parametrize('backend_name', ['memory', 'database'])
+async def test_concurrent_attempts_are_throttled(
+    async_session: AsyncSession, backend_name: str
+) -> None:
+    memory_backend = MemoryThrottleBackend()
+    session_factory = async_sessionmaker(
+        bind=async_session.bind, expire_on_commit=False
+    )
+    verified = 0
+
+    async def login() -> None:
+        nonlocal verified
+        async with session_factory() as session:
+            throttle = LoginThrottle(
+                memory_backend
+                if backend_name == 'memory'
+                else DatabaseThrottleBackend(session)
+            )
+            attempt = await throttle.acquire(EMAIL, IP)
+            if attempt.retry_after:
+                return
+
+        # While the password is verified, the other attempts go on
+        await asyncio.sleep(0.01)
+        verified += 1
+
+    await asyncio.gather(*(login() for _ in range(20)))
+
+    assert verified == settings.LOGIN_THROTTLE_MAX_FAILURES_PER_ACCOUNT
+
+
+async def test_throttle_release_successful_attempt(
+    throttle: LoginThrottle,
+) -> None:
+    with freeze_time('2024-01-01 12:00:00'):
+        await fail(throttle, 1)
+        attempt = await throttle.acquire(EMAIL, IP)
+        await throttle.release(attempt)
+
+        assert await throttle.backend.get_failures(f'ip:{IP}', 0) == (
+            1,
+            attempt.reserved_at,
+        )
+
+
+@pytest.mark.anyio
+async def test_memory_backend_forgets_stale_keys() -> None:
+    backend = MemoryThrottleBackend(sweep_every=2)
+    window = settings.LOGIN_THROTTLE_WINDOW_SECONDS
+
+    await backend.record_failure(['stale'], now=0)
+    await backend.record_failure(['recent'], now=window + 1)
+
+    assert len(backend) == 1
+    assert await backend.get_failures('recent', since=0) == (1, window + 1)
+    assert await backend.get_failures('stale', since=0) == (0, None)
+
+
+def test_login_throttle_backend_setting(
+    async_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    assert isinstance(
+        get_login_throttle(async_session).backend, MemoryThrottleBackend
+    )
+
+    monkeypatch.setattr(settings, 'LOGIN_THROTTLE_BACKEND', 'database')
+
+    assert isinstance(
+        get_login_throttle(async_session).backend, DatabaseThrottleBackend
+    )
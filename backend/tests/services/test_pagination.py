@@ -0,0 +1,102 @@
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.settings import settings
+from src.models import Author, Book
+from src.services import author_service, book_service
+from src.services.pagination import (
+    CountStrategy,
+    fetch_page,
+    resolve_count_strategy,
+)
+from tests.conftest import AuthorFactory, BookFactory
+
+
+@pytest.mark.parametrize('strategy', list(CountStrategy))
+async def test_fetch_page_returns_page_and_total_count(
+    async_session: AsyncSession, author: Author, strategy: CountStrategy
+) -> None:
+    expected_books = 5
+    expected_results = 12
+    year = 2000
+    async with async_session.begin():
+        async_session.add_all(BookFactory.create_batch(12, year=year))
+        async_session.add_all(BookFactory.create_batch(3, year=2024))
+
+    filter_condition = Book.year == year
+    async with async_session:
+        books, total_count = await fetch_page(
+            async_session,
+            select(Book).where(filter_condition).limit(5).offset(5),
+            select(func.count(Book.id)).where(filter_condition),
+            strategy=strategy,
+        )
+
+    assert len(books) == expected_books
+    assert all(isinstance(book, Book) for book in books)
+    assert total_count == expected_results
+
+
+@pytest.mark.parametrize('strategy', list(CountStrategy))
+async def test_fetch_page_offset_past_last_row(
+    async_session: AsyncSession, strategy: CountStrategy
+) -> None:
+    expected_results = 3
+    async with async_session.begin():
+        async_session.add_all(AuthorFactory.create_batch(3))
+
+    async with async_session:
+        authors, total_count = await fetch_page(
+            async_session,
+            select(Author).limit(5).offset(10),
+            select(func.count(Author.id)),
+            strategy=strategy,
+        )
+
+    assert authors == []
+    assert total_count == expected_results
+
+
+async def test_resolve_count_strategy_uses_dialect_setting(
+    async_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    dialect_name = async_session.get_bind().dialect.name
+
+    monkeypatch.setattr(
+        settings, 'LIST_COUNT_STRATEGIES', {dialect_name: 'concurrent'}
+    )
+    assert resolve_count_strategy(async_session) is CountStrategy.CONCURRENT
+
+    monkeypatch.setattr(settings, 'LIST_COUNT_STRATEGIES', {})
+    assert resolve_count_strategy(async_session) is CountStrategy.SEQUENTIAL
+
+
+@pytest.mark.parametrize('strategy', list(CountStrategy))
+async def test_list_services_are_consistent_across_strategies(
+    async_session: AsyncSession,
+    author: Author,
+    monkeypatch: pytest.MonkeyPatch,
+    strategy: CountStrategy,
+) -> None:
+    expected_books = 2
+    expected_results = 10
+    dialect_name = async_session.get_bind().dialect.name
+    monkeypatch.setattr(
+        settings, 'LIST_COUNT_STRATEGIES', {dialect_name: strategy.value}
+    )
+    async with async_session.begin():
+        async_session.add_all(BookFactory.create_batch(10))
+
+    books, total_books = await book_service.get_books_list(
+        async_session, limit=4, offset=8, book_title='book'
+    )
+    authors, total_authors = await author_service.get_filtered_authors_list(
+        async_session, limit=None, author_name=author.name
+    )
+
+    assert len(books) == expected_books
+    assert total_books == expected_results
+    assert all(book.author.name == author.name for book in books)
+    assert [a.id for a in authors] == [author.id]
+    assert total_authors == 1
@@ -0,0 +1,240 @@
+import asyncio
+import logging
+from contextlib import suppress
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.core.invalidation import Invalidation, bus
+from src.core.metrics import metrics
+from src.models import RevokedToken
+from src.services import revocation_service
+from src.services.revocation_service import RevocationList
+from tests.conftest import MockedUser
+
+
+@pytest.fixture
+def revocation_list(monkeypatch: pytest.MonkeyPatch) -> RevocationList:
+    revocation_list = RevocationList()
+    monkeypatch.setattr(revocation_service, 'revocation_list', revocation_list)
+
+    return revocation_list
+
+
+def expired_revocation(jti: str) -> RevokedToken:
+    now = datetime.now(tz=ZoneInfo('UTC'))
+
+    return RevokedToken(
+        jti=jti,
+        revoked_at=now - timedelta(days=2),
+        expires_at=now - timedelta(days=1),
+    )
+
+
+async def test_unrevoked_token_is_not_looked_up(
+    async_session: AsyncSession, revocation_list: RevocationList
+) -> None:
+    metrics.reset()
+    payload = {'sub': 'test@test.com', 'jti': 'abc', 'uid': 1, 'iat': 0}
+
+    # A closed session would fail if the database was queried
+    await async_session.close()
+
+    assert not await revocation_service.is_token_revoked(
+        async_session, payload
+    )
+    assert not metrics.get('revocation_filter_hits')
+
+
+async def test_revoke_token(
+    async_session: AsyncSession, revocation_list: RevocationList
+) -> None:
+    await revocation_service.revoke_token(async_session, 'abc')
+
+    assert 'abc' in revocation_list
+    assert await revocation_service.is_token_revoked(
+        async_session, {'jti': 'abc'}
+    )
+    assert not await revocation_service.is_token_revoked(
+        async_session, {'jti': 'other'}
+    )
+
+
+async def test_revoke_user_tokens_only_affects_older_tokens(
+    async_session: AsyncSession,
+    revocation_list: RevocationList,
+    user: MockedUser,
+) -> None:
+    issued_at = datetime.now(tz=ZoneInfo('UTC')).timestamp() - 60
+    await revocation_service.revoke_user_tokens(async_session, user.id)
+
+    assert await revocation_service.is_token_revoked(
+        async_session, {'jti': 'abc', 'uid': user.id, 'iat': issued_at}
+    )
+    assert not await revocation_service.is_token_revoked(
+        async_session, {'jti': 'abc', 'uid': user.id, 'iat': issued_at + 120}
+    )
+
+
+async def test_revoke_user_tokens_splits_the_second_of_the_revocation(
+    async_session: AsyncSession,
+    revocation_list: RevocationList,
+    user: MockedUser,
+) -> None:
+    await revocation_service.revoke_user_tokens(async_session, user.id)
+    async with async_session:
+        revoked_at = await async_session.scalar(
+            select(RevokedToken.revoked_at).where(
+                RevokedToken.user_id == user.id
+            )
+        )
+    assert revoked_at is not None
+    # Naive on SQLite
+    revoked = revoked_at.replace(tzinfo=ZoneInfo('UTC')).timestamp()
+
+    # Issued earlier in the same second, with and without its fraction
+    for issued_at in (revoked - 0.000001, int(revoked), revoked):
+        assert await revocation_service.is_token_revoked(
+            async_session, {'jti': 'abc', 'uid': user.id, 'iat': issued_at}
+        )
+    # Issued right after the revocation, e.g. on a new login
+    assert not await revocation_service.is_token_revoked(
+        async_session,
+        {'jti': 'abc', 'uid': user.id, 'iat': revoked + 0.000001},
+    )
+
+
+async def test_false_positive_is_counted(
+    async_session: AsyncSession, revocation_list: RevocationList
+) -> None:
+    metrics.reset()
+    # Only in the filter, as if its database entry had been purged
+    revocation_list.add('abc')
+
+    assert not await revocation_service.is_token_revoked(
+        async_session, {'jti': 'abc'}
+    )
+    assert metrics.get('revocation_filter_hits') == 1
+    assert metrics.get('revocation_filter_false_positives') == 1
+
+
+async def test_rebuild_loads_unexpired_revocations(
+    async_session: AsyncSession,
+    revocation_list: RevocationList,
+    user: MockedUser,
+) -> None:
+    await revocation_service.revoke_token(async_session, 'abc')
+    await revocation_service.revoke_user_tokens(async_session, user.id)
+    async with async_session.begin():
+        async_session.add(expired_revocation('expired'))
+
+    new_list = RevocationList()
+    await new_list.rebuild(async_session)
+
+    assert 'abc' in new_list
+    assert user.id in new_list
+    assert 'expired' not in new_list
+
+
+async def test_rebuild_keeps_keys_added_meanwhile(
+    async_session: AsyncSession, revocation_list: RevocationList
+) -> None:
+    original_execute = async_session.execute
+
+    async def execute_and_revoke(*args: object, **kwargs: object) -> object:
+        result = await original_execute(*args, **kwargs)  # type: ignore[call-overload]
+        revocation_list.add('added-during-rebuild')
+        return result
+
+    async_session.execute = execute_and_revoke  # type: ignore[assignment]
+    await revocation_list.rebuild(async_session)
+
+    assert 'added-during-rebuild' in revocation_list
+
+
+async def test_purge_expired_revocations(
+    async_session: AsyncSession, revocation_list: RevocationList
+) -> None:
+    await revocation_service.revoke_token(async_session, 'abc')
+    async with async_session.begin():
+        async_session.add(expired_revocation('expired'))
+
+    purged = await revocation_service.purge_expired_revocations(async_session)
+
+    async with async_session.begin():
+        remaining = await async_session.scalars(select(RevokedToken.jti))
+
+        assert remaining.all() == ['abc']
+    assert purged == 1
+
+
+async def test_revocation_maintenance(
+    async_session: AsyncSession,
+    revocation_list: RevocationList,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    caplog.set_level(logging.INFO, logger=revocation_service.logger.name)
+    async with async_session.begin():
+        async_session.add(expired_revocation('expired'))
+    revocation_list.add('expired')
+    session_factory = async_sessionmaker(
+        bind=async_session.bind, expire_on_commit=False
+    )
+
+    task = asyncio.create_task(
+        revocation_service.run_revocation_maintenance(session_factory, 0)
+    )
+    while not caplog.records:
+        await asyncio.sleep(0.01)
+    task.cancel()
+    with suppress(asyncio.CancelledError):
+        await task
+
+    async with async_session.begin():
+        remaining = await async_session.scalars(select(RevokedToken))
+
+        assert not remaining.all()
+    assert 'expired' not in revocation_list
+    assert caplog.records[0].message == (
+        'Purged 1 expired revocations, 0 remaining'
+    )
+
+
+@pytest.mark.anyio
+async def test_revocation_maintenance_survives_errors(
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    def failing_session_factory() -> AsyncSession:
+        raise RuntimeError
+
+    task = asyncio.create_task(
+        revocation_service.run_revocation_maintenance(
+            failing_session_factory,  # type: ignore[arg-type]
+            0,
+        )
+    )
+    while not caplog.records:
+        await asyncio.sleep(0.01)
+
+    assert caplog.records[0].message == 'Revocation maintenance failed'
+    assert not task.done()
+
+    task.cancel()
+    with suppress(asyncio.CancelledError):
+        await task
+
+
+def test_revocations_of_other_workers_are_added(
+    revocation_list: RevocationList,
+) -> None:
+    bus.receive(
+        Invalidation(
+            'revocation', 'created', ['abc', 42], origin='other'
+        ).encode()
+    )
+
+    assert 'abc' in revocation_list
+    assert 42 in revocation_list  # noqa: PLR2004
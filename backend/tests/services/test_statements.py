@@ -0,0 +1,46 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.metrics import metrics
+from src.models import Book
+from src.services import author_service, book_service, user_service
+from tests.conftest import MockedUser
+
+
+async def test_repeated_lookups_are_served_from_compiled_cache(
+    async_session: AsyncSession, book: Book
+) -> None:
+    # First call may compile the statements for this engine
+    await book_service.get_book_by_id(async_session, book.id)
+
+    metrics.reset()
+    for _ in range(3):
+        book_db = await book_service.get_book_by_id(async_session, book.id)
+        assert book_db
+        assert book_db.author.name
+
+    assert metrics.get('sql_compiled_cache_misses') == 0
+    assert metrics.get('sql_compiled_cache_hits') > 0
+
+
+async def test_prebuilt_statements_bind_new_values(
+    async_session: AsyncSession, book: Book, user: MockedUser
+) -> None:
+    missing_book = await book_service.get_book_by_title(async_session, 'x')
+    assert missing_book is None
+    book_db = await book_service.get_book_by_title(async_session, book.title)
+    assert book_db
+    assert book_db.id == book.id
+
+    assert await book_service.get_books_ids_list(
+        async_session, [book.id, 999]
+    ) == [book.id]
+    assert await author_service.get_authors_ids_list(
+        async_session, [book.author_id, 999]
+    ) == [book.author_id]
+
+    user_db = await user_service.get_user(
+        async_session, username=user.username
+    )
+    assert user_db
+    assert user_db.id == user.id
+    assert await user_service.get_user(async_session) is None
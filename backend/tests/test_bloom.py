@@ -0,0 +1,30 @@
+from src.core.bloom import BloomFilter
+
+
+def test_bloom_filter_has_no_false_negatives() -> None:
+    bloom = BloomFilter(capacity=1000)
+    keys = [f'key-{i}' for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+
+    assert all(key in bloom for key in keys)
+    assert len(bloom) == len(keys)
+
+
+def test_bloom_filter_false_positive_rate() -> None:
+    error_rate = 0.01
+    bloom = BloomFilter(capacity=1000, error_rate=error_rate)
+    for i in range(1000):
+        bloom.add(i)
+
+    false_positives = sum(i in bloom for i in range(1000, 11000))
+
+    # Small integers hash to themselves, so this also checks they are mixed
+    assert false_positives / 10000 < error_rate * 2
+
+
+def test_empty_bloom_filter() -> None:
+    bloom = BloomFilter(capacity=0)
+
+    assert 'key' not in bloom
+    assert not len(bloom)
@@ -0,0 +1,258 @@
+from collections.abc import AsyncGenerator
+from datetime import date
+from typing import Any, Callable
+
+import pytest
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import Connection, inspect, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from src.migrations.helpers import (
+    create_index_concurrently,
+    drop_index_concurrently,
+)
+from src.migrations.partitions import (
+    create_partitions,
+    get_partitions,
+    is_layout_object,
+    is_partitioned,
+    partition_books,
+    partition_name,
+    partition_start,
+    unpartition_books,
+    upcoming_years,
+)
+from src.models import Author, Book
+from src.schemas.books import BookUpdate
+from src.services import book_service
+
+
+async def run_on_connection(
+    async_session: AsyncSession, fn: Callable[..., Any], *args: Any
+) -> Any:
+    engine = async_session.bind
+    assert isinstance(engine, AsyncEngine)
+    async with engine.begin() as connection:
+        return await connection.run_sync(fn, *args)
+
+
+async def run_operation(
+    async_session: AsyncSession, operation: Callable[[], None]
+) -> None:
+    def run(connection: Connection) -> None:
+        with Operations.context(MigrationContext.configure(connection)):
+            operation()
+
+    engine = async_session.bind
+    assert isinstance(engine, AsyncEngine)
+    # Outside of a transaction, for the autocommit blocks of the helpers
+    async with engine.connect() as connection:
+        await connection.run_sync(run)
+
+
+async def partition_of(async_session: AsyncSession, book_id: int) -> str:
+    async with async_session:
+        partition: str = await async_session.scalar(
+            text('SELECT tableoid::regclass::text FROM books WHERE id = :id'),
+            {'id': book_id},
+        )
+
+    return partition
+
+
+async def add_book(
+    async_session: AsyncSession, title: str, year: int, author_id: int = 1
+) -> Book:
+    book = Book(title=title, year=year, author_id=author_id)
+    async with async_session.begin():
+        async_session.add(book)
+
+    return book
+
+
+def test_partition_bounds() -> None:
+    current_year = date.today().year
+
+    assert partition_start(1999, 10) == 1990  # noqa: PLR2004
+    assert partition_name(partition_start(-5, 10)) == 'books_y_10'
+    assert upcoming_years(10, 2) == [
+        current_year,
+        current_year + 10,
+        current_year + 20,
+    ]
+
+
+@pytest.mark.parametrize(
+    ('type_', 'name', 'table_name', 'expected'),
+    [
+        ('table', 'book_titles', 'book_titles', True),
+        ('table', 'books_y1990', 'books_y1990', True),
+        ('index', 'books_default_title_idx', 'books_default', True),
+        ('index', 'ix_books_title', 'books', True),
+        ('unique_constraint', None, 'books', True),
+        ('table', 'books', 'books', False),
+        ('index', 'ix_books_version', 'books', False),
+        ('unique_constraint', None, 'authors', False),
+    ],
+)
+def test_is_layout_object(
+    type_: str, name: str | None, table_name: str, expected: bool
+) -> None:
+    assert is_layout_object(type_, name, table_name) is expected
+
+
+@pytest.fixture
+async def partitioned(
+    async_session: AsyncSession, author: Author
+) -> AsyncGenerator[None, None]:
+    if async_session.get_bind().dialect.name != 'postgresql':
+        pytest.skip('Partitioning is specific to PostgreSQL.')
+
+    await add_book(async_session, 'old', 1995)
+    await add_book(async_session, 'older', 1701)
+    await run_on_connection(async_session, partition_books, 10, [2031])
+
+    yield
+
+    def restore(connection: Connection) -> None:
+        if is_partitioned(connection):
+            unpartition_books(connection)
+
+    await run_on_connection(async_session, restore)
+
+
+@pytest.mark.usefixtures('partitioned')
+async def test_partition_books_keeps_rows(async_session: AsyncSession) -> None:
+    assert await run_on_connection(async_session, get_partitions) == [
+        'books_default',
+        'books_y1700',
+        'books_y1990',
+        'books_y2030',
+    ]
+
+    books, _ = await book_service.get_books_list(async_session, 10, 0)
+    assert sorted(book.title for book in books) == ['old', 'older']
+    assert await partition_of(async_session, books[0].id) != 'books_default'
+
+    new_book = await add_book(async_session, 'new', 1850)
+    assert new_book.id == 3  # noqa: PLR2004
+    assert await partition_of(async_session, new_book.id) == 'books_default'
+
+
+@pytest.mark.usefixtures('partitioned')
+async def test_titles_stay_unique_across_partitions(
+    async_session: AsyncSession,
+) -> None:
+    with pytest.raises(IntegrityError, match='book_titles_pkey'):
+        await add_book(async_session, 'old', 2031)
+
+    book = await book_service.get_book_by_title(async_session, 'old')
+    assert book is not None
+    # Moving a book to another partition keeps its title
+    await book_service.update_book_in_db(
+        async_session, BookUpdate(year=1702), book
+    )
+    assert await partition_of(async_session, book.id) == 'books_y1700'
+    with pytest.raises(IntegrityError, match='book_titles_pkey'):
+        await add_book(async_session, 'old', 2031)
+
+    async with async_session.begin():
+        await async_session.execute(
+            text("UPDATE books SET title = 'renamed' WHERE title = 'old'")
+        )
+
+    # The old title is free again, the new one is taken
+    await add_book(async_session, 'old', 1999)
+    with pytest.raises(IntegrityError, match='book_titles_pkey'):
+        await add_book(async_session, 'renamed', 2031)
+
+    async with async_session.begin():
+        await async_session.execute(text('DELETE FROM authors'))
+        titles = await async_session.scalar(
+            text('SELECT count(*) FROM book_titles')
+        )
+    assert titles == 0
+
+
+@pytest.mark.usefixtures('partitioned')
+async def test_year_filter_scans_one_partition(
+    async_session: AsyncSession,
+) -> None:
+    async with async_session:
+        plan = '\n'.join(
+            await async_session.scalars(
+                text('EXPLAIN SELECT * FROM books WHERE year = :year'),
+                {'year': 1995},
+            )
+        )
+
+    assert 'books_y1990' in plan
+    assert 'books_y1700' not in plan
+    assert 'books_default' not in plan
+
+
+@pytest.mark.usefixtures('partitioned')
+async def test_create_partitions_moves_rows_out_of_default(
+    async_session: AsyncSession,
+) -> None:
+    book = await add_book(async_session, 'new', 1850)
+
+    created = await run_on_connection(
+        async_session, create_partitions, [1855, 1995], 10
+    )
+
+    assert created == ['books_y1850']
+    assert await partition_of(async_session, book.id) == 'books_y1850'
+    with pytest.raises(IntegrityError, match='book_titles_pkey'):
+        await add_book(async_session, 'new', 1701)
+    assert not await run_on_connection(
+        async_session, create_partitions, [1851], 10
+    )
+
+
+@pytest.mark.usefixtures('partitioned')
+async def test_unpartition_books(async_session: AsyncSession) -> None:
+    await run_on_connection(async_session, unpartition_books)
+
+    def unique_constraints(connection: Connection) -> list[str | None]:
+        return [
+            constraint['name']
+            for constraint in inspect(connection).get_unique_constraints(
+                'books'
+            )
+        ]
+
+    assert not await run_on_connection(async_session, is_partitioned)
+    assert await run_on_connection(async_session, unique_constraints) == [
+        'books_title_key'
+    ]
+    books, _ = await book_service.get_books_list(async_session, 10, 0)
+    assert len(books) == 2  # noqa: PLR2004
+    with pytest.raises(IntegrityError, match='books_title_key'):
+        await add_book(async_session, 'old', 1995)
+
+
+@pytest.mark.usefixtures('partitioned')
+async def test_index_helpers_on_partitioned_books(
+    async_session: AsyncSession,
+) -> None:
+    index_name = 'ix_books_year_test'
+
+    def indexes(connection: Connection) -> list[str | None]:
+        return [
+            index['name'] for index in inspect(connection).get_indexes('books')
+        ]
+
+    # Partitioned indexes cannot be built concurrently
+    await run_operation(
+        async_session,
+        lambda: create_index_concurrently(index_name, 'books', ['year']),
+    )
+    assert index_name in await run_on_connection(async_session, indexes)
+
+    await run_operation(
+        async_session, lambda: drop_index_concurrently(index_name, 'books')
+    )
+    assert index_name not in await run_on_connection(async_session, indexes)
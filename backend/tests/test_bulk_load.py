@@ -0,0 +1,144 @@
+import io
+import json
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from src.models import Author, Book
+from src.services import book_service
+from src.utils.bulk_load import (
+    LoadResult,
+    load,
+    parse_records,
+    read_records,
+)
+
+CSV_FILE = """title,year,author
+ The  Hobbit ,1937,J. R. R. Tolkien
+dune,1965,frank herbert
+dune,1966,Frank  Herbert
+no year,,someone
+bad year,soon,someone
+future,3000,someone
+"""
+
+
+async def bulk_load(
+    async_session: AsyncSession,
+    raw_records: Any,
+    batch_size: int = 2,
+) -> LoadResult:
+    engine = async_session.bind
+    assert isinstance(engine, AsyncEngine)
+    async with engine.begin() as connection:
+        return await load(connection, raw_records, batch_size)
+
+
+async def titles_by_author(async_session: AsyncSession) -> dict[str, Any]:
+    async with async_session:
+        rows = await async_session.execute(
+            select(Book.title, Book.year, Author.name)
+            .join(Author)
+            .order_by(Book.title)
+        )
+
+    return {title: (year, name) for title, year, name in rows}
+
+
+def test_read_records() -> None:
+    ndjson_file = io.StringIO(
+        json.dumps({'title': 'dune', 'year': 1965, 'author': 'herbert'})
+        + '\n\n'
+    )
+
+    assert list(read_records(ndjson_file, 'ndjson')) == [
+        {'title': 'dune', 'year': 1965, 'author': 'herbert'}
+    ]
+    assert next(read_records(io.StringIO(CSV_FILE), 'csv')) == {
+        'title': ' The  Hobbit ',
+        'year': '1937',
+        'author': 'J. R. R. Tolkien',
+    }
+
+
+def test_parse_records_with_the_rules_of_the_api() -> None:
+    result = LoadResult()
+
+    records = list(
+        parse_records(
+            [
+                {'title': ' Dune ', 'year': 2024, 'author': 'Frank  Herbert'},
+                {'title': 'dune', 'year': 2025, 'author': 'frank herbert'},
+                {'title': 'dune', 'year': 1965, 'author': 7},
+                {'title': 'dune', 'year': 1965},
+            ],
+            result,
+        )
+    )
+
+    assert records == [(0, 'dune', 2024, 'frank herbert')]
+    assert result.rejected == 3  # noqa: PLR2004
+
+
+async def test_bulk_load_csv(async_session: AsyncSession) -> None:
+    result = await bulk_load(
+        async_session, read_records(io.StringIO(CSV_FILE), 'csv')
+    )
+
+    assert result.records == 3  # noqa: PLR2004
+    assert result.rejected == 3  # noqa: PLR2004
+    assert result.authors_created == 2  # noqa: PLR2004
+    assert result.books_created == 2  # noqa: PLR2004
+    assert result.books_updated == 0
+    assert result.rows_per_second > 0
+    # The last record of a title wins
+    assert await titles_by_author(async_session) == {
+        'dune': (1966, 'frank herbert'),
+        'the hobbit': (1937, 'j. r. r. tolkien'),
+    }
+
+
+async def test_bulk_load_merges_into_catalogue(
+    async_session: AsyncSession, author: Author
+) -> None:
+    async with async_session.begin():
+        async_session.add_all([
+            Book(title='kept', year=1900, author_id=author.id),
+            Book(title='moved', year=1900, author_id=author.id),
+        ])
+    changes = await book_service.get_book_changes(async_session, '0', 10)
+
+    result = await bulk_load(
+        async_session,
+        [
+            {'title': 'kept', 'year': 1900, 'author': author.name},
+            {'title': 'moved', 'year': 1950, 'author': 'newcomer'},
+            {'title': 'new', 'year': '2001', 'author': author.name},
+            {'title': 'untitled', 'year': 2001},
+            {'title': None, 'year': 2001, 'author': author.name},
+        ],
+    )
+
+    assert result == LoadResult(
+        records=3,
+        rejected=2,
+        authors_created=1,
+        books_created=1,
+        books_updated=1,
+        seconds=result.seconds,
+    )
+    assert await titles_by_author(async_session) == {
+        'kept': (1900, author.name),
+        'moved': (1950, 'newcomer'),
+        'new': (2001, author.name),
+    }
+    # The whole load is a single new catalogue version
+    new_changes = await book_service.get_book_changes(
+        async_session, changes.since, 10
+    )
+    assert sorted(book.title for book in new_changes.changed) == [
+        'moved',
+        'new',
+    ]
+    assert new_changes.version == changes.version + 1
@@ -0,0 +1,52 @@
+from pathlib import Path
+
+from src.utils.calibrate_argon2 import (
+    MIN_MEMORY_KIB,
+    calibrate,
+    write_env_file,
+)
+
+
+def fake_measure(time_cost: int, memory_cost: int) -> float:
+    # 10 ms per pass for each 16 MiB
+    return 10 * time_cost * memory_cost / (16 * 1024)
+
+
+def test_calibrate_prefers_memory_then_passes() -> None:
+    time_cost, memory_cost = calibrate(
+        target_ms=100, max_memory_kib=256 * 1024, measure=fake_measure
+    )
+
+    assert memory_cost == 128 * 1024
+    assert time_cost == 1
+
+    target_ms = 100
+    time_cost, memory_cost = calibrate(
+        target_ms=target_ms, max_memory_kib=32 * 1024, measure=fake_measure
+    )
+
+    assert memory_cost == 32 * 1024
+    assert fake_measure(time_cost, memory_cost) <= target_ms
+    assert fake_measure(time_cost + 1, memory_cost) > target_ms
+
+
+def test_calibrate_does_not_go_below_minimum_memory() -> None:
+    time_cost, memory_cost = calibrate(
+        target_ms=1, max_memory_kib=256 * 1024, measure=fake_measure
+    )
+
+    assert memory_cost == MIN_MEMORY_KIB
+    assert time_cost == 1
+
+
+def test_write_env_file(tmp_path: Path) -> None:
+    env_file = tmp_path / '.env'
+    env_file.write_text('SECRET_KEY=abc\nARGON2_TIME_COST=3\n')
+
+    write_env_file(env_file, {'ARGON2_TIME_COST': 2, 'ARGON2_MEMORY_COST': 8})
+
+    assert env_file.read_text().splitlines() == [
+        'SECRET_KEY=abc',
+        'ARGON2_TIME_COST=2',
+        'ARGON2_MEMORY_COST=8',
+    ]
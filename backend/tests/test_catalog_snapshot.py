@@ -0,0 +1,130 @@
+from pathlib import Path
+from typing import Generator
+
+import pytest
+
+from src.core.catalog_snapshot import (
+    AuthorRecord,
+    BookRecord,
+    CatalogSnapshot,
+    write_snapshot,
+)
+
+AUTHORS = [AuthorRecord(2, 'jane austen'), AuthorRecord(7, 'josé saramago')]
+BOOKS = [
+    BookRecord(1, 'emma', 1815, 'jane austen', 2),
+    BookRecord(3, 'ensaio sobre a cegueira', 1995, 'josé saramago', 7),
+    BookRecord(4, 'persuasion', 1817, 'jane austen', 2),
+    BookRecord(9, 'a caverna', 2000, 'josé saramago', 7),
+    BookRecord(12, 'lady susan', 1871, 'jane austen', 2),
+]
+
+
+@pytest.fixture
+def snapshot(tmp_path: Path) -> Generator[CatalogSnapshot, None, None]:
+    path = tmp_path / 'catalog'
+    write_snapshot(
+        path,
+        42,
+        [
+            [book.id for book in BOOKS],
+            [book.title for book in BOOKS],
+            [book.year for book in BOOKS],
+            [book.author_id for book in BOOKS],
+        ],
+        [[author.id for author in AUTHORS], [a.name for a in AUTHORS]],
+    )
+
+    snapshot = CatalogSnapshot(path)
+    yield snapshot
+    snapshot.close()
+
+
+def test_lookups(snapshot: CatalogSnapshot) -> None:
+    assert snapshot.version == 42  # noqa: PLR2004
+    for book in BOOKS:
+        assert snapshot.book(book.id) == book
+        assert snapshot.book_by_title(book.title) == book
+    for author in AUTHORS:
+        assert snapshot.author(author.id) == author
+        assert snapshot.books_by_author(author.id) == [
+            book for book in BOOKS if book.author == author.name
+        ]
+
+    assert snapshot.book(2) is None
+    assert snapshot.book(100) is None
+    assert snapshot.book_by_title('emm') is None
+    assert snapshot.book_by_title('zorba') is None
+    assert snapshot.author(3) is None
+    assert snapshot.books_by_author(3) == []
+
+
+@pytest.mark.parametrize(
+    ('title', 'year'),
+    [
+        (None, None),
+        ('e', None),
+        ('a c', None),
+        (None, 1817),
+        ('s', 1871),
+        ('emma\0', None),
+        ('austen', None),
+    ],
+)
+def test_book_lists(
+    snapshot: CatalogSnapshot, title: str | None, year: int | None
+) -> None:
+    expected = [
+        book
+        for book in BOOKS
+        if (not title or title in book.title)
+        and (not year or book.year == year)
+    ]
+
+    assert snapshot.books(20, 0, title, year) == (expected, len(expected))
+    assert snapshot.books(1, 1, title, year) == (expected[1:2], len(expected))
+
+
+@pytest.mark.parametrize('name', [None, 'jane', 'é', 'emma', 'a'])
+def test_author_lists(snapshot: CatalogSnapshot, name: str | None) -> None:
+    expected = [a for a in AUTHORS if not name or name in a.name]
+
+    assert snapshot.authors(20, 0, name) == (expected, len(expected))
+    assert snapshot.authors(20, 1, name) == (expected[1:], len(expected))
+
+
+def test_empty_snapshot(tmp_path: Path) -> None:
+    path = tmp_path / 'catalog'
+    write_snapshot(path, 1, [[], [], [], []], [[], []])
+    snapshot = CatalogSnapshot(path)
+
+    assert snapshot.books(20, 0) == ([], 0)
+    assert snapshot.books(20, 0, 'a') == ([], 0)
+    assert snapshot.authors(20, 0) == ([], 0)
+    assert snapshot.book_by_title('a') is None
+    snapshot.close()
+
+
+def test_replaced_snapshot(tmp_path: Path, snapshot: CatalogSnapshot) -> None:
+    assert not snapshot.is_replaced()
+
+    write_snapshot(snapshot.path, 43, [[], [], [], []], [[], []])
+
+    assert snapshot.is_replaced()
+    # Still readable until unmapped
+    assert snapshot.book(1) == BOOKS[0]
+    replacement = CatalogSnapshot(snapshot.path)
+    assert replacement.version == 43  # noqa: PLR2004
+    replacement.close()
+    assert list(tmp_path.iterdir()) == [snapshot.path]
+
+    snapshot.path.unlink()
+    assert not snapshot.is_replaced()
+
+
+def test_not_a_snapshot(tmp_path: Path) -> None:
+    path = tmp_path / 'catalog'
+    path.write_bytes(b'\0' * 64)
+
+    with pytest.raises(ValueError, match='not a catalogue snapshot'):
+        CatalogSnapshot(path)
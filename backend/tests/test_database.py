@@ -0,0 +1,71 @@
+from pathlib import Path
+
+import pytest
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from src.core import database
+from src.core.database import MeteredPool, create_pool_engine, pool_status
+from src.core.metrics import metrics
+from src.core.settings import settings
+
+
+@pytest.mark.anyio
+async def test_metered_pool_counts_waits_and_timeouts(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, 'DB_POOL_SIZES', {'read': 1})
+    monkeypatch.setattr(settings, 'DB_POOL_MAX_OVERFLOW', {'read': 0})
+    monkeypatch.setattr(settings, 'DB_POOL_TIMEOUTS', {'read': 0.05})
+    engine = create_pool_engine(
+        'read', url=f'sqlite+aiosqlite:///{tmp_path}/pool.db'
+    )
+    waits = metrics.get('db_pool_read_waits')
+    timeouts = metrics.get('db_pool_read_timeouts')
+
+    async with engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            await engine.connect().start()
+
+    # Free again
+    async with engine.connect():
+        pass
+    await engine.dispose()
+
+    assert type(engine.pool).__name__ == 'ReadMeteredPool'
+    assert metrics.get('db_pool_read_waits') - waits == 1
+    assert metrics.get('db_pool_read_timeouts') - timeouts == 1
+
+
+@pytest.mark.anyio
+async def test_pool_status(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, 'DB_POOL_SIZES', {'write': 1})
+    monkeypatch.setattr(settings, 'DB_POOL_MAX_OVERFLOW', {'write': 3})
+    monkeypatch.setattr(settings, 'DB_POOL_TIMEOUTS', {'write': 2})
+    engine = create_pool_engine(
+        'write', url=f'sqlite+aiosqlite:///{tmp_path}/pool.db'
+    )
+    unmetered = create_async_engine(
+        f'sqlite+aiosqlite:///{tmp_path}/pool.db', poolclass=NullPool
+    )
+    monkeypatch.setattr(
+        database, 'engines', {'write': engine, 'bulk': unmetered}
+    )
+
+    async with engine.connect():
+        status = pool_status()
+    await engine.dispose()
+
+    assert isinstance(engine.pool, MeteredPool)
+    assert status == {
+        'write': {
+            'size': 1,
+            'max_overflow': 3,
+            'checked_out': 1,
+            'saturation': 0.25,
+            'timeout': 2,
+        }
+    }
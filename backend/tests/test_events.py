@@ -0,0 +1,52 @@
+import pytest
+
+from src.core.events import CatalogEvent, LocalBroker
+from src.core.metrics import metrics
+
+EVENT = CatalogEvent(entity='book', action='created', ids=[1], version=2)
+
+
+@pytest.mark.anyio
+async def test_broker_fans_out_events() -> None:
+    broker = LocalBroker()
+    subscriptions = [broker.subscribe() for _ in range(3)]
+
+    broker.publish(EVENT)
+
+    for subscription in subscriptions:
+        assert await subscription.get() == (
+            'event: book\n'
+            'data: {"entity": "book", "action": "created", "ids": [1], '
+            '"version": 2}\n\n'
+        )
+
+
+@pytest.mark.anyio
+async def test_broker_drops_slow_subscribers() -> None:
+    metrics.reset()
+    broker = LocalBroker(queue_size=2)
+    slow, fast = broker.subscribe(), broker.subscribe()
+
+    broker.publish(EVENT)
+    await fast.get()
+    broker.publish(EVENT)
+    broker.publish(EVENT)
+
+    # Pending messages are discarded for the end-of-stream marker
+    assert await slow.get() is None
+    assert len(broker) == 1
+    assert metrics.get('events_subscribers_dropped') == 1
+    assert await fast.get() == EVENT.encode()
+
+
+@pytest.mark.anyio
+async def test_broker_close_ends_subscriptions() -> None:
+    broker = LocalBroker()
+    subscription = broker.subscribe()
+    broker.publish(EVENT)
+
+    broker.close()
+
+    assert await subscription.get() == EVENT.encode()
+    assert await subscription.get() is None
+    assert not len(broker)
@@ -0,0 +1,48 @@
+from src.utils.profile_imports import (
+    measure_imports,
+    parse_importtime,
+    self_time_by_package,
+    total_import_time_us,
+)
+
+# Generous enough for slow CI runners, but low enough to catch a new heavy
+# eager import.
+IMPORT_TIME_BUDGET_MS = 1000
+LAZY_MODULES = {
+    'argon2',
+    'brotli',
+    'msgpack',
+    'pwdlib',
+    'pyarrow',
+    'zstandard',
+}
+
+
+def test_parse_importtime() -> None:
+    output = (
+        'import time: self [us] | cumulative | imported package\n'
+        'import time:       100 |        100 |     pkg.sub\n'
+        'import time:        50 |        150 |   pkg\n'
+        'import time:        10 |         10 | other\n'
+    )
+
+    records = parse_importtime(output)
+
+    assert [record.module for record in records] == ['pkg.sub', 'pkg', 'other']
+    assert [record.depth for record in records] == [2, 1, 0]
+    assert self_time_by_package(records) == {'pkg': 150, 'other': 10}
+    assert total_import_time_us(records) == records[-1].cumulative_us
+
+
+def test_app_import_time_within_budget() -> None:
+    runs = [measure_imports('src.app') for _ in range(3)]
+    total_ms = min(total_import_time_us(records) for records in runs) / 1000
+
+    assert total_ms < IMPORT_TIME_BUDGET_MS
+
+
+def test_heavy_dependencies_are_not_imported_with_app() -> None:
+    records = measure_imports('src.app')
+    imported = {record.module for record in records}
+
+    assert not imported & LAZY_MODULES
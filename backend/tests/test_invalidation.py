@@ -0,0 +1,288 @@
+import asyncio
+import json
+from typing import Any, AsyncGenerator, Callable
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core import invalidation
+from src.core.invalidation import (
+    Invalidation,
+    InvalidationBus,
+    PostgresTransport,
+    RedisError,
+    RedisTransport,
+    encode_command,
+    read_reply,
+)
+from src.core.metrics import metrics
+from src.core.settings import settings
+
+
+class FakeRedis:
+    """
+    Pub/sub subset of a Redis server: AUTH, SUBSCRIBE and PUBLISH.
+    """
+
+    def __init__(self, password: str | None = None) -> None:
+        self.password = password
+        self.subscribers: dict[bytes, list[asyncio.StreamWriter]] = {}
+        self.connections: list[asyncio.StreamWriter] = []
+        self.server: asyncio.Server | None = None
+
+    @property
+    def url(self) -> str:
+        assert self.server is not None
+        port = self.server.sockets[0].getsockname()[1]
+        auth = f':{self.password}@' if self.password else ''
+        return f'redis://{auth}127.0.0.1:{port}'
+
+    async def start(self) -> None:
+        self.server = await asyncio.start_server(self._handle, '127.0.0.1', 0)
+
+    async def stop(self) -> None:
+        assert self.server is not None
+        self.server.close()
+        for writer in self.connections:
+            writer.close()
+        await self.server.wait_closed()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.connections.append(writer)
+        while True:
+            try:
+                name, *args = await read_reply(reader)
+            except asyncio.IncompleteReadError:
+                return
+
+            if name == b'AUTH':
+                ok = args[0].decode() == self.password
+                writer.write(b'+OK\r\n' if ok else b'-WRONGPASS\r\n')
+            elif name == b'SUBSCRIBE':
+                self.subscribers.setdefault(args[0], []).append(writer)
+                writer.write(encode_command('subscribe', args[0]))
+            elif name == b'PUBLISH':
+                subscribers = self.subscribers.get(args[0], [])
+                for subscriber in subscribers:
+                    subscriber.write(encode_command('message', *args))
+                writer.write(b':%d\r\n' % len(subscribers))
+            else:
+                writer.write(b'-ERR unknown command\r\n')
+
+
+@pytest.fixture
+async def fake_redis() -> AsyncGenerator[FakeRedis, None]:
+    server = FakeRedis(password='s3cret')
+    await server.start()
+    yield server
+    await server.stop()
+
+
+def received_by(bus: InvalidationBus, entity: str) -> list[Invalidation]:
+    received: list[Invalidation] = []
+    bus.subscribe(entity, received.append)
+    return received
+
+
+async def wait_for(condition: Callable[[], Any], timeout: float = 5) -> None:
+    async with asyncio.timeout(timeout):
+        while not condition():
+            await asyncio.sleep(0.01)
+
+
+def test_publish_delivers_in_process() -> None:
+    bus = InvalidationBus()
+    books = received_by(bus, 'book')
+    authors = received_by(bus, 'author')
+
+    def failing(invalidation: Invalidation) -> None:
+        raise RuntimeError
+
+    bus.subscribe('book', failing)
+    errors = metrics.get('invalidation_handler_errors')
+
+    bus.publish(Invalidation('book', 'updated', [1], 3))
+
+    assert [(i.entity, i.ids, i.version) for i in books] == [('book', [1], 3)]
+    assert books[0].origin == bus.origin
+    assert not authors
+    assert metrics.get('invalidation_handler_errors') == errors + 1
+
+    bus.unsubscribe('book', failing)
+    bus.publish(Invalidation('book', 'deleted', [1]))
+    assert len(books) == 2  # noqa: PLR2004
+    assert metrics.get('invalidation_handler_errors') == errors + 1
+
+
+def test_receive_skips_own_messages() -> None:
+    bus = InvalidationBus()
+    users = received_by(bus, 'user')
+    received = metrics.get('invalidations_received')
+    lag = metrics.get('invalidation_lag_ms')
+
+    bus.receive(
+        Invalidation('user', 'updated', [1], origin=bus.origin).encode()
+    )
+    assert not users
+
+    message = Invalidation('user', 'deleted', [2], origin='other')
+    message.sent_at -= 0.25
+    bus.receive(message.encode())
+
+    assert users == [message]
+    assert metrics.get('invalidations_received') == received + 1
+    assert metrics.get('invalidation_lag_ms') - lag >= 250  # noqa: PLR2004
+
+
+@pytest.mark.parametrize('payload', ['not json', '[1]', '{"entity": "x"}'])
+def test_receive_ignores_invalid_payloads(payload: str) -> None:
+    errors = metrics.get('invalidation_decode_errors')
+
+    InvalidationBus().receive(payload)
+
+    assert metrics.get('invalidation_decode_errors') == errors + 1
+
+
+@pytest.mark.anyio
+async def test_redis_transport(
+    fake_redis: FakeRedis, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, 'INVALIDATION_MAX_IDS', 2)
+    sender, listener = InvalidationBus(), InvalidationBus()
+    # Each bus stands for another process
+    monkeypatch.setattr(
+        InvalidationBus, 'origin', property(lambda bus: str(id(bus)))
+    )
+    books = received_by(listener, 'book')
+    tasks = [
+        asyncio.create_task(bus.run(RedisTransport(fake_redis.url, 'c')))
+        for bus in (sender, listener)
+    ]
+
+    try:
+        await wait_for(
+            lambda: len(fake_redis.subscribers.get(b'c', ())) == 2  # noqa: PLR2004
+        )
+        sender.publish(Invalidation('book', 'deleted', [1, 2, 3], 7))
+        sender.publish(Invalidation('book', 'created', [], 8))
+
+        await wait_for(lambda: len(books) == 3)  # noqa: PLR2004
+        assert [(i.ids, i.version) for i in books] == [
+            ([1, 2], 7),
+            ([3], 7),
+            ([], 8),
+        ]
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+@pytest.mark.anyio
+async def test_run_reconnects(fake_redis: FakeRedis) -> None:
+    bus = InvalidationBus()
+    errors = metrics.get('invalidation_bus_errors')
+    wrong_password = fake_redis.url.replace('s3cret', 'wrong')
+    task = asyncio.create_task(
+        bus.run(RedisTransport(wrong_password, 'c'), retry_interval=0.01)
+    )
+
+    try:
+        await wait_for(lambda: metrics.get('invalidation_bus_errors') > errors)
+        assert not fake_redis.subscribers
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    transport = RedisTransport(fake_redis.url, 'c')
+    task = asyncio.create_task(bus.run(transport, retry_interval=0.01))
+    try:
+        await wait_for(transport.is_connected)
+        # The server drops the connections
+        for writer in fake_redis.connections:
+            writer.close()
+        fake_redis.connections.clear()
+        await wait_for(lambda: not transport.is_connected())
+        await wait_for(transport.is_connected)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+@pytest.mark.anyio
+async def test_full_outbox_drops_invalidations(
+    fake_redis: FakeRedis, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(settings, 'INVALIDATION_QUEUE_SIZE', 1)
+    bus = InvalidationBus()
+    dropped = metrics.get('invalidations_dropped')
+    task = asyncio.create_task(bus.run(RedisTransport(fake_redis.url, 'c')))
+
+    try:
+        await asyncio.sleep(0)
+        bus.publish(Invalidation('book', 'created', [1]))
+        bus.publish(Invalidation('book', 'created', [2]))
+        assert metrics.get('invalidations_dropped') == dropped + 1
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+@pytest.mark.anyio
+async def test_read_reply() -> None:
+    reader = asyncio.StreamReader()
+    reader.feed_data(b'$-1\r\n+OK\r\n-ERR boom\r\n?\r\n')
+
+    assert await read_reply(reader) is None
+    assert await read_reply(reader) == b'OK'
+    error = await read_reply(reader)
+    assert isinstance(error, RedisError)
+    assert str(error) == 'ERR boom'
+    with pytest.raises(RedisError, match='Unexpected reply'):
+        await read_reply(reader)
+
+
+async def test_postgres_transport(async_session: AsyncSession) -> None:
+    if async_session.get_bind().dialect.name != 'postgresql':
+        pytest.skip('LISTEN/NOTIFY is specific to PostgreSQL.')
+
+    url = async_session.get_bind().engine.url.render_as_string(
+        hide_password=False
+    )
+    received: list[str] = []
+    sender, listener = PostgresTransport(url, 'c'), PostgresTransport(url, 'c')
+    assert not sender.is_connected()
+
+    await sender.connect(lambda payload: None)
+    await listener.connect(received.append)
+    try:
+        assert sender.is_connected()
+        await sender.send(json.dumps({'entity': 'book'}))
+        await wait_for(lambda: received)
+        assert json.loads(received[0]) == {'entity': 'book'}
+    finally:
+        await sender.close()
+        await listener.close()
+    assert not listener.is_connected()
+    await listener.close()
+
+
+@pytest.mark.parametrize(
+    ('backend', 'transport'),
+    [
+        ('local', type(None)),
+        ('postgres', PostgresTransport),
+        ('redis', RedisTransport),
+    ],
+)
+def test_create_transport(
+    monkeypatch: pytest.MonkeyPatch, backend: str, transport: type
+) -> None:
+    monkeypatch.setattr(settings, 'INVALIDATION_BUS', backend)
+    monkeypatch.setattr(
+        settings, 'DATABASE_URL', 'postgresql+asyncpg://u:p@localhost/db'
+    )
+
+    assert isinstance(invalidation.create_transport(), transport)
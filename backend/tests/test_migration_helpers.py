@@ -0,0 +1,180 @@
+from collections.abc import AsyncGenerator
+from typing import Any, Callable
+
+import pytest
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import Connection, inspect, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+
+from src.migrations.helpers import (
+    backfill_in_batches,
+    checkpoints_table,
+    create_index_concurrently,
+    drop_index_concurrently,
+)
+from src.models import Author, Book
+from tests.conftest import BookFactory
+
+
+async def run_operation(
+    async_session: AsyncSession, operation: Callable[[], Any]
+) -> Any:
+    def run(connection: Connection) -> Any:
+        with Operations.context(MigrationContext.configure(connection)):
+            return operation()
+
+    engine = async_session.bind
+    assert isinstance(engine, AsyncEngine)
+    async with engine.connect() as connection:
+        return await connection.run_sync(run)
+
+
+@pytest.fixture
+async def checkpoints(
+    async_session: AsyncSession,
+) -> AsyncGenerator[None, None]:
+    yield
+
+    # The checkpoints table is not part of the models metadata
+    async with async_session.begin():
+        await async_session.run_sync(
+            lambda session: checkpoints_table.drop(
+                session.connection(), checkfirst=True
+            )
+        )
+
+
+async def get_books_indexes(
+    async_session: AsyncSession,
+) -> list[str | None]:
+    async with async_session:
+        connection = await async_session.connection()
+        indexes = await connection.run_sync(
+            lambda conn: inspect(conn).get_indexes('books')
+        )
+
+    return [index['name'] for index in indexes]
+
+
+async def test_create_and_drop_index_concurrently(
+    async_session: AsyncSession,
+) -> None:
+    index_name = 'ix_books_year_test'
+
+    await run_operation(
+        async_session,
+        lambda: create_index_concurrently(index_name, 'books', ['year']),
+    )
+    # Running again is a no-op instead of an error
+    await run_operation(
+        async_session,
+        lambda: create_index_concurrently(index_name, 'books', ['year']),
+    )
+    assert index_name in await get_books_indexes(async_session)
+
+    await run_operation(
+        async_session, lambda: drop_index_concurrently(index_name, 'books')
+    )
+    assert index_name not in await get_books_indexes(async_session)
+
+
+async def test_create_index_concurrently_replaces_invalid_index(
+    async_session: AsyncSession, author: Author
+) -> None:
+    if async_session.get_bind().dialect.name != 'postgresql':
+        pytest.skip('Invalid indexes are specific to PostgreSQL.')
+
+    index_name = 'ix_books_year_test'
+    async with async_session.begin():
+        async_session.add_all(BookFactory.create_batch(2, year=2000))
+
+    # Building a unique index over duplicated values fails concurrently and
+    # leaves an INVALID index behind
+    with pytest.raises(IntegrityError):
+        await run_operation(
+            async_session,
+            lambda: create_index_concurrently(
+                index_name, 'books', ['year'], unique=True
+            ),
+        )
+
+    await run_operation(
+        async_session,
+        lambda: create_index_concurrently(index_name, 'books', ['year']),
+    )
+
+    async with async_session:
+        is_valid = await async_session.scalar(
+            text(
+                'SELECT i.indisvalid FROM pg_index i '
+                'JOIN pg_class c ON c.oid = i.indexrelid '
+                'WHERE c.relname = :index_name'
+            ),
+            {'index_name': index_name},
+        )
+    assert is_valid
+
+
+@pytest.mark.usefixtures('checkpoints')
+async def test_backfill_in_batches_updates_all_rows(
+    async_session: AsyncSession, author: Author
+) -> None:
+    expected_updated = 25
+    backfill_year = 1999
+    async with async_session.begin():
+        async_session.add_all(BookFactory.create_batch(25, year=2000))
+
+    updated = await run_operation(
+        async_session,
+        lambda: backfill_in_batches(
+            'books',
+            {'year': backfill_year},
+            name='books_year',
+            batch_size=10,
+            pause_seconds=0,
+        ),
+    )
+
+    assert updated == expected_updated
+    async with async_session:
+        years = set(await async_session.scalars(select(Book.year)))
+        last_id = await async_session.scalar(
+            select(checkpoints_table.c.last_id).where(
+                checkpoints_table.c.name == 'books_year'
+            )
+        )
+        max_id = await async_session.scalar(select(Book.id).order_by(-Book.id))
+    assert years == {backfill_year}
+    assert last_id == max_id
+
+
+@pytest.mark.usefixtures('checkpoints')
+async def test_backfill_in_batches_resumes_from_checkpoint(
+    async_session: AsyncSession, author: Author
+) -> None:
+    expected_updated = 15
+    year = 2000
+    async with async_session.begin():
+        async_session.add_all(BookFactory.create_batch(20, year=year))
+        await async_session.run_sync(
+            lambda session: checkpoints_table.create(session.connection())
+        )
+        await async_session.execute(
+            checkpoints_table.insert().values(name='books_resume', last_id=5)
+        )
+
+    def backfill() -> int:
+        return backfill_in_batches(
+            'books',
+            {'year': year - 1},
+            name='books_resume',
+            where=text('year = :old_year').bindparams(old_year=year),
+            batch_size=3,
+            pause_seconds=0,
+        )
+
+    assert await run_operation(async_session, backfill) == expected_updated
+    # Nothing is left to process once the checkpoint reached the last id
+    assert await run_operation(async_session, backfill) == 0
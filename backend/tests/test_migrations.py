@@ -0,0 +1,66 @@
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, text
+
+from src.core.settings import settings
+
+MIGRATIONS = Path(__file__).parents[1] / 'src' / 'migrations'
+
+
+def alembic_config() -> Config:
+    # Without the ini file, so the logging of the tests is left as it is
+    config = Config()
+    config.set_main_option('script_location', str(MIGRATIONS))
+    return config
+
+
+def test_upgrade_populated_sqlite_database(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    db_path = tmp_path / 'populated.db'
+    monkeypatch.setattr(
+        settings, 'DATABASE_URL', f'sqlite+aiosqlite:///{db_path}'
+    )
+    config = alembic_config()
+    command.upgrade(config, '18abd14a5f7d')
+
+    engine = create_engine(f'sqlite:///{db_path}')
+    with engine.begin() as connection:
+        connection.execute(
+            text("INSERT INTO authors (id, name) VALUES (1, 'Author')")
+        )
+        connection.execute(
+            text(
+                'INSERT INTO books (id, year, title, author_id) '
+                "VALUES (1, 1999, 'Book', 1)"
+            )
+        )
+
+    command.upgrade(config, 'head')
+
+    with engine.connect() as connection:
+        rows = connection.execute(
+            text('SELECT version, updated_at FROM books')
+        ).all()
+        not_null = connection.execute(
+            text(
+                "SELECT name FROM pragma_table_info('authors') "
+                'WHERE name = \'updated_at\' AND "notnull"'
+            )
+        ).all()
+        version_default = connection.execute(
+            text(
+                "SELECT dflt_value FROM pragma_table_info('books') "
+                "WHERE name = 'version'"
+            )
+        ).scalar_one()
+    engine.dispose()
+
+    assert len(rows) == 1
+    assert rows[0].version == 1
+    assert rows[0].updated_at is not None
+    assert not_null == [('updated_at',)]
+    assert version_default is None
@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+import pytest
+import uvicorn
+
+from src.core.settings import PoolName, settings
+from src.utils import serve
+from src.utils.serve import (
+    available_cpus,
+    cgroup_cpu_quota,
+    check_shared_state,
+    configure_pools,
+    pool_sizes,
+)
+
+
+@pytest.mark.parametrize(
+    ('files', 'expected'),
+    [
+        ({}, None),
+        ({'cpu.max': 'max 100000\n'}, None),
+        ({'cpu.max': '150000 100000\n'}, 1.5),
+        (
+            {'cpu/cpu.cfs_quota_us': '-1', 'cpu/cpu.cfs_period_us': '100000'},
+            None,
+        ),
+        (
+            {
+                'cpu/cpu.cfs_quota_us': '200000',
+                'cpu/cpu.cfs_period_us': '100000',
+            },
+            2,
+        ),
+    ],
+)
+def test_cgroup_cpu_quota(
+    tmp_path: Path, files: dict[str, str], expected: float | None
+) -> None:
+    for name, content in files.items():
+        (tmp_path / name).parent.mkdir(exist_ok=True)
+        (tmp_path / name).write_text(content)
+
+    assert cgroup_cpu_quota(tmp_path) == expected
+
+
+def test_available_cpus_capped_by_quota(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(os, 'sched_getaffinity', lambda pid: {0, 1, 2, 3})
+    assert available_cpus(tmp_path) == 4  # noqa: PLR2004
+
+    (tmp_path / 'cpu.max').write_text('250000 100000')
+    assert available_cpus(tmp_path) == 3  # noqa: PLR2004
+
+    (tmp_path / 'cpu.max').write_text('10000 100000')
+    assert available_cpus(tmp_path) == 1
+
+
+SIZES: dict[PoolName, int] = {'auth': 2, 'read': 5, 'write': 3, 'bulk': 1}
+OVERFLOWS: dict[PoolName, int] = {'auth': 3, 'read': 10, 'write': 5, 'bulk': 2}
+
+
+def test_pool_sizes(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, 'CATALOG_REPLICA', False)
+    monkeypatch.setattr(settings, 'INVALIDATION_BUS', 'local')
+
+    # Within the share of each worker
+    assert pool_sizes(4, 200, SIZES, OVERFLOWS) == (SIZES, OVERFLOWS)
+
+    # 22 connections each, 18 past the first of each pool out of 27
+    assert pool_sizes(4, 90, SIZES, OVERFLOWS) == (
+        {'auth': 1, 'read': 3, 'write': 2, 'bulk': 1},
+        {'auth': 2, 'read': 6, 'write': 3, 'bulk': 1},
+    )
+
+    # A single connection per pool
+    sizes, overflows = pool_sizes(5, 20, SIZES, OVERFLOWS)
+    assert set(sizes.values()) == {1}
+    assert set(overflows.values()) == {0}
+
+    # The listener and the bus connections of each worker
+    monkeypatch.setattr(settings, 'CATALOG_REPLICA', True)
+    monkeypatch.setattr(settings, 'INVALIDATION_BUS', 'postgres')
+    with pytest.raises(ValueError, match='not enough for 5 workers'):
+        pool_sizes(5, 20, SIZES, OVERFLOWS)
+
+
+def test_main_runs_sized_workers(monkeypatch: pytest.MonkeyPatch) -> None:
+    runs: list[dict[str, Any]] = []
+
+    def run(app: str, **options: Any) -> None:
+        runs.append(options)
+
+    monkeypatch.setattr(uvicorn, 'run', run)
+    monkeypatch.setattr(serve, 'available_cpus', lambda: 3)
+    monkeypatch.setattr(serve, 'configure_pools', lambda *sizes: None)
+    monkeypatch.setattr(settings, 'DB_MAX_CONNECTIONS', 30)
+    monkeypatch.setattr(settings, 'CATALOG_REPLICA', False)
+    monkeypatch.setattr(settings, 'INVALIDATION_BUS', 'redis')
+    monkeypatch.setattr(settings, 'LOGIN_THROTTLE_BACKEND', 'database')
+
+    serve.main(
+        argparse.Namespace(
+            host='127.0.0.1', port=8000, workers=0, backlog=512, keepalive=30
+        )
+    )
+
+    assert runs == [
+        {
+            'host': '127.0.0.1',
+            'port': 8000,
+            'workers': 3,
+            'loop': 'uvloop',
+            'http': 'httptools',
+            'backlog': 512,
+            'timeout_keep_alive': 30,
+        }
+    ]
+
+
+@pytest.mark.parametrize(
+    ('bus', 'throttle', 'message'),
+    [
+        ('local', 'database', "INVALIDATION_BUS 'local',"),
+        ('postgres', 'memory', "LOGIN_THROTTLE_BACKEND 'memory',"),
+        (
+            'local',
+            'memory',
+            "INVALIDATION_BUS 'local' and LOGIN_THROTTLE_BACKEND 'memory',",
+        ),
+    ],
+)
+def test_workers_refuse_per_process_state(
+    monkeypatch: pytest.MonkeyPatch, bus: str, throttle: str, message: str
+) -> None:
+    monkeypatch.setattr(settings, 'INVALIDATION_BUS', bus)
+    monkeypatch.setattr(settings, 'LOGIN_THROTTLE_BACKEND', throttle)
+
+    # A single worker keeps all the state
+    check_shared_state(1)
+    with pytest.raises(
+        ValueError, match=f'2 workers cannot run with {message}'
+    ):
+        check_shared_state(2)
+
+    monkeypatch.setattr(settings, 'INVALIDATION_BUS', 'postgres')
+    monkeypatch.setattr(settings, 'LOGIN_THROTTLE_BACKEND', 'database')
+    check_shared_state(2)
+
+
+def test_configure_pools(monkeypatch: pytest.MonkeyPatch) -> None:
+    # Restored after the test
+    monkeypatch.setenv('DB_POOL_SIZES', '')
+    monkeypatch.setenv('DB_POOL_MAX_OVERFLOW', '')
+    monkeypatch.setattr(settings, 'DB_POOL_SIZES', settings.DB_POOL_SIZES)
+    monkeypatch.setattr(
+        settings, 'DB_POOL_MAX_OVERFLOW', settings.DB_POOL_MAX_OVERFLOW
+    )
+
+    configure_pools(SIZES, OVERFLOWS)
+
+    assert settings.DB_POOL_SIZES == SIZES
+    assert settings.DB_POOL_MAX_OVERFLOW == OVERFLOWS
+    assert json.loads(os.environ['DB_POOL_SIZES']) == SIZES
+    assert json.loads(os.environ['DB_POOL_MAX_OVERFLOW']) == OVERFLOWS
@@ -0,0 +1,151 @@
+import asyncio
+
+import pytest
+
+from src.core.invalidation import Invalidation, bus
+from src.core.metrics import metrics
+from src.core.settings import settings
+from src.core.singleflight import SingleFlight
+
+
+class SlowCall:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> int:
+        self.calls += 1
+        await self.release.wait()
+        return self.calls
+
+
+@pytest.mark.anyio
+async def test_concurrent_identical_calls_share_one_execution() -> None:
+    metrics.reset()
+    flight = SingleFlight('test')
+    call = SlowCall()
+    expected_callers = 5
+
+    tasks = [
+        asyncio.create_task(flight.do('key', call))
+        for _ in range(expected_callers)
+    ]
+    await asyncio.sleep(0)
+    call.release.set()
+
+    assert await asyncio.gather(*tasks) == [1] * expected_callers
+    assert call.calls == 1
+    assert metrics.get('singleflight_test_saved') == expected_callers - 1
+    assert not len(flight)
+
+
+@pytest.mark.anyio
+async def test_calls_with_other_keys_or_later_are_not_shared() -> None:
+    flight = SingleFlight('test')
+    call = SlowCall()
+    call.release.set()
+
+    results = await asyncio.gather(flight.do('a', call), flight.do('b', call))
+    later = await flight.do('a', call)
+
+    assert sorted(results) == [1, 2]
+    assert later == 3  # noqa: PLR2004
+
+
+@pytest.mark.anyio
+async def test_calls_after_a_change_do_not_join_earlier_ones() -> None:
+    flight = SingleFlight('test', ['book'])
+    release = asyncio.Event()
+    calls = 0
+
+    async def read() -> int:
+        nonlocal calls
+        calls += 1
+        execution = calls
+        await release.wait()
+        return execution
+
+    before = asyncio.create_task(flight.do('key', read))
+    await asyncio.sleep(0)
+    bus.publish(Invalidation('author', 'updated', [1]))
+    unchanged = asyncio.create_task(flight.do('key', read))
+    await asyncio.sleep(0)
+    bus.publish(Invalidation('book', 'updated', [1]))
+    after = asyncio.create_task(flight.do('key', read))
+    await asyncio.sleep(0)
+    release.set()
+
+    assert list(await asyncio.gather(before, unchanged, after)) == [1, 1, 2]
+    assert not len(flight)
+
+
+@pytest.mark.anyio
+async def test_errors_are_shared() -> None:
+    flight = SingleFlight('test')
+    release = asyncio.Event()
+    calls = 0
+
+    async def failing() -> None:
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        raise ValueError('boom')
+
+    tasks = [asyncio.create_task(flight.do('key', failing)) for _ in range(2)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert calls == 1
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+@pytest.mark.anyio
+async def test_follower_runs_its_own_call_if_leader_is_cancelled() -> None:
+    metrics.reset()
+    flight = SingleFlight('test')
+    leader_call = SlowCall()
+    follower_call = SlowCall()
+    follower_call.release.set()
+
+    leader = asyncio.create_task(flight.do('key', leader_call))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.do('key', follower_call))
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await follower == 1
+    assert leader.cancelled()
+    assert follower_call.calls == 1
+    assert not metrics.get('singleflight_test_saved')
+
+
+@pytest.mark.anyio
+async def test_cancelled_follower_does_not_cancel_the_call() -> None:
+    flight = SingleFlight('test')
+    call = SlowCall()
+
+    leader = asyncio.create_task(flight.do('key', call))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(flight.do('key', call))
+    await asyncio.sleep(0)
+    follower.cancel()
+    await asyncio.sleep(0)
+    call.release.set()
+
+    assert await leader == 1
+    assert follower.cancelled()
+
+
+@pytest.mark.anyio
+async def test_coalescing_can_be_disabled(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(settings, 'READ_COALESCING', False)
+    flight = SingleFlight('test')
+    call = SlowCall()
+    call.release.set()
+
+    await asyncio.gather(flight.do('key', call), flight.do('key', call))
+
+    assert call.calls == 2  # noqa: PLR2004
@@ -8,6 +8,9 @@ import {
   DeleteAuthorsBatchDto,
 } from "@/dto/AuthorsDto";
 
+// The largest page the API returns (AUTHORS_MAX_PAGE_SIZE)
+const AUTHORS_MAX_PAGE_SIZE = 100;
+
 const useAuthorsService = () => {
   const { Get, Post } = useRootApiService();
 
@@ -19,6 +22,32 @@ const useAuthorsService = () => {
     return response;
   };
 
+  const getAllAuthors = async (): Promise<
+    ApiResponseDto<GetAuthorsResponseDto>
+  > => {
+    const authors: AuthorResponseDto[] = [];
+    let response = await getAuthors({ limit: AUTHORS_MAX_PAGE_SIZE });
+
+    while (response.data && response.success) {
+      authors.push(...response.data.authors);
+      if (
+        !response.data.authors.length ||
+        authors.length >= response.data.total_results
+      ) {
+        return {
+          ...response,
+          data: { authors, total_results: response.data.total_results },
+        };
+      }
+      response = await getAuthors({
+        limit: AUTHORS_MAX_PAGE_SIZE,
+        offset: authors.length,
+      });
+    }
+
+    return response;
+  };
+
   const createAuthor = async (
     data: PostBodyCreateAuthorDto
   ): Promise<ApiResponseDto<AuthorResponseDto>> => {
@@ -41,7 +70,7 @@ const useAuthorsService = () => {
     return response;
   };
 
-  return { getAuthors, createAuthor, deleteAuthorsBatch };
+  return { getAuthors, getAllAuthors, createAuthor, deleteAuthorsBatch };
 };
 
 export default useAuthorsService;
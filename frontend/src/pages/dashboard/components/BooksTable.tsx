@@ -60,7 +60,7 @@ const BooksTable: React.FC<BooksTableProps> = ({
   fetchBooks,
 }) => {
   const { createBook, deleteBooksBatch } = useBooksService();
-  const { getAuthors } = useAuthorsService();
+  const { getAllAuthors } = useAuthorsService();
   const {
     register,
     handleSubmit,
@@ -83,7 +83,7 @@ const BooksTable: React.FC<BooksTableProps> = ({
   }, []);
 
   const fecthAllAuthors = async (): Promise<void> => {
-    const response = await getAuthors();
+    const response = await getAllAuthors();
     if (response.data && response.success) {
       setAllAuthors(response.data.authors);
     } else {